@@ -0,0 +1,114 @@
+#!/usr/bin/python
+
+import sys
+import os
+import csv
+import time
+
+import numpy as np
+
+sys.path.append('../core/')
+
+from graph_creation import graph_creation
+
+scenarios = [
+    "UC2_10CPE_Rural",
+    "UC1_50CPE_UrbanVillage",
+    "UC2_50CPE_Rural",
+    "UC3_50CPE_UrbanCity",
+    "UC1_100CPE_UrbanVillage",
+    "UC3_100CPE_UrbanCity",
+    "UC1_300CPE_UrbanVillage",
+    "UC3_300CPE_UrbanCity",
+    "UC1_600CPE_UrbanVillage",
+    "UC3_600CPE_UrbanCity",
+]
+
+
+def rowwise_edges(dataset):
+    """
+    Reference implementation of the original row-by-row parser with list based
+    deduplication of symmetric links.
+
+    Params
+    ------
+    dataset : str
+        Relative path towards the data set
+
+    Return
+    ------
+    edges : dict
+        Mapping of (min, max) node pair to link distance
+    """
+    edge_links = []
+    with open(dataset, 'r') as csvFile:
+        reader = csv.reader(csvFile)
+        next(reader)
+        for row in reader:
+            edge_links.append((int(row[0]), int(row[2]), float(row[4])))
+
+    edges = []
+    edge_weights = []
+    for x in list(set(edge_links)):
+        edge1 = (x[0], x[1])
+        edge2 = (x[1], x[0])
+        if (edge1 not in edges) and (edge2 not in edges):
+            edges.append(edge1)
+            edge_weights.append(x[2])
+
+    return {(min(e), max(e)): w for e, w in zip(edges, edge_weights)}
+
+
+def benchmark_scenario(scen, nb_drops=50):
+    """
+    Time the row-wise and columnar graph creation for all drops of a scenario
+    and verify that both produce the same set of links.
+
+    Params
+    ------
+    scen : str
+        Scenario directory in `../data`
+    nb_drops : int
+        Number of drops to process
+
+    Return
+    ------
+    t_rowwise, t_columnar : float
+        Total wall time in s for both implementations
+    nb_conflicts : int
+        Number of links listed with different distances in the data set. For
+        these links the row-wise parser picks an arbitrary (hash order)
+        distance, the columnar parser the first one in the file.
+    """
+    t_rowwise = 0
+    t_columnar = 0
+    nb_conflicts = 0
+    for i in range(nb_drops):
+        filename = "../data/" + scen + "/links_" + str(i) + ".csv"
+        if not os.path.isfile(filename):
+            break
+
+        t0 = time.perf_counter()
+        ref = rowwise_edges(filename)
+        t1 = time.perf_counter()
+        g = graph_creation(filename, print_stats=False)
+        t2 = time.perf_counter()
+        t_rowwise += t1 - t0
+        t_columnar += t2 - t1
+
+        new = {e: w for e, w in zip(g.get_edgelist(), g.es["weight"])}
+        assert new.keys() == ref.keys()
+        nb_conflicts += sum(new[e] != ref[e] for e in ref)
+
+    return t_rowwise, t_columnar, nb_conflicts
+
+
+if __name__ == '__main__':
+
+    nb_drops = int(sys.argv[1]) if len(sys.argv) == 2 else 50
+
+    print(f"{'scenario':<26}{'row-wise [s]':>14}{'columnar [s]':>14}{'speedup':>10}{'conflicts':>11}")
+    for scen in scenarios:
+        t_rowwise, t_columnar, nb_conflicts = benchmark_scenario(scen, nb_drops)
+        print(f"{scen:<26}{t_rowwise:>14.3f}{t_columnar:>14.3f}"
+              f"{t_rowwise / t_columnar:>10.1f}{nb_conflicts:>11}")
@@ -0,0 +1,80 @@
+#!/usr/bin/python
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('../utils/')
+
+from util_linkbudget import get_link_budget, get_link_budget_profiles, radio_bands
+
+# Carrier frequencies in Hz within the radio bands, with the tabulated 28, 60 and 140 GHz
+# as well as frequencies that have never been tabulated
+frequencies = [26e9, 28e9, 39e9, 58e9, 60e9, 66e9, 140e9, 160e9]
+
+# Carrier frequencies in Hz outside the radio bands
+unsupported = [5e9, 73e9, 94e9, 200e9]
+
+
+def check_frequency(d, f):
+    """
+    Evaluate the link budget of links at a carrier frequency, uniformly and over rain and
+    vegetation profiles, and verify it against the properties that hold in every band.
+
+    Params
+    ------
+    d : np.ndarray
+        Link distances in m, in increasing order
+    f : float
+        Carrier frequency in Hz
+
+    Return
+    ------
+    errors : list
+        Description of every violated property
+    elapsed : float
+        Wall time in s
+    """
+    t0 = time.perf_counter()
+    pl, tp, cap = get_link_budget(d, f)
+    profiles = [{"f": f, "sa": 0, "vd": vd, "pr": pr} for vd in (0, 0.2) for pr in (0, 15, 25)]
+    _, tp_profiles, _ = get_link_budget_profiles(d, profiles)
+    elapsed = time.perf_counter() - t0
+
+    errors = []
+    if not np.all(np.isfinite(pl) & np.isfinite(tp) & np.isfinite(cap)):
+        errors.append("non-finite link budget")
+    if np.any(np.diff(pl) <= 0) or np.any(np.diff(cap) > 0) or np.any(np.diff(tp) > 0):
+        errors.append("link budget not monotonic in the distance")
+    if np.any(tp_profiles > tp):
+        errors.append("rain or vegetation increase the throughput")
+    mcs = next(mcs for f_min, f_max, _, mcs in radio_bands if f_min <= f <= f_max)
+    if mcs is not None and not np.any(tp > 0):
+        errors.append("zero throughput in a band with MCS lookup")
+
+    return errors, elapsed
+
+
+if __name__ == '__main__':
+
+    d = np.linspace(1, 1000, 100000)
+
+    print(f"{'f [GHz]':>8}{'max tp [Mbps]':>15}{'max cap [Mbps]':>16}{'time [s]':>10}  status")
+    failed = []
+    for f in frequencies:
+        errors, elapsed = check_frequency(d, f)
+        _, tp, cap = get_link_budget(d, f)
+        print(f"{f / 1e9:>8g}{np.max(tp):>15.1f}{np.max(cap):>16.1f}{elapsed:>10.3f}  {'; '.join(errors) or 'ok'}")
+        if errors:
+            failed.append(f"{f / 1e9:g} GHz")
+
+    for f in unsupported:
+        try:
+            get_link_budget(d, f)
+            failed.append(f"{f / 1e9:g} GHz accepted")
+        except ValueError as e:
+            print(f"{f / 1e9:>8g}  {e}")
+
+    if failed:
+        sys.exit(f"Link budget check failed for {', '.join(failed)}")
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+import sys
+import os
+import time
+
+sys.path.append('../core/')
+sys.path.append('../utils/')
+
+from link_generation import read_basestations, stream_links, compare_links
+from util_los import read_buildings, wall_index
+
+# Reference drops with their environment and the number of links generated
+# when these values were recorded. The GRAND tool applies criteria beyond the
+# building footprints, so a share of the generated links is not listed in its
+# data sets; the recall and precision below are the recorded lower bounds.
+reference_drops = [
+    ("UC1_600CPE_UrbanVillage", 0, "uc1-LeestUrban", 4613),
+    ("UC2_50CPE_Rural", 0, "uc2-LeestRural", 130),
+    ("UC3_600CPE_UrbanCity", 0, "uc3-GhentUrban", 1239),
+]
+min_recall = 0.9
+min_precision = 0.75
+tolerance = 0.01
+
+
+def check_drop(scen, drop, environment, nb_expected):
+    """
+    Generate the links of a reference drop, compare them with the GRAND data
+    set and check the link count against the recorded value.
+
+    Params
+    ------
+    scen : str
+        Scenario directory in `../data`
+    drop : int
+        Drop index
+    environment : str
+        Environment directory in `../data/environments`
+    nb_expected : int
+        Recorded number of generated links
+
+    Return
+    ------
+    stats : dict
+        Comparison, as returned by `compare_links`, with the wall time in s
+    ok : bool
+        Whether the link count lies within `tolerance` of the recorded value and
+        the recall and precision are above their lower bounds
+    """
+    walls = read_buildings(os.path.join("../data/environments", environment, "Buildings.shp"))
+    walls = (walls, wall_index(walls))
+    devices = read_basestations(f"../data/{scen}/basestations_{drop}.csv")
+
+    t0 = time.perf_counter()
+    stats = compare_links(stream_links(devices, walls), f"../data/{scen}/links_{drop}.csv",
+                          print_stats=False)
+    stats["time"] = time.perf_counter() - t0
+
+    ok = (abs(stats["nb_links"] - nb_expected) <= tolerance * nb_expected
+          and stats["recall"] >= min_recall and stats["precision"] >= min_precision)
+    return stats, ok
+
+
+if __name__ == '__main__':
+
+    print(f"{'scenario':<26}{'drop':>5}{'links':>8}{'expected':>10}{'GRAND':>8}"
+          f"{'recall':>8}{'precision':>11}{'time [s]':>10}")
+    failed = []
+    for scen, drop, environment, nb_expected in reference_drops:
+        stats, ok = check_drop(scen, drop, environment, nb_expected)
+        print(f"{scen:<26}{drop:>5}{stats['nb_links']:>8}{nb_expected:>10}{stats['nb_reference']:>8}"
+              f"{stats['recall']:>8.3f}{stats['precision']:>11.3f}{stats['time']:>10.2f}"
+              f"{'' if ok else '  FAILED'}")
+        if not ok:
+            failed.append(f"{scen}/{drop}")
+
+    if failed:
+        sys.exit(f"Link generation regression in {', '.join(failed)}")
@@ -0,0 +1,131 @@
+#!/usr/bin/python
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('../core/')
+sys.path.append('../utils/')
+
+from graph_creation import graph_creation
+from graph_preparation import graph_preparation
+from network_planning import network_planning
+from util_network import get_network, get_graph
+from graph_creation_benchmark import scenarios
+
+algorithms = ["incremental", "priority", "flow"]
+
+
+def run_pipeline(g, t, algorithm, network):
+    """
+    Prepare and plan a drop, either on the igraph graph or on its array representation,
+    cf. `get_network`. The conversion to the array representation is part of the
+    measured time.
+
+    Params
+    ------
+    g : iGraph
+        Graph of the drop, as returned by `graph_creation`
+    t : integer
+        CPE throughput requirement in Mbps
+    algorithm : str
+        Planning algorithm, cf. `network_planning`
+    network : bool
+        Run on the array representation
+
+    Return
+    ------
+    planned : iGraph or dict
+        Planned graph, None if the drop is infeasible
+    elapsed : float
+        Wall time in s
+    """
+    g = g.copy()
+    t0 = time.perf_counter()
+    if network:
+        g = get_network(g)
+    g = graph_preparation(g, t, print_stats=False)
+    try:
+        planned = network_planning(g, t, algorithm=algorithm) if g is not None else None
+    except AssertionError:
+        planned = None
+    elapsed = time.perf_counter() - t0
+
+    return planned, elapsed
+
+
+def same_plan(a, b):
+    """
+    Return whether two planned graphs have the same topology, routes and residual
+    throughput.
+    """
+    if a is None or b is None:
+        return a is None and b is None
+    b = get_graph(b)
+
+    return (a.get_edgelist() == b.get_edgelist() and a.vs["eroute"] == b.vs["eroute"]
+            and a.vs["vroute"] == b.vs["vroute"] and a.es["tp"] == b.es["tp"])
+
+
+def benchmark_scenario(scen, t, nb_drops, repeat=5):
+    """
+    Time the preparation and planning of the drops of a scenario on both representations.
+    Both are run alternately `repeat` times, so a drift of the machine load affects both
+    alike, and the fastest run of each is kept.
+
+    Params
+    ------
+    scen : str
+        Scenario directory in `../data`
+    t : integer
+        CPE throughput requirement in Mbps
+    nb_drops : int
+        Number of drops to process
+    repeat : int
+        Number of runs per drop, algorithm and representation
+
+    Return
+    ------
+    times : dict
+        Total wall time in s per algorithm, as (igraph, array representation)
+    nb_mismatches : int
+        Number of plans that differ between both representations
+    """
+    times = {algorithm: [0.0, 0.0] for algorithm in algorithms}
+    nb_mismatches = 0
+    for drop in range(nb_drops):
+        g = graph_creation(f"../data/{scen}/links_{drop}.csv", print_stats=False)
+        if g == -1:
+            break
+        for algorithm in algorithms:
+            t_graph = t_network = np.inf
+            for _ in range(repeat):
+                a, elapsed = run_pipeline(g, t, algorithm, network=False)
+                t_graph = min(t_graph, elapsed)
+                b, elapsed = run_pipeline(g, t, algorithm, network=True)
+                t_network = min(t_network, elapsed)
+            times[algorithm][0] += t_graph
+            times[algorithm][1] += t_network
+            nb_mismatches += not same_plan(a, b)
+
+    return times, nb_mismatches
+
+
+if __name__ == '__main__':
+
+    nb_drops = int(sys.argv[1]) if len(sys.argv) >= 2 else 10
+    t = float(sys.argv[2]) if len(sys.argv) >= 3 else 100
+
+    print(f"{'scenario':<26}{'algorithm':>12}{'igraph [s]':>12}{'arrays [s]':>12}{'speedup':>10}{'mismatches':>12}")
+    failed = []
+    for scen in scenarios:
+        times, nb_mismatches = benchmark_scenario(scen, t, nb_drops)
+        for algorithm, (t_graph, t_network) in times.items():
+            print(f"{scen:<26}{algorithm:>12}{t_graph:>12.3f}{t_network:>12.3f}"
+                  f"{t_graph / t_network:>10.2f}{nb_mismatches:>12}")
+        if nb_mismatches:
+            failed.append(scen)
+
+    if failed:
+        sys.exit(f"Plans differ between igraph and array representations in {', '.join(failed)}")
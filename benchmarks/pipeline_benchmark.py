@@ -0,0 +1,271 @@
+#!/usr/bin/python
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import resource
+import datetime
+import multiprocessing
+
+import numpy as np
+import igraph as ig
+
+sys.path.append('../core/')
+sys.path.append('../utils/')
+
+from graph_creation_benchmark import scenarios
+
+stages = ["creation", "extension", "preparation", "analysis", "planning"]
+
+
+def get_peak_rss():
+    """
+    Return the peak resident set size of the current process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kB on Linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def run_stage(datapath, scen, drop, stage, t, algorithm):
+    """
+    Run one stage of the pipeline for a drop and measure it. The stages it
+    depends on are run first, without being measured. This function is meant
+    to run in a fresh process, so the peak RSS only covers this drop.
+
+    Params
+    ------
+    datapath : str
+        Relative path towards the data directory
+    scen : str
+        Scenario directory in `datapath`
+    drop : int
+        Drop index
+    stage : str
+        One of `stages`
+    t : integer
+        CPE throughput requirement in Mbps
+    algorithm : str
+        Planning algorithm, cf. `network_planning`
+
+    Return
+    ------
+    result : dict
+        Wall time in s, peak RSS before and after the stage in MB and status
+        (`ok`, `skipped` or `failed`)
+    """
+    from graph_creation import graph_creation
+    from graph_extension import graph_extension
+    from graph_preparation import graph_preparation
+    from graph_analysis import graph_analysis
+    from network_planning import network_planning
+
+    links = f"{datapath}/{scen}/links_{drop}.csv"
+    edge_nodes = f"{datapath}/{scen}/edge_nodes_{drop}.csv"
+    basestations = f"{datapath}/{scen}/basestations_{drop}.csv"
+
+    result = {"scenario": scen, "drop": drop, "stage": stage, "wall_time": None,
+              "peak_rss_before": None, "peak_rss": None, "status": "ok"}
+    if stage == "extension" and not os.path.isfile(edge_nodes):
+        result["status"] = "skipped"
+        return result
+
+    run = {
+        "creation": lambda g: graph_creation(links, print_stats=False),
+        "extension": lambda g: graph_extension(g, edge_nodes, basestations, print_stats=False),
+        "preparation": lambda g: graph_preparation(g, t, print_stats=False),
+        "analysis": lambda g: graph_analysis(g, print_stats=False),
+        "planning": lambda g: network_planning(g, t, algorithm=algorithm),
+    }
+    depends = {
+        "creation": [],
+        "extension": ["creation"],
+        "preparation": ["creation"],
+        "analysis": ["creation"],
+        "planning": ["creation", "preparation"],
+    }
+
+    g = None
+    for prerequisite in depends[stage]:
+        g = run[prerequisite](g)
+        if g is None:
+            result["status"] = "skipped"
+            return result
+
+    result["peak_rss_before"] = get_peak_rss()
+    t0 = time.perf_counter()
+    try:
+        run[stage](g)
+    except AssertionError:
+        result["status"] = "failed"
+    result["wall_time"] = time.perf_counter() - t0
+    result["peak_rss"] = get_peak_rss()
+
+    return result
+
+
+def run_benchmark(scens, drops, stages, t=300, algorithm='incremental', repeat=1,
+                  datapath='../data'):
+    """
+    Benchmark all stages for all drops of the given scenarios. Every
+    measurement runs in a fresh process.
+
+    Params
+    ------
+    scens : list[str]
+        Scenario directories in `datapath`
+    drops : list[int]
+        Drop indices
+    stages : list[str]
+        Stages to measure, see `stages`
+    t : integer
+        CPE throughput requirement in Mbps
+    algorithm : str
+        Planning algorithm, cf. `network_planning`
+    repeat : int
+        Number of measurements per stage and drop, the fastest one is kept
+    datapath : str
+        Relative path towards the data directory
+
+    Return
+    ------
+    report : dict
+        Benchmark metadata and list of results
+    """
+    results = []
+    for scen in scens:
+        for drop in drops:
+            for stage in stages:
+                runs = []
+                for _ in range(repeat):
+                    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                        runs.append(pool.apply(run_stage, (datapath, scen, drop, stage, t, algorithm)))
+                timed = [r for r in runs if r["wall_time"] is not None]
+                results.append(min(timed, key=lambda r: r["wall_time"]) if timed else runs[0])
+                print_result(results[-1])
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec='seconds'),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "igraph": ig.__version__,
+            "t": t,
+            "algorithm": algorithm,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    return report
+
+
+def print_result(r):
+    """
+    Print a single benchmark result.
+    """
+    if r["wall_time"] is None:
+        print(f"{r['scenario']:<26}{r['drop']:>5}  {r['stage']:<12}{r['status']:>10}")
+    else:
+        print(f"{r['scenario']:<26}{r['drop']:>5}  {r['stage']:<12}{r['wall_time']:>10.4f} s"
+              f"{r['peak_rss']:>10.1f} MB  {r['status']}")
+
+
+def summarize(report):
+    """
+    Average the wall time and peak RSS of every scenario and stage over all
+    drops.
+
+    Params
+    ------
+    report : dict
+        Benchmark report, as returned by `run_benchmark`
+
+    Return
+    ------
+    summary : dict
+        (scenario, stage) -> {"wall_time", "peak_rss"}
+    """
+    groups = {}
+    for r in report["results"]:
+        if r["wall_time"] is not None:
+            groups.setdefault((r["scenario"], r["stage"]), []).append(r)
+
+    return {key: {"wall_time": np.mean([r["wall_time"] for r in group]),
+                  "peak_rss": np.mean([r["peak_rss"] for r in group])}
+            for key, group in groups.items()}
+
+
+def compare(report, baseline, threshold=0.2, min_time=5e-3):
+    """
+    Compare a benchmark report against a stored baseline and flag the
+    regressions.
+
+    Params
+    ------
+    report : dict
+        Benchmark report, as returned by `run_benchmark`
+    baseline : dict
+        Benchmark report of the baseline
+    threshold : float
+        Relative increase in wall time or peak RSS that is a regression
+    min_time : float
+        Wall time differences below this value (s) are never flagged
+
+    Return
+    ------
+    regressions : list
+        (scenario, stage, metric, baseline value, new value) of all regressions
+    """
+    new = summarize(report)
+    base = summarize(baseline)
+
+    print(f"{'scenario':<26}{'stage':<13}{'baseline [s]':>14}{'new [s]':>12}{'ratio':>8}")
+    regressions = []
+    for key in sorted(set(new) & set(base)):
+        old_time, new_time = base[key]["wall_time"], new[key]["wall_time"]
+        ratio = new_time / old_time if old_time > 0 else np.inf
+        flag = ""
+        if new_time > old_time * (1 + threshold) and new_time - old_time > min_time:
+            regressions.append(key + ("wall_time", old_time, new_time))
+            flag = "  REGRESSION"
+        if new[key]["peak_rss"] > base[key]["peak_rss"] * (1 + threshold):
+            regressions.append(key + ("peak_rss", base[key]["peak_rss"], new[key]["peak_rss"]))
+            flag += "  RSS REGRESSION"
+        print(f"{key[0]:<26}{key[1]:<13}{old_time:>14.4f}{new_time:>12.4f}{ratio:>8.2f}{flag}")
+
+    return regressions
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark the network planning pipeline per stage")
+    parser.add_argument("--scenarios", nargs='+', default=scenarios, help="scenario directories")
+    parser.add_argument("--drops", type=int, nargs='+', default=[0], help="drop indices")
+    parser.add_argument("--stages", nargs='+', default=stages, choices=stages, help="stages to measure")
+    parser.add_argument("-t", type=float, default=300, help="CPE throughput requirement in Mbps")
+    parser.add_argument("--algorithm", default='incremental', help="planning algorithm")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements per stage, fastest is kept")
+    parser.add_argument("--datapath", default='../data', help="data directory")
+    parser.add_argument("-o", "--output", default=None, help="JSON file for the results")
+    parser.add_argument("--compare", default=None, help="JSON file of a baseline run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative regression threshold")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.scenarios, args.drops, args.stages, t=args.t,
+                           algorithm=args.algorithm, repeat=args.repeat, datapath=args.datapath)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, threshold=args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.compare}")
+            sys.exit(1)
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fwa import commands
+
+entry_point = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fwa.py')
+
+# Modules that no command needs at startup
+forbidden_modules = ["matplotlib"]
+# Modules of the repository, the imports of third-party packages are not checked
+repo_modules = {os.path.splitext(f)[0] for d in ('core', 'utils')
+                for f in os.listdir(os.path.join(os.path.dirname(entry_point), d)) if f.endswith('.py')}
+repo_modules.add('fwa')
+
+
+def run_startup(args, repeat=5):
+    """
+    Time a short-lived Python process, started in an empty directory, and list
+    the files it leaves behind and the modules it imports.
+
+    Params
+    ------
+    args : list
+        Arguments of the Python interpreter
+    repeat : int
+        Number of runs, the fastest is kept
+
+    Return
+    ------
+    result : dict
+        `time` in s, `files` created in the working directory and `modules`
+        imported, mapped to the module importing them, cf. `python -X importtime`
+    """
+    best = float('inf')
+    files = set()
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as cwd:
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + args, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+            best = min(best, time.perf_counter() - start)
+            files.update(os.listdir(cwd))
+
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=cwd, check=True,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    # Nested imports are listed before the module importing them, one indent deeper
+    lines = [line.split('|')[-1][1:] for line in proc.stderr.splitlines()
+             if line.startswith('import time:') and not line.endswith('package')]
+    depth = [len(line) - len(line.lstrip()) for line in lines]
+    modules = {}
+    for i, line in enumerate(lines):
+        parent = next((lines[j].strip() for j in range(i + 1, len(lines)) if depth[j] < depth[i]), None)
+        modules[line.strip()] = parent
+
+    return {"time": best, "files": sorted(files), "modules": modules}
+
+
+def run_benchmark(commands, repeat=5):
+    """
+    Measure the startup of every command of the entry point, i.e. the time to
+    print its help, against the startup of a bare interpreter.
+
+    Params
+    ------
+    commands : list
+        Commands of `fwa.py`
+    repeat : int
+        Number of runs per command, the fastest is kept
+
+    Return
+    ------
+    report : dict
+        Command -> result of `run_startup`, with `python` for the bare interpreter
+    """
+    report = {"python": run_startup(['-c', 'pass'], repeat)}
+    print(f"{'python':<10} {report['python']['time'] * 1e3:8.1f} ms")
+    for command in commands:
+        r = run_startup([entry_point, command, '--help'], repeat)
+        report[command] = r
+        print(f"{command:<10} {r['time'] * 1e3:8.1f} ms, {len(r['modules']):4d} modules")
+
+    return report
+
+
+def check(report, max_time=None):
+    """
+    Return the failed startup checks: files created by a command, e.g. log
+    files, forbidden modules imported by the repository, or a startup slower
+    than `max_time` s. igraph imports matplotlib by itself when it is installed,
+    which is not counted against the commands.
+    """
+    failures = []
+    for command, r in report.items():
+        if r["files"]:
+            failures.append(f"{command}: created {', '.join(r['files'])}")
+        loaded = [f"{m} from {parent}" for m, parent in r["modules"].items()
+                  if m.split('.')[0] in forbidden_modules and parent in repo_modules]
+        if loaded:
+            failures.append(f"{command}: imported {', '.join(loaded)}")
+        if max_time is not None and r["time"] > max_time:
+            failures.append(f"{command}: startup of {r['time'] * 1e3:.1f} ms")
+
+    return failures
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark the startup of the command line entry point")
+    parser.add_argument("--commands", nargs='+', default=list(commands), choices=list(commands),
+                        help="commands to measure")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per command, fastest is kept")
+    parser.add_argument("--max-time", type=float, default=None, help="maximum startup time in s")
+    parser.add_argument("-o", "--output", default=None, help="JSON file for the results")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.commands, repeat=args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failures = check(report, max_time=args.max_time)
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+
+import sys
+import os
+import logging
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+
+from util_cache import load_cached
+from util_spatial import grid_index, query_pairs
+from util_los import get_los, read_buildings, wall_index
+from graph_extension import read_locations, add_edge_nodes
+from util_network import get_graph
+
+logger = logging.getLogger(__name__)
+
+
+def get_relay_candidates(x, y, membership, max_distance):
+    """
+    Propose candidate EDGE locations between unconnected clusters. For every pair
+    of clusters at most 2 * `max_distance` apart, the candidate is the midpoint of
+    the closest pair of devices, which can reach both devices.
+
+    Params
+    ------
+    x, y : np.ndarray
+        Device locations in m
+    membership : np.ndarray
+        Cluster of each device
+    max_distance : float
+        Maximum link distance in m
+
+    Return
+    ------
+    cand_x, cand_y : np.ndarray
+        Candidate EDGE locations in m
+    """
+    index = grid_index(x, y, 2 * max_distance)
+    i, j, dist = query_pairs(index, x, y, 2 * max_distance)
+    keep = (i < j) & (membership[i] != membership[j])
+    i, j, dist = i[keep], j[keep], dist[keep]
+
+    # Closest pair of devices of every pair of clusters
+    nb_clusters = membership.max(initial=-1) + 1
+    a = np.minimum(membership[i], membership[j])
+    b = np.maximum(membership[i], membership[j])
+    order = np.argsort(dist, kind='stable')
+    _, first = np.unique((a * nb_clusters + b)[order], return_index=True)
+    i, j = i[order[first]], j[order[first]]
+
+    return (x[i] + x[j]) / 2, (y[i] + y[j]) / 2
+
+
+def place_edge_nodes(g, locations, max_distance, max_edge_nodes=None, walls=None, edge_height=14.0,
+                     cpe_height=4.0):
+    """
+    Propose a small set of EDGE locations that reconnect the unconnected clusters
+    of a graph to the cluster of the PoP. Candidate locations are scored by the
+    number of clusters within `max_distance` m, and the candidate that merges most
+    clusters is picked greedily (set cover), until no candidate merges clusters any
+    more. EDGE devices that do not end up in the cluster of the PoP are dropped.
+    Clusters that are more than 2 * `max_distance` m away from any other cluster
+    cannot be reached. EDGE devices already in the graph only count through the
+    clusters they connect, new EDGE devices are linked to CPE and PoP devices.
+
+    The links of the EDGE devices are only tested for line-of-sight when `walls` are
+    given, otherwise every device within `max_distance` m is assumed to be in
+    line-of-sight.
+
+    Params
+    ------
+    g : iGraph or dict
+        Graph with POP and CPE devices, or its array representation, cf. `get_network`
+    locations : dict
+        CPE locations, as returned by `read_locations`
+    max_distance : float
+        Maximum link distance in m
+    max_edge_nodes : int
+        Maximum number of EDGE devices to place
+    walls : tuple
+        Walls and their grid index, as returned by `read_buildings` and `wall_index`
+        in util_los, to keep only the links of the EDGE devices with line-of-sight
+    edge_height, cpe_height : float
+        Antenna heights above ground in m of the EDGE and CPE devices, for the
+        line-of-sight test
+
+    Return
+    ------
+    edge_nodes : dict
+        EDGE devices and links, in the format of `read_edge_nodes`
+    """
+    g = get_graph(g)
+    membership = np.array(g.connected_components().membership, dtype=np.int64)
+    nb_clusters = membership.max(initial=-1) + 1
+    types = np.array(g.vs["type"])
+    pop = np.flatnonzero(types == 'PoP')
+    root = membership[pop[0]] if len(pop) else np.argmax(np.bincount(membership))
+
+    # Devices with a location, i.e. all but the EDGE devices already placed
+    ids = np.array(g.vs["id"], dtype=np.int64)
+    devices = np.flatnonzero((types != 'EDGE') & (ids < len(locations["x"])))
+    ids = ids[devices]
+    membership = membership[devices]
+    x = locations["x"][ids]
+    y = locations["y"][ids]
+
+    # Devices within reach of every candidate location
+    cand_x, cand_y = get_relay_candidates(x, y, membership, max_distance)
+    cand, node, _ = query_pairs(grid_index(x, y, max_distance), cand_x, cand_y, max_distance)
+    if walls is not None:
+        los = get_los(*walls, cand_x[cand], cand_y[cand], np.full(len(cand), edge_height),
+                      x[node], y[node], np.full(len(cand), cpe_height))
+        logger.info("%s of %s EDGE candidate links have line-of-sight", np.sum(los), len(los))
+        cand, node = cand[los], node[los]
+
+    # Greedy set cover: label[c] is the cluster that cluster c has been merged into
+    label = np.arange(nb_clusters)
+    chosen = []
+    while max_edge_nodes is None or len(chosen) < max_edge_nodes:
+        cand_label = label[membership[node]]
+        pairs = np.unique(cand * nb_clusters + cand_label)
+        gain = np.bincount(pairs // nb_clusters, minlength=len(cand_x)) - 1
+        touches_root = np.zeros(len(cand_x), dtype=bool)
+        touches_root[pairs[pairs % nb_clusters == label[root]] // nb_clusters] = True
+        if gain.size == 0 or gain.max() < 1:
+            break
+
+        best = np.argmax(gain + 0.5 * touches_root)
+        merged = np.unique(cand_label[cand == best])
+        target = label[root] if touches_root[best] else merged[0]
+        label[np.isin(label, merged)] = target
+        chosen.append(best)
+
+    # Only keep the EDGE devices connected to the PoP
+    chosen = [c for c in chosen if label[membership[node[cand == c][0]]] == label[root]]
+    unreached = np.unique(label[membership][label[membership] != label[root]])
+    if unreached.size:
+        logger.warning("%s clusters cannot be reconnected within %s m", unreached.size, max_distance)
+    logger.info("Placed %s EDGE devices to reconnect %s of %s clusters",
+                len(chosen), nb_clusters - 1 - unreached.size, nb_clusters - 1)
+
+    links = np.isin(cand, chosen)
+    edge_id = np.searchsorted(np.sort(chosen), cand[links])
+    edge_nodes = {
+        "cpe_id": ids[node[links]],
+        "edge_id": edge_id,
+        "edge_x_loc": cand_x[cand[links]],
+        "edge_y_loc": cand_y[cand[links]],
+    }
+    return edge_nodes
+
+
+def edge_placement(g, cpe_loc, max_distance, print_stats=True, cache_dir=None, max_edge_nodes=None,
+                   environment=None):
+    """
+    Extend an existing graph with EDGE devices placed to reconnect its unconnected
+    clusters, cf. `place_edge_nodes`
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph with CPE and POP devices, or its array representation, cf.
+        `get_network`
+    cpe_loc : str
+        Relative path towards data file with the locations of CPE devices
+    max_distance : float
+        Maximum link distance in m
+    print_stats : bool
+        Print graph statistics to terminal console
+    cache_dir : str
+        Directory of the binary cache of parsed data sets, cf. `load_cached`
+    max_edge_nodes : int
+        Maximum number of EDGE devices to place
+    environment : str
+        Relative path towards the environment directory with `Buildings.shp`. If set,
+        the links of the EDGE devices are tested for line-of-sight, otherwise they are
+        not verified.
+
+    Return
+    ------
+    g : iGraph
+        Graph with POP, CPE, and EDGE devices (represented by vertices)
+    """
+    if not os.path.isfile(cpe_loc):
+        print("CRITICAL: Input file does not exist")
+        return -1
+
+    locations = load_cached(cpe_loc, read_locations, cache_dir)
+    walls = None
+    if environment is not None:
+        walls = read_buildings(os.path.join(environment, 'Buildings.shp'))
+        walls = (walls, wall_index(walls))
+    edge_nodes = place_edge_nodes(g, locations, max_distance, max_edge_nodes, walls)
+
+    return add_edge_nodes(g, edge_nodes, locations, print_stats)
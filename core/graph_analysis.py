@@ -3,34 +3,40 @@
 import sys
 import os
 import logging
+import argparse
 
 import igraph as ig
 import numpy as np
 import csv
 
-sys.path.append('../utils/')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
 
 from fileinput import filename
 from graph_creation import graph_creation
 from util_graph import get_connected_clusters
+from util_network import get_graph
+from util_profile import profiled
+
+logger = logging.getLogger(__name__)
 
 # Change to logging.DEBUG, .INFO, .WARNING, .ERROR, .CRITICAL
 log_level = logging.INFO
 log_format = "[%(asctime)s] - {%(module)s:%(lineno)d} - %(levelname)s - %(message)s"
 datefmt = '%d-%b-%y %H:%M:%S'
 log_fn = 'graph_analysis.log'
-logging.basicConfig(filename=log_fn, level=log_level,
-                    format=log_format, datefmt=datefmt)
 
 
-def graph_analysis(g, print_stats=True, weighted_stats=True, return_stats=False):
+@profiled
+def graph_analysis(g, print_stats=True, weighted_stats=True, return_stats=False, block_size=None,
+                   metrics=None):
     """
     Analyses an input graph and returns certain graph properties.
 
     Params
     ------
     dataset : graph
-        a graph object created via create_graph.
+        a graph object created via create_graph, or its array representation,
+        cf. `get_network`.
     print_stats : bool
         Prints statistics of the graph. Default is `True`.
     weighted_stats : bool
@@ -42,6 +48,14 @@ def graph_analysis(g, print_stats=True, weighted_stats=True, return_stats=False)
             * diameter
     return_stats: bool
         When `True`, return graph properties. Default is `False`.
+    block_size : int
+        When set, distance metrics are computed in blocks of `block_size`
+        source vertices, cf. `get_graph_metrics`. Default is `None`.
+    metrics : list[str]
+        Names of the metrics to compute, cf. `graph_metrics`. Metrics that are
+        not selected are returned as `None`. Default is `None`, in which case
+        all metrics are computed. All metrics are computed when `print_stats`
+        is `True`.
 
     Returns
     -------
@@ -66,6 +80,7 @@ def graph_analysis(g, print_stats=True, weighted_stats=True, return_stats=False)
     """
 
     # Verify that the input parameter is a graph
+    g = get_graph(g)
     if not isinstance(g, ig.Graph):
         print(f"Parameter `g` must be a Graph object")
         assert False 
@@ -80,49 +95,58 @@ def graph_analysis(g, print_stats=True, weighted_stats=True, return_stats=False)
         edge_weights = g.es["weight"]
     except:
         edge_weights = None
-        logging.error("No weights are assigned.")
-
-    # Get some graph statistics
-    (_, _, weighted_ecc, radius, diameter, 
-        avg_path_length, char_path_length, 
-        avg_hop, avg_hop_count) = get_distance_metrics(g, edge_weights)
-    deg = g.degree()
-    betweenness = g.betweenness(weights=edge_weights)
-    ecc = g.eccentricity()
+        logger.error("No weights are assigned.")
+
+    # Get some graph statistics, all distance based metrics are derived from
+    # a single computation of the weighted and hop count distances
+    if metrics is None or print_stats:
+        metrics = graph_metrics
+    stats = get_graph_metrics(g, edge_weights, metrics, block_size=block_size)
+    weighted_ecc = stats["eccentricity"]
+    radius = stats["radius"]
+    diameter = stats["diameter"]
+    avg_path_length = stats["avg_path_length"]
+    char_path_length = stats["characteristic_path_length"]
+    avg_hop = stats["avg_path_length_hop"]
+    avg_hop_count = stats["avg_hop_count"]
+    deg = stats["degree"]
+    betweenness = stats["betweenness"]
+    ecc = stats["eccentricity_hop"]
 
     # Try accessing eccentricity
-    try:
-        tmp = ecc.index(0)
-    except ValueError:
-        logging.info("No vertex has eccentricity 0")
+    if ecc is not None:
+        try:
+            tmp = ecc.index(0)
+        except ValueError:
+            logger.info("No vertex has eccentricity 0")
 
     if print_stats:
-        logging.info(f"Graph degree: {deg}")
-        logging.info(f"Graph eccentricity (hop count): {ecc}")
-        logging.info(f"Vertex betweenness: {betweenness}")
-        logging.info(f"Edge betweenness: {g.edge_betweenness()}") 
+        logger.info("Graph degree: %s", deg)
+        logger.info("Graph eccentricity (hop count): %s", ecc)
+        logger.info("Vertex betweenness: %s", betweenness)
+        logger.info("Edge betweenness: %s", stats['edge_betweenness']) 
         print(f"Average graph degree: {np.mean(deg)}")
         print(f"Average vertex betweenness: {np.mean(betweenness)}")
-        print(f"Graph diameter (hop count): {g.diameter()}")
+        print(f"Graph diameter (hop count): {stats['diameter_hop']}")
         
         print(f"Average graph eccentricity (hop count): {np.mean(ecc)}")
         try:
             print(f"Non-connected element with zero ecc: {ecc.index(0)}")
         except ValueError:
             print("No vertex has eccentricity 0")
-        print(f"Graph radius (hop count): {g.radius()}")
+        print(f"Graph radius (hop count): {stats['radius_hop']}")
         print(f"Graph diameter (incl. weights): {diameter}")
-        logging.info(f"Graph eccentricity (incl. weights): {weighted_ecc}")
+        logger.info("Graph eccentricity (incl. weights): %s", weighted_ecc)
         print(f"Average graph eccentricity (incl. weights): {np.mean(weighted_ecc)}")
         try:
             print(f"Non-connected element with zero ecc: {list(weighted_ecc).index(0)}")
         except ValueError:
             print("No vertex has eccentricity 0")
         print(f"Graph radius (incl. weights): {radius}")
-        logging.info(f"Average path length: {avg_path_length}")
+        logger.info("Average path length: %s", avg_path_length)
         print(f"Average path length: {np.mean(avg_path_length)}")
         print(f"Characteristic path length: {char_path_length}")
-        logging.info(f"Average hop count per node: {avg_hop}")
+        logger.info("Average hop count per node: %s", avg_hop)
         print(f"Average hop count of graph: {np.mean(avg_hop)}")
         print(f"Characteristic hop count of graph: {np.median(avg_hop)}")
         print("\n")
@@ -141,8 +165,8 @@ def graph_analysis(g, print_stats=True, weighted_stats=True, return_stats=False)
         diameter = diameter
     else:
         ecc = ecc
-        radius = g.radius()
-        diameter = g.diameter()
+        radius = stats["radius_hop"]
+        diameter = stats["diameter_hop"]
 
     if return_stats:
         return (g, ecc, radius, diameter, 
@@ -176,29 +200,41 @@ def format_edges(g, index_slice):
 
     sorted_idx = np.argsort(np.array(edgeA))
     for i in sorted_idx:
-        logging.info(
-            f"Edge {edgeA[i]} ({typeA[i]}) -> {edgeB[i]} ({typeB[i]}): weight {weights[i]}")
+        logger.info("Edge %s (%s) -> %s (%s): weight %s", edgeA[i], typeA[i], edgeB[i], typeB[i], weights[i])
 
 
-def get_distance_metrics(g, edge_weights=None, print_stats=False):
+@profiled
+def get_distance_metrics(g, edge_weights=None, print_stats=False, adjacency=True, block_size=None):
     """
     Calculates distance metrics seen in the course notes. This function exists
     as igraph does not support distance measures (e.g. eccentricity) that take
     the edge weights into account. Only hop-count is used.
 
+    With `block_size` set, the shortest paths are searched for blocks of
+    `block_size` source vertices at a time, and each block is reduced to
+    per-vertex maxima and sums before the next block is searched. At most a
+    `block_size` x V slice of a distance matrix is held in memory, so the
+    distance matrices are not returned.
+
     Params
     ------
     g : Graph
         Graph for which distance metrics need to be calculated
     edge_weights: list
         Weights of all edges in g
+    adjacency : bool
+        Return the adjacency matrix. Default is `True`.
+    block_size : int
+        Number of source vertices per block. Default is `None`, in which case
+        the full distance matrices are computed.
 
     Returns
     -------
     adj : np.ndarray
-        Adjacency matrix
+        Adjacency matrix, `None` if `adjacency` is `False`
     dist_matrix : np.ndarray
-        Distance matrix: M[i, j] = distance(i, j)
+        Distance matrix: M[i, j] = distance(i, j), `None` if `block_size` is
+        set
     eccentricity : np.ndarray
         Eccentricity, found with the formula from Ch6, slide 17
     radius : float
@@ -215,18 +251,30 @@ def get_distance_metrics(g, edge_weights=None, print_stats=False):
         Average hop count of full graph
     """
 
-    adj = np.array(g.get_adjacency(attribute='weight').data)
-    dist_matrix = np.array(g.shortest_paths(weights=edge_weights))
+    adj = np.array(g.get_adjacency(attribute='weight').data) if adjacency else None
 
-    eccentricity = np.array([np.max(row) for row in dist_matrix])
-    radius = np.min(eccentricity)
-    diameter = np.max(dist_matrix)
-    avg_path_length = np.sum(dist_matrix, axis=0)/(dist_matrix.shape[0] - 1)
-    characteristic_path_length = np.median(avg_path_length)
+    if block_size is None:
+        dist_matrix = np.array(g.shortest_paths(weights=edge_weights))
 
-    dist_matrix_hop = np.array(g.shortest_paths())
-    avg_path_length_hop = np.sum(dist_matrix_hop, axis=0) / (dist_matrix_hop.shape[0] - 1)
-    avg_hop_count = np.mean(avg_path_length_hop)
+        eccentricity = np.array([np.max(row) for row in dist_matrix])
+        radius = np.min(eccentricity)
+        diameter = np.max(dist_matrix)
+        avg_path_length = np.sum(dist_matrix, axis=0)/(dist_matrix.shape[0] - 1)
+        characteristic_path_length = np.median(avg_path_length)
+
+        dist_matrix_hop = np.array(g.shortest_paths())
+        avg_path_length_hop = np.sum(dist_matrix_hop, axis=0) / (dist_matrix_hop.shape[0] - 1)
+        avg_hop_count = np.mean(avg_path_length_hop)
+    else:
+        dist_matrix = None
+        stats = get_graph_metrics(g, edge_weights, distance_metrics, block_size=block_size)
+        eccentricity = stats["eccentricity"]
+        radius = stats["radius"]
+        diameter = stats["diameter"]
+        avg_path_length = stats["avg_path_length"]
+        characteristic_path_length = stats["characteristic_path_length"]
+        avg_path_length_hop = stats["avg_path_length_hop"]
+        avg_hop_count = stats["avg_hop_count"]
 
     if print_stats:
         print(f"Eccentricity: {eccentricity}")
@@ -242,11 +290,128 @@ def get_distance_metrics(g, edge_weights=None, print_stats=False):
            avg_path_length_hop, avg_hop_count)
 
 
-if __name__ == '__main__':
+# Metrics derived from the weighted distances
+weighted_metrics = ["eccentricity", "radius", "diameter", "avg_path_length",
+                    "characteristic_path_length"]
+# Metrics derived from the hop count distances
+hop_metrics = ["eccentricity_hop", "radius_hop", "diameter_hop", "avg_path_length_hop",
+               "avg_hop_count"]
+# Metrics returned by `get_distance_metrics`
+distance_metrics = weighted_metrics + ["avg_path_length_hop", "avg_hop_count"]
+# All metrics supported by `get_graph_metrics`
+graph_metrics = (["degree", "betweenness", "edge_betweenness"] + weighted_metrics
+                 + hop_metrics)
 
-    if len(sys.argv) == 2:
-        g = graph_creation(sys.argv[1])
-        graph_analysis(g)
-    else:
-        print("Missing input data")
-        print("Usage: graph_analysis.py graph_data_file")
+
+@profiled
+def get_graph_metrics(g, edge_weights=None, metrics=None, block_size=None):
+    """
+    Single-pass analysis engine. The weighted and hop count distances are
+    computed at most once, and all selected distance metrics are derived from
+    them. Only the distances that are needed for the selected metrics are
+    computed.
+
+    The distances are searched for blocks of `block_size` source vertices at a
+    time, and each block is reduced to per-vertex maxima and sums before the
+    next block is searched, so at most a `block_size` x V slice of a distance
+    matrix is held in memory.
+
+    Params
+    ------
+    g : Graph
+        Graph for which the metrics need to be calculated
+    edge_weights: list
+        Weights of all edges in g
+    metrics : list[str]
+        Names of the metrics to compute, see `graph_metrics`. Default is
+        `None`, in which case all metrics are computed.
+    block_size : int
+        Number of source vertices per block. Default is `None`, in which case
+        all sources are searched at once.
+
+    Returns
+    -------
+    stats : dict
+        Selected metrics by name, `None` for metrics that are not selected.
+        Weighted metrics are named as in `get_distance_metrics`, hop count
+        metrics have the suffix `_hop`. Hop count eccentricities are returned
+        as a list, like `Graph.eccentricity`.
+    """
+
+    if metrics is None:
+        metrics = graph_metrics
+    for m in metrics:
+        if m not in graph_metrics:
+            raise ValueError(f"Unknown graph metric `{m}`")
+    stats = dict.fromkeys(graph_metrics)
+
+    n = g.vcount()
+    if block_size is None:
+        block_size = max(n, 1)
+    weighted = any(m in weighted_metrics for m in metrics)
+    hop = any(m in hop_metrics for m in metrics)
+
+    eccentricity = np.zeros(n)
+    dist_sum = np.zeros(n)
+    eccentricity_hop = np.zeros(n)
+    hop_sum = np.zeros(n)
+    for start in range(0, n if (weighted or hop) else 0, block_size):
+        sources = range(start, min(start + block_size, n))
+        if weighted:
+            block = np.array(g.distances(source=sources, weights=edge_weights))
+            eccentricity[start:start + len(sources)] = np.max(block, axis=1)
+            # Add row by row, in the same order as the full column sums
+            for row in block:
+                dist_sum += row
+        if hop:
+            block = np.array(g.distances(source=sources))
+            # Unreachable vertices are ignored, like in `Graph.eccentricity`
+            finite = np.where(np.isfinite(block), block, 0)
+            eccentricity_hop[start:start + len(sources)] = np.max(finite, axis=1)
+            for row in block:
+                hop_sum += row
+
+    if weighted:
+        stats["eccentricity"] = eccentricity
+        stats["radius"] = np.min(eccentricity)
+        stats["diameter"] = np.max(eccentricity)
+        stats["avg_path_length"] = dist_sum / (n - 1)
+        stats["characteristic_path_length"] = np.median(stats["avg_path_length"])
+    if hop:
+        stats["eccentricity_hop"] = eccentricity_hop.tolist()
+        stats["radius_hop"] = int(np.min(eccentricity_hop))
+        stats["diameter_hop"] = int(np.max(eccentricity_hop))
+        stats["avg_path_length_hop"] = hop_sum / (n - 1)
+        stats["avg_hop_count"] = np.mean(stats["avg_path_length_hop"])
+
+    if "degree" in metrics:
+        stats["degree"] = g.degree()
+    if "betweenness" in metrics:
+        stats["betweenness"] = g.betweenness(weights=edge_weights)
+    if "edge_betweenness" in metrics:
+        stats["edge_betweenness"] = g.edge_betweenness()
+
+    # Only return the selected metrics
+    for m in graph_metrics:
+        if m not in metrics:
+            stats[m] = None
+
+    return stats
+
+
+def main(argv=None):
+    """
+    Command line interface, cf. `fwa.py`.
+    """
+    parser = argparse.ArgumentParser(description="Analyse the graph of a links data set")
+    parser.add_argument("dataset", help="links data set, e.g. ../data/UC1_100CPE_UrbanVillage/links_0.csv")
+    args = parser.parse_args(argv)
+    logging.basicConfig(filename=log_fn, level=log_level,
+                        format=log_format, datefmt=datefmt)
+
+    g = graph_creation(args.dataset)
+    graph_analysis(g)
+
+
+if __name__ == '__main__':
+    main()
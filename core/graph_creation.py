@@ -3,29 +3,177 @@
 import sys
 import os
 import logging
+import argparse
 
 import igraph as ig
 import numpy as np
 import csv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+
+from util_cache import load_cached
+from util_profile import profiled, profile_stage
+
+logger = logging.getLogger(__name__)
+
 # Change to logging.DEBUG, .INFO, .WARNING, .ERROR, .CRITICAL
-log_level = logging.DEBUG
+log_level = logging.INFO
 log_format = "[%(asctime)s] - {%(module)s:%(lineno)d} - %(levelname)s - %(message)s"
 datefmt = '%d-%b-%y %H:%M:%S'
 log_fn = 'graph_creation.log'
-logging.basicConfig(filename=log_fn, level=log_level,
-                    format=log_format, datefmt=datefmt)
 
-def graph_creation(dataset, print_stats=True):
+@profiled
+def read_links(dataset):
+    """
+    Columnar parser for a links data set generated via the GRAND tool. Only the
+    columns needed to build the graph are read, in a single pass, into NumPy
+    arrays.
+
+    Params
+    ------
+    dataset : str
+        Relative path towards the data set
+
+    Return
+    ------
+    links : dict
+        Dictionary with arrays `nodeA`, `nodeB` (int) and `distance`,
+        `maxbitrate`, `maxpathloss` (float), one entry per row of the data set
+    """
+
+    # Column indices of the GRAND links format
+    nodeA_column = 0
+    nodeAtype_column = 1
+    nodeB_column = 2
+    nodeBtype_column = 3
+    distance_column = 4
+    maxpathloss_column = 7
+    maxbitrate_column = 9
+
+    with open(dataset, 'r') as csvFile:
+        row = next(csv.reader(csvFile))
+        assert row[nodeA_column] == "NodeAid"
+        assert row[nodeAtype_column] == "NodeAType"
+        assert row[nodeB_column] == "NodeBid"
+        assert row[nodeBtype_column] == "NodeBType"
+        assert row[distance_column] == "distance"
+        assert row[maxbitrate_column] == "maxbitrate"
+        assert row[maxpathloss_column] == "maxPathLoss"
+
+        columns = (nodeA_column, nodeB_column, distance_column,
+                   maxbitrate_column, maxpathloss_column)
+        data = np.loadtxt(csvFile, delimiter=',', quotechar='"',
+                          usecols=columns, dtype=float, ndmin=2)
+
+    links = {
+        "nodeA": data[:, 0].astype(np.int64),
+        "nodeB": data[:, 1].astype(np.int64),
+        "distance": data[:, 2],
+        "maxbitrate": data[:, 3],
+        "maxpathloss": data[:, 4],
+    }
+    return links
+
+
+@profiled
+def deduplicate_links(nodeA, nodeB):
+    """
+    Return the indices of the unique undirected links. The data sets list each
+    link in both directions, (A, B) and (B, A), so links are canonicalized to
+    (min, max) pairs and the first occurrence of each pair is kept.
+
+    Params
+    ------
+    nodeA : np.ndarray
+        Node ids of the first end point of each link
+    nodeB : np.ndarray
+        Node ids of the second end point of each link
+
+    Return
+    ------
+    idx : np.ndarray
+        Row indices of the unique links, sorted by (min, max) node id
+    """
+
+    lo = np.minimum(nodeA, nodeB)
+    hi = np.maximum(nodeA, nodeB)
+    key = lo * (int(hi.max(initial=0)) + 1) + hi
+    _, idx = np.unique(key, return_index=True)
+
+    return idx
+
+
+def read_pop_ids(basestations):
+    """
+    Return the ids of the PoP devices, i.e. the devices with `BSType` POP, of a
+    data set with devices generated via the GRAND tool.
+
+    Params
+    ------
+    basestations : str
+        Relative path towards the `basestations_N.csv` data set
+
+    Return
+    ------
+    pop_ids : list[int]
+        Ids of the PoP devices
+    """
+
+    with open(basestations, 'r') as csvFile:
+        reader = csv.reader(csvFile)
+        row = next(reader)
+        assert row[0] == "id"
+        assert row[12] == "BSType"
+        pop_ids = [int(r[0]) for r in reader if r[12] == "POP"]
+
+    return pop_ids
+
+
+def set_pops(g, pop_ids):
+    """
+    Mark the vertices with the given ids as PoP, and all other PoP vertices as CPE.
+
+    Params
+    ------
+    g : iGraph
+        Input graph
+    pop_ids : list[int]
+        Vertex ids (attribute `id`) of the PoPs
+
+    Return
+    ------
+    g : iGraph
+        Graph with the vertex attribute `type` updated
+    """
+
+    pop_ids = set(pop_ids)
+    g.vs["type"] = ['PoP' if v in pop_ids else ('CPE' if tp == 'PoP' else tp)
+                    for v, tp in zip(g.vs["id"], g.vs["type"])]
+
+    return g
+
+
+@profiled
+def graph_creation(dataset, print_stats=True, cache_dir=None, basestations=None):
     """ 
     Graph creation function, transforming a data set generated via the GRAND tool into a graph. 
 
+    Links that appear more than once in the data set (in either direction) are
+    added once, using the attributes of their first occurrence in the file.
+
     Params
     ------
     dataset : str
         Relative path towards the data set
     print_stats : bool
         Print graph statistics to terminal console
+    cache_dir : str
+        Directory of the binary cache of parsed data sets, cf. `load_cached`.
+        If `None`, the data set is always parsed.
+    basestations : str
+        Relative path towards the `basestations_N.csv` data set. If set, the PoPs
+        are taken from its `BSType` column, cf. `read_pop_ids`, instead of only
+        vertex 0.
  
 
     Return
@@ -35,82 +183,79 @@ def graph_creation(dataset, print_stats=True):
     """
 
     if os.path.isfile(dataset):
-        logging.info("Creating graph with data set: " + dataset)
+        logger.info("Creating graph with data set: %s", dataset)
     else:
-        logging.critical("CRITICAL: Input file does not exist")
+        logger.critical("CRITICAL: Input file does not exist")
         return -1
 
     # Parse input CSV data
-    nodeA_column = 0
-    nodeAtype_column = 1
-    nodeB_column = 2
-    nodeBtype_column = 3
-    distance_column = 4
-    maxbitrate_column = 9
-    maxpathloss_column = 7
-    nodeA = []
-    nodeA_type = []
-    nodeB = []
-    nodeB_type = []
-    weights = []
-    with open(dataset, 'r') as csvFile:
-        reader = csv.reader(csvFile)
-        it = 0
-        for row in reader:
-            if it == 0:
-                it += 1
-                assert row[nodeA_column] == "NodeAid"
-                assert row[nodeAtype_column] == "NodeAType"
-                assert row[nodeB_column] == "NodeBid"
-                assert row[nodeBtype_column] == "NodeBType"
-                assert row[distance_column] == "distance"
-                assert row[maxbitrate_column] == "maxbitrate"
-                assert row[maxpathloss_column] == "maxPathLoss"
-                continue
-            try:
-                nodeA.append(int(row[nodeA_column]))
-                nodeA_type.append((row[nodeAtype_column]))
-                nodeB.append(int(row[nodeB_column]))
-                nodeB_type.append((row[nodeBtype_column]))
-                weights.append(float(row[distance_column]))
-            except:
-                print("Error parsing graph data")
-                return -1
+    try:
+        links = load_cached(dataset, read_links, cache_dir)
+    except ValueError:
+        print("Error parsing graph data")
+        return -1
+
+    g = graph_from_links([links], print_stats=print_stats)
+    if basestations is not None:
+        g = set_pops(g, read_pop_ids(basestations))
+
+    return g
+
+
+@profiled
+def graph_from_links(chunks, nb_cpe_nodes=None, print_stats=True):
+    """
+    Build a graph from links that are already in memory, e.g. streamed chunk by
+    chunk by `stream_links` in link_generation, without writing a data set.
+
+    Links that appear more than once within a chunk (in either direction) are
+    added once, using the attributes of their first occurrence. Links are not
+    deduplicated across chunks.
+
+    Params
+    ------
+    chunks : iterable of dict
+        Links, with the arrays returned by `read_links`
+    nb_cpe_nodes : int
+        Number of CPE nodes. If `None`, the highest node id of the links is used,
+        so CPE devices without links beyond that id are left out.
+    print_stats : bool
+        Print graph statistics to terminal console
+
+    Return
+    ------
+    g : iGraph
+        Graph with vertices representing CPE devices and edges representing wireless LOS links
+    """
 
     # Construct graph
     g = ig.Graph()
 
-    # Add single PoP node
-    g.add_vertices(1)
-    g.vs["id"] = 0
-    g.vs["type"] = 'PoP'
-
-    # Add all CPE nodes: igraph ids 1 -> nb_cpe_nodes + 1
-    nb_cpe_nodes = np.max(nodeA)
-    cpe_node_id = range(1, nb_cpe_nodes+1)
-    g.add_vertices(nb_cpe_nodes)
-    g.vs[1:]["id"] = cpe_node_id
-    g.vs[1:]["type"] = 'CPE'
-
-    # Get links between EDGE nodes according to input graph data
-    edge_links = [(nodeA[i], nodeB[i], weights[i]) for i in range(len(nodeA))]
-    unique_edge_links = list(set(edge_links))
-    edges = []
-    edge_weights = []
-
-    for x in unique_edge_links:
-        # check if link (A, B) or link (B, A) is already in edges this avoids
-        # adding a duplicate symmetric edge as the graph is undirected e.g. if
-        # (0, 104) is already in edges, do not append (104, 0)
-        edge1 = (x[0], x[1])
-        edge2 = (x[1], x[0])
-        if (edge1 not in edges) and (edge2 not in edges):
-            edges.append(edge1)
-            edge_weights.append(x[2])   # weights are symmetric
-
-    # Add edges to graph
-    g.add_edges(edges)
-    g.es["weight"] = edge_weights  
+    # Add single PoP node and the CPE nodes: igraph ids 1 -> nb_cpe_nodes + 1
+    g.add_vertices(1 + (nb_cpe_nodes or 0))
+
+    for links in chunks:
+        # Add the CPE nodes of this chunk that are not in the graph yet
+        max_id = int(max(np.max(links["nodeA"], initial=0), np.max(links["nodeB"], initial=0)))
+        if max_id >= g.vcount():
+            g.add_vertices(max_id + 1 - g.vcount())
+
+        # Get unique links between nodes according to input graph data, this
+        # avoids adding a duplicate symmetric edge as the graph is undirected e.g.
+        # if (0, 104) is already in edges, do not add (104, 0)
+        idx = deduplicate_links(links["nodeA"], links["nodeB"])
+        edges = np.column_stack((links["nodeA"][idx], links["nodeB"][idx]))
+
+        # Add edges to graph, weights are symmetric
+        with profile_stage("add_edges", nb_edges=len(idx)):
+            g.add_edges(edges.tolist(), attributes={
+                "weight": links["distance"][idx].tolist(),
+                "maxbitrate": links["maxbitrate"][idx].tolist(),
+                "maxpathloss": links["maxpathloss"][idx].tolist(),
+            })
+
+    g.vs["id"] = list(range(g.vcount()))
+    g.vs["type"] = ['PoP'] + ['CPE'] * (g.vcount() - 1)
 
     # Visualize graph
     if print_stats:
@@ -119,10 +264,19 @@ def graph_creation(dataset, print_stats=True):
 
     return g
 
-if __name__ == '__main__':
 
-    if len(sys.argv) == 2:
-        graph_creation(sys.argv[1])
-    else:
-        print("Missing input data")
-        print("Usage: graph_analysis.py graph_data_file")
+def main(argv=None):
+    """
+    Command line interface, cf. `fwa.py`.
+    """
+    parser = argparse.ArgumentParser(description="Create the graph of a links data set")
+    parser.add_argument("dataset", help="links data set, e.g. ../data/UC1_100CPE_UrbanVillage/links_0.csv")
+    args = parser.parse_args(argv)
+    logging.basicConfig(filename=log_fn, level=log_level,
+                        format=log_format, datefmt=datefmt)
+
+    graph_creation(args.dataset)
+
+
+if __name__ == '__main__':
+    main()
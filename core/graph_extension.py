@@ -1,5 +1,6 @@
 #!/usr/bin/python
 
+import sys
 import os
 import logging
 
@@ -7,34 +8,146 @@ import igraph as ig
 import numpy as np
 import csv
 
-# Logging definitions
-log_level = logging.DEBUG
-log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
-datefmt = '%d-%b-%y %H:%M:%S'
-log_fn = 'graph_extension.log'
-logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
 
+from util_cache import load_cached
+from util_spatial import grid_index, query_pairs
+from util_network import get_network, get_graph, is_network
 
-def graph_extension(g, dataset, cpe_loc, print_stats=True):
+logger = logging.getLogger(__name__)
+
+
+def read_edge_nodes(dataset):
+    """ 
+    Parse a data set with EDGE devices and their links towards CPE devices
+
+    Params
+    ------
+    dataset : str
+        Relative path towards data set with EDGE devices and links
+ 
+
+    Return
+    ------
+    edge_nodes : dict
+        Dictionary with arrays `cpe_id`, `edge_id` (int) and `edge_x_loc`,
+        `edge_y_loc` (float), one entry per link
+    """
+
+    with open(dataset, 'r') as csvFile:
+        row = next(csv.reader(csvFile))
+        assert row[0] == "CPE_id"
+        assert row[1] == "Edge_id"
+        assert row[2] == "Edge_loc_x"
+        assert row[3] == "Edge_loc_y"
+        data = np.loadtxt(csvFile, delimiter=',', quotechar='"', usecols=(0, 1, 2, 3),
+                          dtype=float, ndmin=2)
+
+    edge_nodes = {
+        "cpe_id": data[:, 0].astype(np.int64),
+        "edge_id": data[:, 1].astype(np.int64),
+        "edge_x_loc": data[:, 2],
+        "edge_y_loc": data[:, 3],
+    }
+    return edge_nodes
+
+
+def read_locations(cpe_loc):
+    """ 
+    Parse a data file with the locations of CPE devices
+
+    Params
+    ------
+    cpe_loc : str
+        Relative path towards data file with the locations of CPE devices
+ 
+
+    Return
+    ------
+    locations : dict
+        Dictionary with arrays `x` and `y` (float) with the coordinates in m, indexed by
+        CPE id
+    """
+
+    data = np.loadtxt(cpe_loc, delimiter=',', quotechar='"', skiprows=1, usecols=(1, 2),
+                      dtype=float, ndmin=2)
+
+    locations = {
+        "x": data[:, 0],
+        "y": data[:, 1],
+    }
+    return locations
+
+
+def get_attachment_candidates(edge_nodes, locations, cpe_ids, max_distance):
+    """ 
+    Propose links between EDGE devices and CPE devices within a maximum link distance,
+    using a grid index over the CPE locations instead of comparing all pairs
+
+    Params
+    ------
+    edge_nodes : dict
+        EDGE devices, as returned by `read_edge_nodes`. The location of each EDGE device is
+        taken from its first entry.
+    locations : dict
+        CPE locations, as returned by `read_locations`
+    cpe_ids : np.ndarray
+        Ids of the CPE devices that can be attached
+    max_distance : float
+        Maximum link distance in m
+ 
+
+    Return
+    ------
+    candidates : dict
+        Candidate links, in the format of `read_edge_nodes`
+    """
+
+    edge_id, first = np.unique(edge_nodes["edge_id"], return_index=True)
+    edge_x = edge_nodes["edge_x_loc"][first]
+    edge_y = edge_nodes["edge_y_loc"][first]
+
+    cpe_ids = np.asarray(cpe_ids, dtype=np.int64)
+    index = grid_index(locations["x"][cpe_ids], locations["y"][cpe_ids], max_distance)
+    edge_idx, cpe_idx, _ = query_pairs(index, edge_x, edge_y, max_distance)
+
+    candidates = {
+        "cpe_id": cpe_ids[cpe_idx],
+        "edge_id": edge_id[edge_idx],
+        "edge_x_loc": edge_x[edge_idx],
+        "edge_y_loc": edge_y[edge_idx],
+    }
+    return candidates
+
+
+def graph_extension(g, dataset, cpe_loc, print_stats=True, cache_dir=None, max_distance=None):
     """ 
     Extend an existing graph by adding EDGE devices that are listed in a separate data set
 
     Params
     ------
-    g : iGraph
-        Input graph with CPE and POP devices
+    g : iGraph or dict
+        Input graph with CPE and POP devices, or its array representation, cf.
+        `get_network`
     dataset : str
         Relative path towards data set with EDGE devices and links
     cpe_loc : str
         Relative path towards data file with the locations of CPE devices
     print_stats : bool
         Print graph statistics to terminal console
+    cache_dir : str
+        Directory of the binary cache of parsed data sets, cf. `load_cached`.
+        If `None`, the data sets are always parsed.
+    max_distance : float
+        If set, the links listed in the data set are replaced by links between each EDGE
+        device and all CPE devices within `max_distance` m, cf. `get_attachment_candidates`
  
 
     Return
     ------
-    g : iGraph
-        Graph with POP, CPE, and EDGE devices (represented by vertices)
+    g : iGraph or dict
+        Graph with POP, CPE, and EDGE devices (represented by vertices), in the
+        representation of the input graph
     """
 
     if os.path.isfile(dataset) and os.path.isfile(cpe_loc):
@@ -44,46 +157,68 @@ def graph_extension(g, dataset, cpe_loc, print_stats=True):
         return -1
 
     # Parse input CSV data of EDGE links
-    cpe_id = []
-    edge_id = []
-    edge_x_loc = []
-    edge_y_loc = []
-    with open(dataset, 'r') as csvFile:
-        reader = csv.reader(csvFile)
-        it = 0
-        for row in reader:
-            if it == 0:
-                it += 1
-                assert row[0] == "CPE_id"
-                assert row[1] == "Edge_id"
-                assert row[2] == "Edge_loc_x"
-                assert row[3] == "Edge_loc_y"
-                continue
-            try:
-                cpe_id.append(int(row[0]))
-                edge_id.append(int(row[1]))
-                edge_x_loc.append(float(row[2]))
-                edge_y_loc.append(float(row[3]))
-            except:
-                print("Error parsing graph data")
-                return -1
+    try:
+        edge_nodes = load_cached(dataset, read_edge_nodes, cache_dir)
+    except ValueError:
+        print("Error parsing graph data")
+        return -1
 
     # Parse input CSV data with CPE locations
-    cpe_x = []
-    cpe_y = []
-    with open(cpe_loc, 'r') as csvFile:
-        reader = csv.reader(csvFile)
-        it = 0
-        for row in reader:
-            if it == 0:
-                it = 1
-                continue
-            cpe_x.append(float(row[1]))
-            cpe_y.append(float(row[2]))
+    locations = load_cached(cpe_loc, read_locations, cache_dir)
+
+    return add_edge_nodes(g, edge_nodes, locations, print_stats, max_distance)
+
+
+def add_edge_nodes(g, edge_nodes, locations, print_stats=True, max_distance=None):
+    """ 
+    Extend an existing graph with EDGE devices and their links to CPE devices
+
+    Params
+    ------
+    g : iGraph or dict
+        Graph with POP and CPE devices (represented by vertices), or its array
+        representation, cf. `get_network`
+    edge_nodes : dict
+        EDGE devices and links, as returned by `read_edge_nodes` or `edge_placement`
+    locations : dict
+        CPE locations, as returned by `read_locations`
+    print_stats : bool
+        Print graph stats
+    max_distance : float
+        If set, the links in `edge_nodes` are replaced by links between each EDGE device
+        and all CPE devices within `max_distance` m, cf. `get_attachment_candidates`
+ 
+
+    Return
+    ------
+    g : iGraph or dict
+        Graph with POP, CPE, and EDGE devices (represented by vertices), in the
+        representation of the input graph
+    """
+
+    network = is_network(g)
+    g = get_graph(g)
+
+    # Map CPE ids to vertex ids
+    vertex_ids = np.array(g.vs["id"], dtype=np.int64)
+    vertex_index = np.full(max(vertex_ids.max(initial=0), edge_nodes["cpe_id"].max(initial=0)) + 1, -1)
+    vertex_index[vertex_ids[::-1]] = np.arange(len(vertex_ids))[::-1]
+
+    nb_edge_nodes = len(np.unique(edge_nodes["edge_id"]))
+    if max_distance is not None:
+        types = np.array(g.vs["type"])
+        edge_nodes = get_attachment_candidates(edge_nodes, locations, vertex_ids[types != 'EDGE'],
+                                               max_distance)
+    cpe_id = edge_nodes["cpe_id"]
+    edge_id = edge_nodes["edge_id"]
+
+    cpe_node = vertex_index[cpe_id]
+    if np.any(cpe_node < 0):
+        print(f"CPE devices {np.unique(cpe_id[cpe_node < 0]).tolist()} are not in the graph")
+        return -1
 
     # Add all EDGE nodes
     nb_cpe_pop_nodes = g.vcount()
-    nb_edge_nodes = len(set(edge_id))
     max_cpe_id = max(g.vs["id"])
     edge_node_id = range(max_cpe_id+1, max_cpe_id+1+nb_edge_nodes)
     g.add_vertices(nb_edge_nodes)
@@ -91,30 +226,22 @@ def graph_extension(g, dataset, cpe_loc, print_stats=True):
     g.vs[nb_cpe_pop_nodes:]["type"] = 'EDGE'
 
     # Get links between EDGE nodes according to input graph data
-    cpe_node_id = g.vs["id"]
-    edges = []
-    edge_weights = []
-    for i in range(len(cpe_id)):
-        # Calculate LOS distance between EDGE and CPE
-        dist = np.sqrt(np.power(cpe_x[cpe_id[i]]-edge_x_loc[i],2)+np.power(cpe_y[cpe_id[i]]-edge_y_loc[i],2))
-        # Find vertex ID of CPE node
-        cpe_node = cpe_node_id.index(cpe_id[i])
-        # Find vertex ID of EDGE node
-        edge_node = edge_id[i] + max_cpe_id + 1
-        edge = (cpe_node, edge_node)
-        edges.append(edge)
-        edge_weights.append(dist)
-        logging.info(f"Add link ({cpe_id[i]}:{cpe_node}, {edge_id[i]}:{edge_node}) to graph with distance {dist} m")
+    # Calculate LOS distance between EDGE and CPE
+    dist = np.sqrt(np.power(locations["x"][cpe_id] - edge_nodes["edge_x_loc"], 2) +
+                   np.power(locations["y"][cpe_id] - edge_nodes["edge_y_loc"], 2))
+    # Find vertex ID of EDGE node
+    edge_node = edge_id + max_cpe_id + 1
+    edges = np.column_stack((cpe_node, edge_node))
 
     # Add edges to graph
-    nb_edges_orig = g.ecount()
-    g.add_edges(edges)
-    g.es[nb_edges_orig:]["weight"] = edge_weights  
+    g.add_edges(edges.tolist(), attributes={"weight": dist.tolist()})
+    logger.info("Added %s EDGE nodes and %s links to graph with distances %s - %s m",
+                nb_edge_nodes, len(edges), np.min(dist, initial=np.inf), np.max(dist, initial=-np.inf))
 
     # Visualize graph
     if print_stats:
         print(g)
         ig.summary(g)
 
-    return g
+    return get_network(g) if network else g
 
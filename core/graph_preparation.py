@@ -1,35 +1,39 @@
 #!/usr/bin/python
 
 import sys
+import os
 import logging
 
 import igraph as ig
 import numpy as np
 
-sys.path.append('../utils/')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
 
 from util_graph import parse_unconnected_graph
-from util_linkbudget import get_pathloss, get_throughput, get_capacity
+from util_linkbudget import get_link_budget, get_link_budget_profiles
 from util_graph import get_connected_clusters, plot_physical_locations
+from util_network import get_components, get_subnetwork, get_nb_vertices, get_nb_edges, get_attribute, \
+    get_edges, get_graph, set_attribute, is_network
+from util_profile import profiled, profile_stage
 
-# Logging definitions
-log_level = logging.DEBUG
-log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
-datefmt = '%d-%b-%y %H:%M:%S'
-log_fn = 'graph_preparation.log'
-logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+logger = logging.getLogger(__name__)
 
+# Default radio profile, cf. `graph_preparation`
+profile_defaults = {"f": 60e9, "sa": 0, "pr": 0, "vd": 0}
 
-def graph_preparation(g, t, f=60e9, sa=0, pr=0, vd=0, print_stats=True, datapath=None, plot=False):
+
+@profiled
+def graph_preparation(g, t, f=60e9, sa=0, pr=0, vd=0, print_stats=True, datapath=None, plot=False,
+                      link_budget_table=False):
     """ 
     Graph preparation algorithm, transforming weight of edges from distance to throughput,
     using link budget calculations, as well as a verification whether a solution can exist
 
     Params
     ------
-    g : iGraph
+    g : iGraph or dict
         Input graph with CPE and edge nodes as vertices, and edges representing a Line-of-Sight
-        link.
+        link, or its array representation, cf. `get_network`
     t : integer
         CPE throughput requirement in Mbps
     f : integer
@@ -38,14 +42,194 @@ def graph_preparation(g, t, f=60e9, sa=0, pr=0, vd=0, print_stats=True, datapath
         Specific attenuation in dB / km
     pr : float
         Precipitation rate in mm / h
+    link_budget_table : bool
+        Interpolate the link budget in the table of the radio profile instead of evaluating
+        it for every edge, cf. `get_link_budget`
+ 
+
+    Return
+    ------
+    g : iGraph or dict
+        Graph with throughput attribute attached to the edges, in the representation of the
+        input graph
+    """
+
+    g = get_connected_graph(g, datapath, plot)
+    if g is None:
+        return None
+
+    # Get throughput for all links in one batched link budget evaluation
+    distances = np.asarray(get_attribute(g, 'es', "weight"), dtype=float)
+    with profile_stage("link_budget", nb_edges=len(distances)):
+        pl, tp, cap = get_link_budget(distances, f, sa, vd, pr, table=link_budget_table)
+    logger.info("Prepared %s edges: path loss %s - %s dB, total throughput %s Mbps",
+                get_nb_edges(g), np.min(pl, initial=np.inf), np.max(pl, initial=-np.inf), np.sum(tp))
+
+    # Add throughput and capacity as attributes to the edges in g
+    set_attribute(g, 'es', 'tp', tp)
+    set_attribute(g, 'es', 'cap', cap)
+    set_attribute(g, 'vs', 't', np.full(get_nb_vertices(g), t))
+
+    # Verify throughput of edges connected to PoP
+    verify_pop_throughput(g, tp[get_pop_edges(g)], t)
+
+    return g
+
+
+@profiled
+def graph_preparation_profiles(g, t, profiles, print_stats=True, datapath=None, plot=False,
+                               link_budget_table=False):
+    """ 
+    Multi-profile graph preparation, evaluating the link budget of all edges for a list
+    of radio profiles on one shared topology, in one vectorized pass over the profiles,
+    cf. `get_link_budget_profiles`. The throughput and capacity of each profile are stored
+    as separate edge attributes `tp@<name>` and `cap@<name>`, with the name given by
+    `get_profile_name`, so the profiles do not overwrite each other. Profiles that only
+    differ in their throughput requirement share these attributes.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph with CPE and edge nodes as vertices, and edges representing a Line-of-Sight
+        link, or its array representation, cf. `get_network`
+    t : integer
+        CPE throughput requirement in Mbps
+    profiles : list[dict]
+        Radio profiles with keys `f`, `sa`, `pr` and `vd`, see `graph_preparation`. Missing
+        keys take the default values of `graph_preparation`. A key `t` replaces `t` in the
+        PoP verification of the profile.
+    link_budget_table : bool
+        Interpolate the link budget in the tables of the radio profiles, see
+        `graph_preparation`
+ 
+
+    Return
+    ------
+    g : iGraph or dict
+        Graph with throughput and capacity attributes of every profile attached to the edges,
+        in the representation of the input graph
+    """
+
+    g = get_connected_graph(g, datapath, plot)
+    if g is None:
+        return None
+
+    distances = np.asarray(get_attribute(g, 'es', "weight"), dtype=float)
+    pop_edges = get_pop_edges(g)
+    set_attribute(g, 'vs', 't', np.full(get_nb_vertices(g), t))
+
+    # Distinct radio profiles, by name
+    profiles = [{**profile_defaults, **profile} for profile in profiles]
+    radio = {get_profile_name(**p): p for p in profiles}
+    names = list(radio)
+
+    with profile_stage("link_budget", nb_edges=len(distances), nb_profiles=len(names)):
+        pl, tp, cap = get_link_budget_profiles(distances, list(radio.values()), table=link_budget_table)
+
+    for i, name in enumerate(names):
+        logger.info("Prepared %s edges for profile %s: total throughput %s Mbps",
+                    get_nb_edges(g), name, np.sum(tp[i]))
+        set_attribute(g, 'es', f"tp@{name}", tp[i])
+        set_attribute(g, 'es', f"cap@{name}", cap[i])
+
+    for p in profiles:
+        verify_pop_throughput(g, tp[names.index(get_profile_name(**p))][pop_edges], p.get("t", t))
+
+    return g
+
+
+def get_profile_name(f=60e9, sa=0, pr=0, vd=0, **kwargs):
+    """ 
+    Return the name of a radio profile, e.g. `60GHz_pr15` for 60 GHz at a precipitation
+    rate of 15 mm / h. Parameters at their default value are omitted.
+
+    Params
+    ------
+    f : integer
+        Carrier frequency in Hz
+    sa : float
+        Specific attenuation in dB / km
+    pr : float
+        Precipitation rate in mm / h
+    vd : float
+        Percentage of link distance covered by vegetation
+ 
+
+    Return
+    ------
+    name : str
+        Profile name
+    """
+
+    name = f"{f / 1e9:g}GHz"
+    if pr:
+        name += f"_pr{pr:g}"
+    if vd:
+        name += f"_vd{vd:g}"
+    if sa:
+        name += f"_sa{sa:g}"
+
+    return name
+
+
+def set_active_profile(g, name):
+    """ 
+    Copy the throughput and capacity of a prepared profile to the `tp` and `cap` edge
+    attributes that are used by the network planning.
+
+    Params
+    ------
+    g : iGraph or dict
+        Graph prepared with `graph_preparation_profiles`, or its array representation
+    name : str
+        Profile name, as returned by `get_profile_name`
  
 
     Return
     ------
     g : iGraph
-        Graph with throughput attribute attached to the edges
+        Graph with `tp` and `cap` of the selected profile
+    """
+
+    if is_network(g):
+        g["es"]["tp"] = g["es"][f"tp@{name}"]
+        g["es"]["cap"] = g["es"][f"cap@{name}"]
+        return g
+
+    g.es['tp'] = g.es[f"tp@{name}"]
+    g.es['cap'] = g.es[f"cap@{name}"]
+
+    return g
+
+
+@profiled
+def get_connected_graph(g, datapath=None, plot=False):
+    """ 
+    Verify the input graph and reduce it to its largest connected subgraph when it is not
+    connected. Array representations are reduced on their arrays, cf. `get_components`,
+    unless the unconnected clusters are plotted.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph, or its array representation
+    datapath : str
+        Path to the data set, used to plot the unconnected clusters
+    plot : bool
+        Plot the unconnected clusters
+ 
+
+    Return
+    ------
+    g : iGraph or dict
+        Connected graph, or None if the PoP is not in the largest connected subgraph.
+        With several PoPs, the clusters that contain a PoP are kept.
     """
 
+    if is_network(g) and not (datapath and plot):
+        return get_connected_network(g)
+    g = get_graph(g)
+
     # Verify that the input parameter is a graph
     if not isinstance(g, ig.Graph):
         print(f"Parameter `g` must be a Graph object")
@@ -53,56 +237,145 @@ def graph_preparation(g, t, f=60e9, sa=0, pr=0, vd=0, print_stats=True, datapath
 
     # Verify whether graph is connected
     if not g.is_connected():
-        logging.error(f"Input graph is not connected")
+        logger.error("Input graph is not connected")
         unconnected_clusters = parse_unconnected_graph(g)
         if datapath and plot:
             plot_physical_locations(datapath, unconnected_clusters, edge_nodes=False, show=True, savefig=True)
 
+        pops = get_pops(g)
+        if len(pops) > 1:
+            membership = np.array(g.clusters().membership)
+            keep = np.isin(membership, membership[pops])
+            logger.info("Keeping %s vertices in the clusters of %s PoPs", np.sum(keep), len(pops))
+            return g.induced_subgraph(np.flatnonzero(keep).tolist())
+
         connected_clusters = get_connected_clusters(g)  # type list[Graph]
         g = connected_clusters[0]
         if 0 not in [i for i in g.vs['id']]:
-            logging.error("PoP is not present in largest subgraph")
+            logger.error("PoP is not present in largest subgraph")
             return None
 
-    # Get throughput for each link
-    distances = g.es["weight"]
-    edge_list = g.get_edgelist()
-    PoP_edge_ind = []
-    PoP_edge_tp = []
-    PoP_edge_cap = []
-    logging.debug(connected_clusters)
-    logging.debug(g)
-    for idx, edge in enumerate(edge_list):
-        pl = get_pathloss(distances[idx],f,sa,vd,pr)
-        tp = get_throughput(pl, f)
-        cap = get_capacity(pl, f)
-        logging.info(
-            f"Edge {edge} with distance {distances[idx]} m has path loss {pl} dB and throughput {tp} Mbps")
-
-        # Add throughput as attribute to edge in g
-        g.es[idx]['tp'] = tp
-        # Add capacity as attribute to edge in g
-        g.es[idx]['cap'] = cap
-
-        if edge[0] == 0 or edge[1] == 0:
-            PoP_edge_ind.append(idx)
-            PoP_edge_tp.append(tp)
-            PoP_edge_cap.append(cap)
-
-    for idx in range(g.vcount()):
-        g.vs[idx]['t'] = t
-
-    # Get edges connected to PoP
+    return g
+
+
+def get_connected_network(network):
+    """ 
+    Reduce an array representation to its connected subgraph, as `get_connected_graph`
+    does for igraph graphs: the clusters that contain a PoP with several PoPs, the
+    cluster of vertex 0 otherwise.
+
+    Params
+    ------
+    network : dict
+        Array representation of the input graph
+ 
+
+    Return
+    ------
+    network : dict
+        Connected network, or None if the PoP is not in the connected subgraph
+    """
+
+    labels = get_components(network)
+    if np.all(labels == 0):
+        return network
+
+    logger.error("Input graph is not connected")
+    pops = get_pops(network)
+    if len(pops) > 1:
+        keep = np.isin(labels, labels[pops])
+        logger.info("Keeping %s vertices in the clusters of %s PoPs", np.sum(keep), len(pops))
+        return get_subnetwork(network, keep)
+
+    keep = labels == 0
+    if 0 not in network["vs"]["id"][keep]:
+        logger.error("PoP is not present in largest subgraph")
+        return None
+
+    return get_subnetwork(network, keep)
+
+
+def get_pops(g):
+    """ 
+    Return the PoP vertices, i.e. vertices of type `PoP`, or vertex 0 if the
+    vertices have no type.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph, or its array representation
+ 
+
+    Return
+    ------
+    pops : list[int]
+        Vertex indices of the PoPs
+    """
+
+    if is_network(g):
+        if "type" not in g["vs"]:
+            return [0]
+        return np.flatnonzero(g["vs"]["type"] == 'PoP').tolist()
+
+    if "type" not in g.vs.attributes():
+        return [0]
+
+    return [v.index for v in g.vs.select(type='PoP')]
+
+
+def get_pop_edges(g):
+    """ 
+    Return a mask selecting the edges connected to a PoP, cf. `get_pops`.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph, or its array representation
+ 
+
+    Return
+    ------
+    mask : np.ndarray
+        Boolean mask over the edges of g
+    """
+
+    edges = get_edges(g)
+
+    pops = get_pops(g)
+
+    return np.isin(edges[:, 0], pops) | np.isin(edges[:, 1], pops)
+
+
+def verify_pop_throughput(g, PoP_edge_tp, t):
+    """ 
+    Verify whether the links connected to the PoP can carry the throughput of the full
+    network.
+
+    Params
+    ------
+    g : iGraph or dict
+        Prepared graph, or its array representation
+    PoP_edge_tp : np.ndarray
+        Throughput of the edges connected to the PoP in Mbps
+    t : integer
+        CPE throughput requirement in Mbps
+ 
+
+    Return
+    ------
+    feasible : bool
+        True if the PoP links have enough bandwidth
+    """
+
     # Sum throughputs of edges connected to PoP
     T = np.sum(PoP_edge_tp)
 
-    number_CPE = len(ig.VertexSeq(g)) # when adding edge nodes, take only CPE
+    number_CPE = get_nb_vertices(g) # when adding edge nodes, take only CPE
     network_throughput = number_CPE * t
     if T < network_throughput:
-        logging.error(f"The PoP links do not have enough bandwidth ({T}) for the full network throughput ({network_throughput})")
-        #return None
+        logger.error("The PoP links do not have enough bandwidth (%s) for the full network throughput (%s)",
+                     T, network_throughput)
+        return False
     else:
-        logging.info(f"Network supports total throughput ({T} > {network_throughput})")
-
-    return g
-
+        logger.info("Network supports total throughput (%s > %s)", T, network_throughput)
+        return True
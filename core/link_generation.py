@@ -0,0 +1,402 @@
+#!/usr/bin/python
+
+import sys
+import os
+import logging
+import argparse
+
+import numpy as np
+import csv
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+
+from util_los import read_buildings, wall_index, get_los
+from util_shapefile import read_shapefile, get_inside
+from util_spatial import grid_index, query_pairs
+from util_linkbudget import get_pathloss, get_throughput
+from graph_creation import graph_from_links, set_pops, read_links
+
+logger = logging.getLogger(__name__)
+
+# Logging definitions
+log_level = logging.INFO
+log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
+datefmt = '%d-%b-%y %H:%M:%S'
+log_fn = 'link_generation.log'
+
+# Header of the GRAND links format, cf. `read_links` in graph_creation
+links_header = ["NodeAid", "NodeAType", "NodeBid", "NodeBType", "distance", "isLOS", "pathLoss",
+                "maxPathLoss", "bitrate", "maxbitrate", "isAssignable", "sarDL", "sarUL", "status",
+                "amc", "rbused"]
+
+
+def read_basestations(dataset):
+    """
+    Parse a data set with the PoP and CPE devices generated via the GRAND tool
+
+    Params
+    ------
+    dataset : str
+        Relative path towards the `basestations_N.csv` data set
+
+    Return
+    ------
+    devices : dict
+        Dictionary with arrays `id` (int), `x`, `y`, `z` (float) with the
+        coordinates and antenna height in m and `type` (str), one entry per device
+    """
+
+    with open(dataset, 'r') as csvFile:
+        row = next(csv.reader(csvFile))
+        assert row[0] == "id"
+        assert row[1] == "x (m)"
+        assert row[2] == "y (m)"
+        assert row[3] == "z (m)"
+        assert row[12] == "BSType"
+        rows = list(csv.reader(csvFile))
+
+    devices = {
+        "id": np.array([int(r[0]) for r in rows], dtype=np.int64),
+        "x": np.array([float(r[1]) for r in rows]),
+        "y": np.array([float(r[2]) for r in rows]),
+        "z": np.array([float(r[3]) for r in rows]),
+        "type": np.array(['PoP' if r[12] == 'POP' else r[12] for r in rows]),
+    }
+    return devices
+
+
+def sample_devices(environment, nb_cpe, seed=None, cpe_height=4.0, pop_height=14.0):
+    """
+    Draw a synthetic drop of CPE devices uniformly within the cover area of an
+    environment, outside the building footprints. The PoP is the sampled location
+    closest to the center of the drop.
+
+    Params
+    ------
+    environment : str
+        Relative path towards the environment directory with `CoverArea.shp` and
+        `Buildings.shp`
+    nb_cpe : int
+        Number of CPE devices
+    seed : int
+        Seed of the random generator
+    cpe_height, pop_height : float
+        Antenna heights above ground in m
+
+    Return
+    ------
+    devices : dict
+        Devices, as returned by `read_basestations`, with the PoP as id 0
+    """
+
+    area = read_shapefile(os.path.join(environment, 'CoverArea.shp'))
+    buildings = read_shapefile(os.path.join(environment, 'Buildings.shp'))
+    rng = np.random.default_rng(seed)
+
+    # Rejection sampling within the bounding box of the cover area. Devices inside
+    # a building would see through its walls, so footprints are rejected as well.
+    x = np.zeros(0)
+    y = np.zeros(0)
+    while len(x) < nb_cpe + 1:
+        n = 2 * (nb_cpe + 1 - len(x))
+        sx = rng.uniform(area["x"].min(), area["x"].max(), n)
+        sy = rng.uniform(area["y"].min(), area["y"].max(), n)
+        inside = get_inside(area, sx, sy)
+        inside[inside] = ~get_inside(buildings, sx[inside], sy[inside])
+        x = np.concatenate((x, sx[inside]))[:nb_cpe + 1]
+        y = np.concatenate((y, sy[inside]))[:nb_cpe + 1]
+
+    pop = np.argmin(np.hypot(x - np.mean(x), y - np.mean(y)))
+    x[[0, pop]] = x[[pop, 0]]
+    y[[0, pop]] = y[[pop, 0]]
+
+    devices = {
+        "id": np.arange(nb_cpe + 1, dtype=np.int64),
+        "x": x,
+        "y": y,
+        "z": np.append(pop_height, np.full(nb_cpe, cpe_height)),
+        "type": np.array(['PoP'] + ['EDGE'] * nb_cpe),
+    }
+    return devices
+
+
+def stream_links(devices, walls, max_distance=700, f=60e9, sa=0, pr=0, vd=0, chunk_size=1000):
+    """
+    Generate the links between devices chunk by chunk, so that large drops never
+    hold all candidate pairs in memory. For every chunk of `chunk_size` devices,
+    the pairs towards devices with a higher index within the maximum link distance
+    are found with a grid index, and the pairs with line-of-sight and a non-zero
+    throughput are kept.
+
+    Params
+    ------
+    devices : dict
+        Devices, as returned by `read_basestations` or `sample_devices`
+    walls : tuple
+        Walls and their grid index, as returned by `read_buildings` and `wall_index`
+    max_distance : float
+        Maximum link distance in m
+    f, sa, pr, vd :
+        Radio profile of the link budget, cf. `get_pathloss`
+    chunk_size : int
+        Number of devices per chunk
+
+    Yield
+    -----
+    links : dict
+        Links of a chunk, with the arrays returned by `read_links` in graph_creation
+        and one entry per undirected link
+    """
+
+    x, y, z = devices["x"], devices["y"], devices["z"]
+    index = grid_index(x, y, max_distance)
+
+    for first in range(0, len(x), chunk_size):
+        query = np.arange(first, min(first + chunk_size, len(x)))
+        i, j, dist = query_pairs(index, x[query], y[query], max_distance)
+        i = query[i]
+        keep = i < j
+        i, j, dist = i[keep], j[keep], dist[keep]
+
+        pl = get_pathloss(np.maximum(dist, 1.0), f, sa, vd, pr)
+        tp = get_throughput(pl, f)
+        keep = tp > 0
+        i, j, dist, pl, tp = i[keep], j[keep], dist[keep], pl[keep], tp[keep]
+        keep = get_los(*walls, x[i], y[i], z[i], x[j], y[j], z[j])
+
+        links = {
+            "nodeA": devices["id"][i[keep]],
+            "nodeB": devices["id"][j[keep]],
+            "distance": dist[keep],
+            "maxbitrate": tp[keep],
+            "maxpathloss": pl[keep],
+        }
+        logger.debug("Devices %s-%s: %s candidate pairs, %s links", query[0], query[-1], len(i), np.sum(keep))
+        yield links
+
+
+def generate_links(environment, dataset, output, max_distance=700, f=60e9, sa=0, pr=0, vd=0,
+                   print_stats=True, walls=None):
+    """
+    Regenerate a links data set in the GRAND format from the device locations and the
+    building footprints of the environment. All device pairs within the maximum link
+    distance that have line-of-sight and a non-zero throughput are written, in both
+    directions.
+
+    Params
+    ------
+    environment : str
+        Relative path towards the environment directory with `Buildings.shp`
+    dataset : str or dict
+        Relative path towards the `basestations_N.csv` data set, or devices as
+        returned by `sample_devices`
+    output : str
+        Relative path towards the links data set to write
+    max_distance : float
+        Maximum link distance in m
+    f, sa, pr, vd :
+        Radio profile of the link budget, cf. `get_pathloss`
+    print_stats : bool
+        Print link statistics to terminal console
+    walls : tuple
+        Walls and their grid index, as returned by `read_buildings` and
+        `wall_index`. If `None`, they are read from the environment.
+
+    Return
+    ------
+    nb_links : int
+        Number of undirected links written
+    """
+
+    if walls is None:
+        walls = read_buildings(os.path.join(environment, 'Buildings.shp'))
+        walls = (walls, wall_index(walls))
+
+    devices = read_basestations(dataset) if isinstance(dataset, str) else dataset
+
+    type_of = dict(zip(devices["id"].tolist(), devices["type"].tolist()))
+
+    nb_links = 0
+    with open(output, 'w', newline='') as csvFile:
+        writer = csv.writer(csvFile, quoting=csv.QUOTE_ALL)
+        writer.writerow(links_header)
+        for links in stream_links(devices, walls, max_distance, f, sa, pr, vd):
+            # Both directions of every link, as in the GRAND data sets
+            a = np.concatenate((links["nodeA"], links["nodeB"]))
+            b = np.concatenate((links["nodeB"], links["nodeA"]))
+            dist, pl, tp = (np.tile(links[k], 2) for k in ("distance", "maxpathloss", "maxbitrate"))
+            for k in np.lexsort((b, a)):
+                writer.writerow([a[k], type_of[a[k]], b[k], type_of[b[k]], repr(float(dist[k])),
+                                 "true", repr(float(pl[k])), repr(float(pl[k])), "0.0",
+                                 repr(float(tp[k])), "true", "0.0", "0.0", "INIT", "0", "0"])
+            nb_links += len(links["nodeA"])
+
+    logger.info("%s: %s links between %s devices", output, nb_links, len(devices['id']))
+
+    if print_stats:
+        print("----------------------------------------------------------------------")
+        print(f"Devices: {len(devices['id'])}")
+        print(f"Links written to {output}: {nb_links}")
+        print("----------------------------------------------------------------------")
+
+    return nb_links
+
+
+def link_graph(environment, devices, max_distance=700, f=60e9, sa=0, pr=0, vd=0,
+               print_stats=True, walls=None, chunk_size=1000):
+    """
+    Build the graph of a drop directly from the streamed links, without writing
+    a links data set, cf. `stream_links` and `graph_from_links`.
+
+    Params
+    ------
+    environment : str
+        Relative path towards the environment directory with `Buildings.shp`
+    devices : dict
+        Devices, as returned by `read_basestations` or `sample_devices`, with ids
+        0 (PoP) to the number of CPE devices
+    max_distance, f, sa, pr, vd, walls, chunk_size :
+        cf. `stream_links` and `generate_links`
+    print_stats : bool
+        Print graph statistics to terminal console
+
+    Return
+    ------
+    g : iGraph
+        Graph with vertices representing CPE devices and edges representing wireless LOS links
+    """
+
+    if walls is None:
+        walls = read_buildings(os.path.join(environment, 'Buildings.shp'))
+        walls = (walls, wall_index(walls))
+
+    chunks = stream_links(devices, walls, max_distance, f, sa, pr, vd, chunk_size)
+    g = graph_from_links(chunks, nb_cpe_nodes=len(devices["id"]) - 1, print_stats=print_stats)
+
+    return set_pops(g, devices["id"][devices["type"] == 'PoP'].tolist())
+
+
+def get_link_keys(links):
+    """
+    Encode the undirected links of a links dictionary as unique int64 keys.
+    """
+    a = np.asarray(links["nodeA"], dtype=np.int64)
+    b = np.asarray(links["nodeB"], dtype=np.int64)
+    return np.unique(np.minimum(a, b) * 2**32 + np.maximum(a, b))
+
+
+def compare_links(links, reference, print_stats=True):
+    """
+    Compare generated links with a reference links data set of the GRAND tool.
+    A generated link that is also listed in the reference counts as a match,
+    the recall is the share of reference links that are generated and the
+    precision the share of generated links that are listed in the reference.
+
+    Params
+    ------
+    links : dict or iterable of dict
+        Links, as returned by `read_links` in graph_creation, or the chunks of
+        `stream_links`
+    reference : str
+        Relative path towards the reference `links_N.csv` data set
+    print_stats : bool
+        Print the comparison to terminal console
+
+    Return
+    ------
+    stats : dict
+        `nb_links`, `nb_reference`, `nb_common` (int), `recall` and `precision` (float)
+    """
+
+    if isinstance(links, dict):
+        links = [links]
+    generated = np.unique(np.concatenate([get_link_keys(c) for c in links] + [np.zeros(0, dtype=np.int64)]))
+    listed = get_link_keys(read_links(reference))
+    nb_common = len(np.intersect1d(generated, listed, assume_unique=True))
+
+    stats = {
+        "nb_links": len(generated),
+        "nb_reference": len(listed),
+        "nb_common": nb_common,
+        "recall": nb_common / max(len(listed), 1),
+        "precision": nb_common / max(len(generated), 1),
+    }
+    logger.info("%s: %s links, %s reference links, recall %.3f, precision %.3f", reference,
+                stats["nb_links"], stats["nb_reference"], stats["recall"], stats["precision"])
+
+    if print_stats:
+        print("----------------------------------------------------------------------")
+        print(f"Links generated: {stats['nb_links']}, listed in {reference}: {stats['nb_reference']}")
+        print(f"Common links: {nb_common}")
+        print(f"Recall: {stats['recall']:.3f}, precision: {stats['precision']:.3f}")
+        print("----------------------------------------------------------------------")
+
+    return stats
+
+
+def main(argv=None):
+    """
+    Command line interface, cf. `fwa.py`.
+    """
+    parser = argparse.ArgumentParser(description="Regenerate links data sets from building footprints")
+    parser.add_argument("environment", help="environment directory, e.g. ../data/environments/uc1-LeestUrban")
+    parser.add_argument("datasets", nargs='*', help="basestations_N.csv data sets")
+    parser.add_argument("--cpe", type=int, default=None,
+                        help="sample a drop with this number of CPE devices in the cover area instead")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the sampled drop")
+    parser.add_argument("--max-distance", type=float, default=700, help="maximum link distance in m")
+    parser.add_argument("-f", type=float, default=60e9, help="carrier frequency in Hz")
+    parser.add_argument("--graph", action='store_true',
+                        help="build the graph from the streamed links instead of writing data sets")
+    parser.add_argument("--compare", action='store_true',
+                        help="compare the links with the links_N.csv data set next to every data set "
+                             "instead of writing data sets")
+    parser.add_argument("-o", "--output", default=None,
+                        help="output directory, by default links_N_generated.csv is written next to "
+                             "every data set")
+    parser.add_argument("--force", action='store_true', help="overwrite existing links data sets")
+    args = parser.parse_args(argv)
+    logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+
+    # Walls are read and indexed once for all data sets
+    walls = read_buildings(os.path.join(args.environment, 'Buildings.shp'))
+    walls = (walls, wall_index(walls))
+
+    drops = {os.path.basename(d).replace('basestations', 'links'): d for d in args.datasets}
+    if args.cpe is not None:
+        drops[f"links_{args.cpe}CPE_sampled.csv"] = sample_devices(args.environment, args.cpe, args.seed)
+
+    # The bundled links_N.csv data sets are the GRAND references of `--compare`, so they
+    # are never overwritten by default
+    outputs = {}
+    if not args.compare and not args.graph:
+        for name, dataset in drops.items():
+            if args.output is not None:
+                outputs[name] = os.path.join(args.output, name)
+            elif isinstance(dataset, str):
+                outputs[name] = os.path.join(os.path.dirname(dataset), name.replace('.csv', '_generated.csv'))
+            else:
+                outputs[name] = name
+        existing = [output for output in outputs.values() if os.path.exists(output)]
+        if existing and not args.force:
+            parser.error(f"refusing to overwrite {', '.join(existing)}, use --force")
+
+    for name, dataset in drops.items():
+        if args.compare:
+            if not isinstance(dataset, str):
+                continue
+            devices = read_basestations(dataset)
+            chunks = stream_links(devices, walls, args.max_distance, args.f)
+            compare_links(chunks, os.path.join(os.path.dirname(dataset), name))
+            continue
+        if args.graph:
+            devices = read_basestations(dataset) if isinstance(dataset, str) else dataset
+            g = link_graph(args.environment, devices, args.max_distance, args.f, walls=walls,
+                           print_stats=False)
+            print(f"{name}: {g.vcount()} nodes, {g.ecount()} links")
+            continue
+        generate_links(args.environment, dataset, outputs[name], args.max_distance, args.f, walls=walls)
+
+
+if __name__ == '__main__':
+    main()
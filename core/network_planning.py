@@ -1,118 +1,123 @@
 import sys
 import os
+import time
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 import igraph as ig
 import numpy as np
-import matplotlib.pyplot as plt
 
+import heapq
 import itertools
 import collections
 
-# Logging definitions
-log_level = logging.DEBUG
-log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
-datefmt = '%d-%b-%y %H:%M:%S'
-log_fn = 'graph_planning.log'
-logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+from graph_preparation import get_pops
+from util_network import get_adjacency, get_network, get_graph, is_network, get_nb_vertices, get_nb_edges, \
+    get_edges, get_attribute, has_attribute, set_attribute
+from util_logging import TRACE, is_tracing, log_summary
+from util_profile import profiled, profile_stage
 
+logger = logging.getLogger(__name__)
 
-def network_planning(g, t, debug=False):
+
+@profiled
+def network_planning(g, t, debug=False, algorithm='greedy'):
     """
     Function to perform the network planning towards the PoP.
 
     Params
     ------
-    g : iGraph
+    g : iGraph or dict
         Input graph with CPE and edge nodes as vertices, and edges representing
-        a Line-of-Sight link.
+        a Line-of-Sight link, or its array representation, cf. `get_network`.
+        The planned graph is returned in the same representation. The
+        `incremental`, `priority` and `flow` algorithms plan on the arrays of
+        either representation, `greedy` deletes edges while routing and plans
+        an igraph copy of an array representation.
     t : integer
         CPE throughput requirement in Mbps
     debug : bool
         Plot the graph for debugging purposes
+    algorithm : str
+        Planning algorithm: `greedy` for `planning_algorithm`, which removes
+        saturated links from the graph, `incremental` for
+        `planning_algorithm_incremental`, which keeps the topology and masks
+        saturated links, `priority` for `planning_algorithm_priority`, which
+        re-orders and re-routes vertices as links get loaded, or `flow` for
+        `planning_algorithm_flow`, which routes as many vertices as possible
+        via a maximum flow towards the PoP.
     """
 
     # Sanity checks before running planning algorithm
     if g is None:
-        logging.error(
+        logger.error(
             "Input graph is None. Check if the input graph is succesfully prepared"
         )
         return None
 
-    edge_list = g.get_edgelist()
-    tp = []
-    for idx, edge in enumerate(edge_list):
-        # Check if each edge has attribute tp
-        try:
-            tp.append(g.es[idx]['tp'])
-        except:
-            logging.error("Attribute `tp` not available.")
-            return None
+    # Check if the edges have attribute tp
+    if get_nb_edges(g) and not has_attribute(g, 'es', "tp"):
+        logger.error("Attribute `tp` not available.")
+        return None
 
     # Run planning algorithm
-    g = planning_algorithm(g, t, w='weight')
+    if algorithm == 'greedy':
+        # Saturated edges are deleted while routing, on an igraph copy of an array representation
+        network = is_network(g)
+        g = planning_algorithm(get_graph(g), t, w='weight')
+        g = get_network(g) if network else g
+    elif algorithm == 'incremental':
+        g = planning_algorithm_incremental(g, t)
+    elif algorithm == 'priority':
+        g = planning_algorithm_priority(g, t)
+    elif algorithm == 'flow':
+        g = planning_algorithm_flow(g, t)
+    else:
+        logger.error("Unknown planning algorithm `%s`", algorithm)
+        return None
 
-    logging.debug("Node throughputs")
-    logging.debug(g.vs["t"])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Node throughputs %s", get_attribute(g, 'vs', "t"))
 
     if debug:
-        layout = g.layout(layout='auto')
+        h = get_graph(g)
+        layout = h.layout(layout='auto')
 
         visual_style = {}
         visual_style["vertex_size"] = 20
-        visual_style["vertex_label"] = g.vs["id"]
+        visual_style["vertex_label"] = h.vs["id"]
         visual_style["layout"] = layout
-        ig.plot(g, **visual_style)
+        ig.plot(h, **visual_style)
     
-        layout = g.layout(layout='auto')
+        layout = h.layout(layout='auto')
 
         visual_style = {}
         visual_style["vertex_size"] = 20
-        visual_style["vertex_label"] = g.vs["id"]
+        visual_style["vertex_label"] = h.vs["id"]
         visual_style["layout"] = layout
-        ig.plot(g, **visual_style)
+        ig.plot(h, **visual_style)
 
     return g
 
+@profiled
 def planning_algorithm(g, t, w = None):
 
-    # Get sorted vertex list depending on number of shortest paths 
-    # and number of edges on the shortest path
-    nd = [] # vertex list
-    tp_req = [] # list with throughput requirements of all vertices
-    nb_paths = [] # list with number of shortest paths for each vertex
-    pathlen = [] # list with length of shortest path for each vertex
-    for v in g.vs:
-        results = g.get_all_shortest_paths(v, to=0, weights=None)
-        nd.append(v)
-        tp_req.append(-v["t"])
-        nb_paths.append(len(results))
-        pathlen.append(-len(results[0]))
+    start = time.perf_counter()
+    trace = is_tracing(logger)
+    nd, sorted_idx = get_planning_order(g)
 
-    # sort list based on 
-    # 1. throughput (highest throughput first) 
-    # 2. number of shortest paths (lowest number of shortest paths first)
-    # 3. path length (highest path length first)
-    zipped_list = list(enumerate(zip(tp_req, nb_paths, pathlen)))
-    sorted_list = sorted(zipped_list, key=lambda x: x[1])
-    logging.debug(zipped_list)
-    logging.debug(sorted_list)
-    sorted_idx = sorted_list
-
-    logging.debug(sorted_idx)
-    logging.debug(tp_req)
-    logging.debug(nb_paths)
-    logging.debug(pathlen)
+    if trace:
+        logger.log(TRACE, "Routing order %s", sorted_idx)
     # Make a copy of the graph that we can modify on the go
     g_work = g
 
-    logging.debug(sorted_idx[0])
+    nb_removed = 0
     for i in sorted_idx:
         # Get shortest path for node nd[i], using weighted graph
         v = nd[i[0]]
-        logging.debug(f"Get shortest path for {v}")
         path = g_work.get_shortest_paths(v, to=0, weights=None, output="epath")
-        logging.debug(path)
+        if trace:
+            logger.log(TRACE, "Shortest path for %s: %s", v, path)
         edge_list = g_work.get_edgelist()
         distances = g_work.es["weight"]
         throughput = g_work.es["tp"]
@@ -125,24 +130,28 @@ def planning_algorithm(g, t, w = None):
                 v1_prev = v1
                 v2_prev = v2
                 edge = edge_list[k]
-                logging.debug(f"considering edge: {edge}, v={v}, edge0={edge[0]}, {edge[0] == v.index}")
                 if(edge[0] == v2_prev) or (edge[0] == v.index):
                     v1 = edge[0]
                     v2 = edge[1]
                 else:
                     v1 = edge[1]
                     v2 = edge[0]
-                logging.debug(f"Edge ({g_work.vs[v1]['id']},{g_work.vs[v2]['id']}) with distance {distances[k]} m has throughput {throughput[k]} Mbps, required {required_throughput}")
+                if trace:
+                    logger.log(TRACE, "Edge (%s,%s) with distance %s m has throughput %s Mbps, required %s",
+                               g_work.vs[v1]['id'], g_work.vs[v2]['id'], distances[k], throughput[k],
+                               required_throughput)
                 if throughput[k] >  required_throughput:
                     throughput[k] = throughput[k] - required_throughput
-                    logging.debug(f"Throughput is now {throughput[k]} Mbps")
                 else:
                     print(f"Link ({v1},{v2}) has not enough bandwidth ({throughput[k]} Mbps)")
                     assert False 
                 if throughput[k] < required_throughput:
                     # remove edge
-                    logging.info(f"Edge {edge} ({g_work.vs[v1]['id']},{g_work.vs[v2]['id']}) with distance {distances[k]} is removed")
+                    if trace:
+                        logger.log(TRACE, "Edge %s (%s,%s) with distance %s is removed",
+                                   edge, g_work.vs[v1]['id'], g_work.vs[v2]['id'], distances[k])
                     g_work.delete_edges(edge)
+                    nb_removed += 1
                 g_work.es["tp"] = throughput
                 vertex_path.append(v1)
                 vertex_path.append(v2)
@@ -151,8 +160,756 @@ def planning_algorithm(g, t, w = None):
         v["eroute"] = path
         v["vroute"] = vertex_path
 
-    logging.info(nd)
+    log_summary(logger, "Greedy planning", {"vertices": len(nd), "removed edges": nb_removed}, start)
     return g_work
 
+@profiled
+def get_planning_order(g):
+    """
+    Order in which the vertices are routed towards the PoP.
+
+    Params
+    ------
+    g : iGraph or dict
+        Prepared graph with the throughput requirement `t` of each vertex, or its
+        array representation
+
+    Returns
+    -------
+    nd : list
+        Vertex list, vertex indices for an array representation
+    sorted_idx : list
+        Vertex indices in routing order, each entry as (index, sort key)
+    """
+
+    # Get sorted vertex list depending on number of shortest paths 
+    # and number of edges on the shortest path, both derived from a single
+    # breadth-first search from the PoP
+    hops, counts = get_shortest_path_counts(get_adjacency_arrays(g), 0)
+    required = np.asarray(get_attribute(g, 'vs', "t")).tolist()
+    nd = list(range(len(required))) if is_network(g) else list(g.vs) # vertex list
+    tp_req = [] # list with throughput requirements of all vertices
+    nb_paths = [] # list with number of shortest paths for each vertex
+    pathlen = [] # list with length of shortest path for each vertex
+    for v in range(len(required)):
+        tp_req.append(-required[v])
+        nb_paths.append(counts[v])
+        pathlen.append(-(hops[v] + 1))
+
+    # sort list based on 
+    # 1. throughput (highest throughput first) 
+    # 2. number of shortest paths (lowest number of shortest paths first)
+    # 3. path length (highest path length first)
+    zipped_list = list(enumerate(zip(tp_req, nb_paths, pathlen)))
+    sorted_list = sorted(zipped_list, key=lambda x: x[1])
+    if is_tracing(logger):
+        logger.log(TRACE, "Routing keys %s, sorted %s", zipped_list, sorted_list)
+
+    return nd, sorted_list
+
+
+@profiled
+def get_adjacency_arrays(g):
+    """
+    Compressed sparse row (CSR) adjacency of an undirected graph, referring to
+    the edges by their (stable) igraph edge ids.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph, or its array representation
+
+    Returns
+    -------
+    indptr : list
+        Neighbours of vertex v are stored at positions indptr[v]:indptr[v+1]
+    nbr : list
+        Neighbouring vertex
+    eid : list
+        Id of the edge towards the neighbouring vertex
+    """
+
+    if is_network(g):
+        return g["indptr"].tolist(), g["nbr"].tolist(), g["eid"].tolist()
+
+    indptr, nbr, eid = get_adjacency(get_edges(g), get_nb_vertices(g))
+
+    return indptr.tolist(), nbr.tolist(), eid.tolist()
+
+
+@profiled
+def bfs_tree(adjacency, root, usable):
+    """
+    Breadth-first search tree over the usable edges, from a root vertex.
+
+    Params
+    ------
+    adjacency : tuple
+        CSR adjacency, as returned by `get_adjacency_arrays`
+    root : int
+        Root vertex
+    usable : list[bool]
+        Per edge id, whether the edge may be used
+
+    Returns
+    -------
+    parent : list
+        Next vertex on the path towards the root, -1 if not reachable
+    parent_edge : list
+        Id of the edge towards `parent`
+    """
+
+    indptr, nbr, eid = adjacency
+    parent = [-1] * (len(indptr) - 1)
+    parent_edge = [-1] * (len(indptr) - 1)
+    parent[root] = root
+    queue = collections.deque([root])
+    while queue:
+        u = queue.popleft()
+        for k in range(indptr[u], indptr[u + 1]):
+            w = nbr[k]
+            if parent[w] == -1 and usable[eid[k]]:
+                parent[w] = u
+                parent_edge[w] = eid[k]
+                queue.append(w)
+
+    return parent, parent_edge
+
+
+@profiled
+def get_shortest_path_counts(adjacency, root):
+    """
+    Hop count and number of hop count shortest paths between each vertex and
+    a root vertex. The paths are counted via dynamic programming over the
+    shortest path DAG of a breadth-first search, in O(V+E).
+
+    Params
+    ------
+    adjacency : tuple
+        CSR adjacency, as returned by `get_adjacency_arrays`
+    root : int
+        Root vertex
+
+    Returns
+    -------
+    hops : list
+        Hop count towards the root, -1 if not reachable
+    counts : list
+        Number of shortest paths towards the root, 0 if not reachable
+    """
+
+    indptr, nbr, eid = adjacency
+    hops = [-1] * (len(indptr) - 1)
+    counts = [0] * (len(indptr) - 1)
+    hops[root] = 0
+    counts[root] = 1
+    queue = collections.deque([root])
+    while queue:
+        u = queue.popleft()
+        for k in range(indptr[u], indptr[u + 1]):
+            w = nbr[k]
+            if hops[w] == -1:
+                hops[w] = hops[u] + 1
+                queue.append(w)
+            if hops[w] == hops[u] + 1:
+                counts[w] += counts[u]
+
+    return hops, counts
+
+
+@profiled
+def planning_algorithm_incremental(g, t, w=None):
+    """
+    Incremental planning algorithm. Vertices are routed in the same order as
+    in `planning_algorithm`, over a hop count shortest path towards the PoP.
+    The residual throughput is kept in an array indexed by the stable edge ids,
+    and saturated links are masked instead of deleted, so the topology of `g`
+    is never modified. Routes follow a breadth-first search tree rooted at the
+    PoP, which is only recomputed when a link on the next route got saturated.
+
+    Params
+    ------
+    g : iGraph or dict
+        Prepared graph, with throughput `tp` on the edges and throughput
+        requirement `t` on the vertices, or its array representation
+    t : integer
+        CPE throughput requirement in Mbps
+
+    Returns
+    -------
+    g : iGraph or dict
+        Input graph with the route of each vertex as vertex attributes `eroute`
+        (edge ids) and `vroute` (vertex ids), the residual throughput as edge
+        attribute `tp` and the saturated links marked with `saturated`.
+    """
+
+    start = time.perf_counter()
+    trace = is_tracing(logger)
+    _, sorted_idx = get_planning_order(g)
+
+    adjacency = get_adjacency_arrays(g)
+    residual = np.array(get_attribute(g, 'es', "tp"), dtype=float)
+    required = np.asarray(get_attribute(g, 'vs', "t")).tolist()
+    usable = np.ones(get_nb_edges(g), dtype=bool)
+    parent, parent_edge = bfs_tree(adjacency, 0, usable.tolist())
+
+    eroutes = [None] * get_nb_vertices(g)
+    vroutes = [None] * get_nb_vertices(g)
+    for i in sorted_idx:
+        v = i[0]
+        required_throughput = required[v]
+
+        # Walk the tree towards the PoP, recompute the tree if a link on the
+        # route got saturated since the last search
+        path, vertex_path = get_tree_route(parent, parent_edge, usable, v)
+        if path is None:
+            parent, parent_edge = bfs_tree(adjacency, 0, usable.tolist())
+            path, vertex_path = get_tree_route(parent, parent_edge, usable, v)
+
+        # Route over links that can carry the requirement of this vertex, only
+        # needed when the vertices have different requirements
+        if path is None or np.any(residual[path] <= required_throughput):
+            usable_v = usable & (residual > required_throughput)
+            parent_v, parent_edge_v = bfs_tree(adjacency, 0, usable_v.tolist())
+            path, vertex_path = get_tree_route(parent_v, parent_edge_v, usable_v, v)
+        if path is None:
+            print(f"Vertex {v} has no route with enough bandwidth ({required_throughput} Mbps) towards the PoP")
+            assert False
+
+        # Reserve the throughput on the route, and mask links that cannot
+        # carry another vertex with the same requirement
+        residual[path] -= required_throughput
+        saturated = [k for k in path if residual[k] <= required_throughput]
+        usable[saturated] = False
+        if trace and saturated:
+            logger.log(TRACE, "Edges %s are saturated after routing vertex %s", saturated, v)
+
+        eroutes[v] = [path]
+        vroutes[v] = vertex_path
+
+    log_summary(logger, "Incremental planning",
+                {"vertices": get_nb_vertices(g), "saturated edges": np.sum(~usable)}, start)
+
+    set_attribute(g, 'vs', "eroute", eroutes)
+    set_attribute(g, 'vs', "vroute", vroutes)
+    set_attribute(g, 'es', "tp", residual)
+    set_attribute(g, 'es', "saturated", ~usable)
+
+    return g
+
+
+def get_tree_route(parent, parent_edge, usable, v):
+    """
+    Route from vertex `v` towards the root of a search tree.
+
+    Params
+    ------
+    parent : list
+        Next vertex on the path towards the root, cf. `bfs_tree`
+    parent_edge : list
+        Id of the edge towards `parent`
+    usable : np.ndarray
+        Per edge id, whether the edge may be used
+    v : int
+        Start vertex
+
+    Returns
+    -------
+    path : list
+        Edge ids on the route, None if the route is not available
+    vertex_path : list
+        End points (v1, v2) of each edge on the route, in routing direction
+    """
+
+    path = []
+    vertex_path = []
+    while parent[v] != v:
+        if parent[v] == -1 or not usable[parent_edge[v]]:
+            return None, None
+        path.append(parent_edge[v])
+        vertex_path.append(v)
+        vertex_path.append(parent[v])
+        v = parent[v]
+
+    return path, vertex_path
+
+
+@profiled
+def dijkstra_tree(adjacency, root, residual, usable, required, target=None):
+    """
+    Shortest path tree over the usable edges, from a root vertex. The length of
+    an edge is one hop plus a penalty that grows as its residual throughput
+    approaches the requirement, so among routes with the same hop count the
+    least loaded one is preferred.
+
+    Params
+    ------
+    adjacency : tuple
+        CSR adjacency, as returned by `get_adjacency_arrays`
+    root : int
+        Root vertex
+    residual : np.ndarray
+        Per edge id, residual throughput in Mbps
+    usable : np.ndarray
+        Per edge id, whether the edge may be used
+    required : float
+        Throughput requirement in Mbps
+    target : int
+        If set, the search stops once the route of this vertex is known
+
+    Returns
+    -------
+    parent : list
+        Next vertex on the path towards the root, -1 if not reachable
+    parent_edge : list
+        Id of the edge towards `parent`
+    """
+
+    indptr, nbr, eid = adjacency
+    length = (1 + required / np.maximum(residual, required)).tolist()
+    usable = usable.tolist()
+    dist = [np.inf] * (len(indptr) - 1)
+    parent = [-1] * (len(indptr) - 1)
+    parent_edge = [-1] * (len(indptr) - 1)
+    dist[root] = 0
+    parent[root] = root
+    queue = [(0, root)]
+    while queue:
+        d, u = heapq.heappop(queue)
+        if d > dist[u]:
+            continue
+        if u == target:
+            break
+        for k in range(indptr[u], indptr[u + 1]):
+            e = eid[k]
+            w = nbr[k]
+            if usable[e] and d + length[e] < dist[w]:
+                dist[w] = d + length[e]
+                parent[w] = u
+                parent_edge[w] = e
+                heapq.heappush(queue, (dist[w], w))
+
+    return parent, parent_edge
+
+
+@profiled
+def planning_algorithm_priority(g, t, w=None):
+    """
+    Priority queue planning algorithm. Vertices are routed in the order of a
+    heap keyed on their throughput requirement, their number of alternative
+    (hop count shortest) paths and the residual throughput of their current
+    route, so vertices with the fewest and tightest options go first. The key
+    of a vertex is only re-evaluated when a link on its current route got
+    loaded, and the vertex is only re-routed, via `dijkstra_tree`, when a link
+    on its route got saturated. As in `planning_algorithm_incremental`,
+    saturated links are masked instead of deleted.
+
+    Params
+    ------
+    g : iGraph or dict
+        Prepared graph, with throughput `tp` on the edges and throughput
+        requirement `t` on the vertices, or its array representation
+    t : integer
+        CPE throughput requirement in Mbps
+
+    Returns
+    -------
+    g : iGraph or dict
+        Input graph with the route of each vertex as vertex attributes `eroute`
+        (edge ids) and `vroute` (vertex ids), the residual throughput as edge
+        attribute `tp` and the saturated links marked with `saturated`.
+    """
+
+    start = time.perf_counter()
+    trace = is_tracing(logger)
+    nb_vertices = get_nb_vertices(g)
+    adjacency = get_adjacency_arrays(g)
+    hops, counts = get_shortest_path_counts(adjacency, 0)
+    residual = np.array(get_attribute(g, 'es', "tp"), dtype=float)
+    required = np.asarray(get_attribute(g, 'vs', "t")).tolist()
+    usable = residual > t
+
+    # Initial routes of all vertices from a single search from the PoP
+    parent, parent_edge = dijkstra_tree(adjacency, 0, residual, usable, t)
+    routes = [get_tree_route(parent, parent_edge, usable, v) for v in range(nb_vertices)]
+
+    # Vertices whose current route uses each edge
+    users = collections.defaultdict(set)
+    for v, (path, _) in enumerate(routes):
+        for k in path or []:
+            users[k].add(v)
+
+    def get_key(v):
+        path = routes[v][0]
+        bottleneck = np.min(residual[path], initial=np.inf) if path is not None else -np.inf
+        return (-required[v], counts[v], bottleneck, -hops[v], v)
+
+    heap = [get_key(v) for v in range(nb_vertices)]
+    heapq.heapify(heap)
+    dirty = np.zeros(nb_vertices, dtype=bool)
+    routed = np.zeros(nb_vertices, dtype=bool)
+
+    eroutes = [None] * nb_vertices
+    vroutes = [None] * nb_vertices
+    nb_reroutes = 0
+    while heap:
+        v = heapq.heappop(heap)[-1]
+        if routed[v]:
+            continue
+        path, vertex_path = routes[v]
+
+        # Re-route lazily if a link on the route got saturated or cannot carry
+        # the requirement of this vertex
+        if path is None or not np.all(usable[path]) or np.any(residual[path] <= required[v]):
+            usable_v = usable & (residual > required[v])
+            parent_v, parent_edge_v = dijkstra_tree(adjacency, 0, residual, usable_v, required[v], target=v)
+            for k in path or []:
+                users[k].discard(v)
+            path, vertex_path = get_tree_route(parent_v, parent_edge_v, usable_v, v)
+            if path is None:
+                print(f"Vertex {v} has no route with enough bandwidth ({required[v]} Mbps) towards the PoP")
+                assert False
+            for k in path:
+                users[k].add(v)
+            routes[v] = (path, vertex_path)
+            nb_reroutes += 1
+            dirty[v] = True
+
+        # Re-evaluate the key of a vertex whose route changed since it was pushed
+        if dirty[v]:
+            dirty[v] = False
+            heapq.heappush(heap, get_key(v))
+            continue
+
+        # Reserve the throughput on the route, and mask links that cannot
+        # carry another vertex with the same requirement
+        routed[v] = True
+        residual[path] -= required[v]
+        saturated = [k for k in path if residual[k] <= t]
+        usable[saturated] = False
+        if trace and saturated:
+            logger.log(TRACE, "Edges %s are saturated after routing vertex %s", saturated, v)
+        for k in path:
+            users[k].discard(v)
+            dirty[list(users[k])] = True
+
+        eroutes[v] = [path]
+        vroutes[v] = vertex_path
+
+    log_summary(logger, "Priority planning",
+                {"vertices": nb_vertices, "re-routes": nb_reroutes, "saturated edges": np.sum(~usable)},
+                start)
+
+    set_attribute(g, 'vs', "eroute", eroutes)
+    set_attribute(g, 'vs', "vroute", vroutes)
+    set_attribute(g, 'es', "tp", residual)
+    set_attribute(g, 'es', "saturated", ~usable)
+
+    return g
+
+
+@profiled
+def planning_algorithm_flow(g, t, w=None):
+    """
+    Flow-based planning algorithm. The backhaul towards the PoP is solved as a
+    maximum flow from all vertices to the PoP, so the number of vertices that
+    can be served follows from a single computation instead of failing on the
+    first saturated link. Flows are counted in vertices: as in
+    `planning_algorithm`, a link carries a vertex as long as its residual
+    throughput exceeds the requirement `t`, i.e. ceil(tp / t) - 1 vertices. The
+    integral maximum flow then decomposes into a single route per served vertex.
+
+    Params
+    ------
+    g : iGraph or dict
+        Prepared graph, with throughput `tp` on the edges, or its array
+        representation
+    t : integer
+        CPE throughput requirement in Mbps
+
+    Returns
+    -------
+    g : iGraph or dict
+        Input graph with the route of each served vertex as vertex attributes
+        `eroute` (edge ids) and `vroute` (vertex ids), None for vertices that
+        cannot be served, the residual throughput as edge attribute `tp` and the
+        saturated links marked with `saturated`. The graph attributes `nb_served`
+        and `bottleneck` hold the number of served CPE vertices and the edge ids
+        of a minimum cut that limits the flow.
+    """
+
+    nb_vertices = get_nb_vertices(g)
+    edges = get_edges(g)
+    tp = np.array(get_attribute(g, 'es', "tp"), dtype=float)
+    units = np.maximum(np.ceil(tp / t) - 1, 0)
+
+    # Both directions of every link (arc 2k and 2k + 1 for edge k), and an arc
+    # from a super source with a capacity of one vertex towards every CPE
+    source = nb_vertices
+    cpes = np.arange(1, nb_vertices)
+    arcs = np.concatenate((edges, edges[:, ::-1]), axis=1).reshape(-1, 2)
+    arcs = np.concatenate((arcs, np.column_stack((np.full(len(cpes), source), cpes))))
+    capacity = np.concatenate((np.repeat(units, 2), np.ones(len(cpes))))
+
+    with profile_stage("maxflow", nb_arcs=len(arcs)):
+        flow_graph = ig.Graph(n=nb_vertices + 1, edges=arcs.tolist(), directed=True)
+        flow = flow_graph.maxflow(source, 0, capacity.tolist())
+    arc_flow = np.rint(flow.flow).astype(np.int64)
+
+    # Net flow per link, so opposite flows on the same link cancel
+    net = arc_flow[0:2 * len(edges):2] - arc_flow[1:2 * len(edges):2]
+    served = arc_flow[2 * len(edges):] > 0
+    logger.info("Maximum flow serves %s of %s vertices", np.sum(served), len(cpes))
+
+    # Outgoing links with flow of every vertex
+    out = [[] for _ in range(nb_vertices)]
+    remaining = np.abs(net)
+    for k in np.flatnonzero(net):
+        out[edges[k, 0] if net[k] > 0 else edges[k, 1]].append(k)
+
+    eroutes = [None] * nb_vertices
+    vroutes = [None] * nb_vertices
+    eroutes[0] = [[]]
+    vroutes[0] = []
+    for v in cpes[served]:
+        # Follow one unit of flow towards the PoP, dropping cycles
+        path = []
+        vertex_path = [v]
+        while vertex_path[-1] != 0:
+            u = vertex_path[-1]
+            while remaining[out[u][-1]] == 0:
+                out[u].pop()
+            k = out[u][-1]
+            remaining[k] -= 1
+            nxt = edges[k, 1] if edges[k, 0] == u else edges[k, 0]
+            if nxt in vertex_path:
+                cut = vertex_path.index(nxt)
+                del vertex_path[cut + 1:]
+                del path[cut:]
+            else:
+                path.append(int(k))
+                vertex_path.append(int(nxt))
+
+        eroutes[v] = [path]
+        vroutes[v] = [int(x) for pair in zip(vertex_path[:-1], vertex_path[1:]) for x in pair]
+
+    bottleneck = sorted({k // 2 for k in flow.cut if k < 2 * len(edges)})
+    if not np.all(served):
+        logger.info("Vertices %s cannot be served, bottleneck edges %s", cpes[~served].tolist(), bottleneck)
+
+    # Residual throughput of the decomposed routes, the cycles of the flow that
+    # were dropped above carry no vertex
+    load = get_route_load(eroutes, len(edges))
+    residual = tp - load * t
+    verify_route_load(tp, residual, eroutes, t)
+    set_attribute(g, 'vs', "eroute", eroutes)
+    set_attribute(g, 'vs', "vroute", vroutes)
+    set_attribute(g, 'es', "tp", residual)
+    set_attribute(g, 'es', "saturated", load >= units)
+    (g["attributes"] if is_network(g) else g)["nb_served"] = int(np.sum(served))
+    (g["attributes"] if is_network(g) else g)["bottleneck"] = bottleneck
+
+    return g
+
+
+def get_route_load(eroutes, nb_edges):
+    """
+    Number of routes over every edge.
+
+    Params
+    ------
+    eroutes : list
+        Route of every vertex as a list of edge id paths, None if not routed,
+        cf. the vertex attribute `eroute` of the planners
+    nb_edges : int
+        Number of edges
+
+    Returns
+    -------
+    load : np.ndarray
+        Number of routes per edge id
+    """
+
+    paths = [k for eroute in eroutes if eroute for path in eroute for k in path]
+
+    return np.bincount(np.array(paths, dtype=np.int64), minlength=nb_edges)
+
+
+def verify_route_load(tp, residual, eroutes, t):
+    """
+    Verify that the throughput reserved on every edge, i.e. the throughput
+    before planning minus the residual, is the requirement `t` of the routes
+    over that edge.
+
+    Params
+    ------
+    tp : np.ndarray
+        Throughput of every edge before planning in Mbps
+    residual : np.ndarray
+        Residual throughput of every edge after planning in Mbps
+    eroutes : list
+        Route of every vertex, cf. `get_route_load`
+    t : integer
+        CPE throughput requirement in Mbps
+    """
+
+    load = get_route_load(eroutes, len(tp))
+    wrong = np.flatnonzero(~np.isclose(np.asarray(tp) - np.asarray(residual), load * t))
+    if len(wrong):
+        print(f"Residual throughput of edges {wrong.tolist()} does not match their routes")
+        assert False
+
+
+def get_pop_partition(g, pops):
+    """
+    Assign every vertex to its nearest PoP in hop count, via a single
+    multi-source breadth-first search from all PoPs. Ties go to the PoP that
+    reaches the vertex first.
+
+    Params
+    ------
+    g : iGraph
+        Input graph
+    pops : list[int]
+        Vertex indices of the PoPs
+
+    Returns
+    -------
+    owner : np.ndarray
+        Index in `pops` of the PoP of each vertex, -1 if no PoP is reachable
+    """
+
+    indptr, nbr, eid = get_adjacency_arrays(g)
+    owner = [-1] * g.vcount()
+    for i, pop in enumerate(pops):
+        owner[pop] = i
+    queue = collections.deque(pops)
+    while queue:
+        u = queue.popleft()
+        for k in range(indptr[u], indptr[u + 1]):
+            w = nbr[k]
+            if owner[w] == -1:
+                owner[w] = owner[u]
+                queue.append(w)
+
+    return np.array(owner, dtype=np.int64)
+
+
+def plan_partition(task):
+    """
+    Plan the subgraph of a single PoP, with the PoP as vertex 0, cf.
+    `network_planning_multi_pop`. Runs in a worker process.
+
+    Params
+    ------
+    task : tuple
+        (subgraph, t, algorithm)
+
+    Returns
+    -------
+    sub : iGraph
+        Planned subgraph, or None if the planning failed
+    """
+    sub, t, algorithm = task
+
+    return network_planning(sub, t, algorithm=algorithm)
+
+
+@profiled
+def network_planning_multi_pop(g, t, algorithm='incremental', max_workers=None):
+    """
+    Network planning towards several PoPs. Every vertex is assigned to its
+    nearest PoP, cf. `get_pop_partition`, and the subgraph of every PoP is
+    planned separately in a pool of worker processes, with the planner of
+    `network_planning`. The routes are then merged into the input graph. Links
+    between partitions are not used. The partitions are induced igraph subgraphs,
+    so an array representation is planned as an igraph copy.
+
+    Params
+    ------
+    g : iGraph or dict
+        Prepared graph with the PoPs as vertices of type `PoP`, cf. `set_pops`
+        in graph_creation, or its array representation, cf. `get_network`
+    t : integer
+        CPE throughput requirement in Mbps
+    algorithm : str
+        Planning algorithm, cf. `network_planning`
+    max_workers : int
+        Number of worker processes. Defaults to the number of CPUs. With 1
+        worker, all partitions are planned in the calling process.
+
+    Returns
+    -------
+    g : iGraph
+        Input graph with the route of each vertex towards its PoP as vertex
+        attributes `eroute` (edge ids) and `vroute` (vertex ids), its PoP as
+        `pop`, the residual throughput as edge attribute `tp` and the saturated
+        links marked with `saturated`. None if a partition could not be planned.
+    """
+
+    network = is_network(g)
+    g = get_graph(g)
+    pops = get_pops(g)
+    owner = get_pop_partition(g, pops)
+    if np.any(owner < 0):
+        logger.warning("%s vertices cannot reach a PoP and are not planned", np.sum(owner < 0))
+
+    # Subgraph of every PoP with the PoP first, keeping the original vertex and
+    # edge indices as attributes
+    g.vs["vid"] = list(range(g.vcount()))
+    g.es["eid"] = list(range(g.ecount()))
+    tasks = []
+    for i, pop in enumerate(pops):
+        members = np.flatnonzero(owner == i)
+        sub = g.induced_subgraph(members.tolist())
+        perm = list(range(sub.vcount()))
+        k = int(np.searchsorted(members, pop))
+        perm[0], perm[k] = k, 0
+        sub = sub.permute_vertices(perm)
+        tasks.append((sub, t, algorithm))
+    logger.info("Planning %s partitions of %s vertices", len(pops), [sub.vcount() for sub, _, _ in tasks])
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) == 1:
+        planned = list(map(plan_partition, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            planned = list(executor.map(plan_partition, tasks))
+    if any(sub is None for sub in planned):
+        return None
+
+    # Merge the routes, mapping the subgraph indices back to the input graph
+    eroutes = [None] * g.vcount()
+    vroutes = [None] * g.vcount()
+    residual = g.es["tp"]
+    saturated = [False] * g.ecount()
+    for i, sub in enumerate(planned):
+        vid = sub.vs["vid"]
+        eid = sub.es["eid"]
+        for v, eroute, vroute in zip(vid, sub.vs["eroute"], sub.vs["vroute"]):
+            if eroute is not None:
+                eroutes[v] = [[eid[k] for k in path] for path in eroute]
+                vroutes[v] = [vid[u] for u in vroute]
+        for k, tp in zip(eid, sub.es["tp"]):
+            residual[k] = tp
+        if "saturated" in sub.es.attributes():
+            for k, sat in zip(eid, sub.es["saturated"]):
+                saturated[k] = sat
+
+    g.vs["eroute"] = eroutes
+    g.vs["vroute"] = vroutes
+    g.vs["pop"] = [pops[i] if i >= 0 else None for i in owner]
+    g.es["tp"] = residual
+    g.es["saturated"] = saturated
+    if algorithm == 'flow':
+        g["nb_served"] = sum(sub["nb_served"] for sub in planned)
+        g["bottleneck"] = sorted(sub.es[k]["eid"] for sub in planned for k in sub["bottleneck"])
+    del g.vs["vid"]
+    del g.es["eid"]
+
+    return get_network(g) if network else g
+
+
 if __name__ == '__main__':
     print("Running from main currently not supported")
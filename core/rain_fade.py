@@ -0,0 +1,316 @@
+#!/usr/bin/python
+
+import sys
+import os
+import csv
+import time
+import logging
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+
+from util_cache import load_cached
+from util_linkbudget import get_link_budget, get_rain_specific_attenuation, get_throughput
+from util_logging import log_summary
+from util_network import get_graph
+from util_profile import profiled, profile_stage
+from graph_creation import graph_creation
+from graph_preparation import get_connected_graph, get_pop_edges
+from graph_extension import read_locations
+
+logger = logging.getLogger(__name__)
+
+# Logging definitions
+log_level = logging.INFO
+log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
+datefmt = '%d-%b-%y %H:%M:%S'
+log_fn = 'rain_fade.log'
+
+# Data directory of the repository, default of the command line interfaces
+default_datapath = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+# Number of link evaluations per block of weather states, bounds the memory of the
+# simulation to a few arrays of this size
+default_block_size = 1 << 22
+
+
+def read_rain_trace(trace):
+    """
+    Parse a rain rate trace, with one row per time step, e.g. per minute. The first
+    column holds the time stamps, the other columns the rain rate in mm/h of every
+    rain cell, or a single column for rain that is uniform over the coverage area.
+
+    Params
+    ------
+    trace : str
+        Relative path towards the CSV trace, with a header naming the rain cells
+
+    Return
+    ------
+    trace : dict
+        Dictionary with arrays `time` (str), `rain` (float, time steps x cells) and
+        `cells` (str) with the names of the rain cells
+    """
+
+    with open(trace, 'r') as csvFile:
+        header = next(csv.reader(csvFile))
+
+    times = np.loadtxt(trace, delimiter=',', skiprows=1, usecols=0, dtype=str, ndmin=1)
+    rain = np.loadtxt(trace, delimiter=',', skiprows=1, usecols=range(1, len(header)),
+                      dtype=float, ndmin=2)
+
+    return {"time": times, "rain": rain, "cells": np.array(header[1:])}
+
+
+def read_rain_cells(cells):
+    """
+    Parse the locations of the rain cells of a trace, e.g. the rain gauges or the
+    centres of the radar pixels, in the coordinates of the `basestations_N.csv` data
+    sets
+
+    Params
+    ------
+    cells : str
+        Relative path towards the CSV file with columns `cell`, `x (m)` and `y (m)`
+
+    Return
+    ------
+    cells : dict
+        Dictionary with arrays `cell` (str), `x` and `y` (float)
+    """
+
+    data = np.loadtxt(cells, delimiter=',', skiprows=1, dtype=str, ndmin=2)
+
+    return {"cell": data[:, 0], "x": data[:, 1].astype(float), "y": data[:, 2].astype(float)}
+
+
+def get_link_cells(g, locations, cells, trace_cells=None):
+    """
+    Assign every link to the rain cell closest to its midpoint. EDGE devices have no
+    location in the data sets, so their links are located at their CPE device.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph, or its array representation, cf. `get_network`
+    locations : dict
+        Device locations, as returned by `read_locations`
+    cells : dict
+        Rain cells, as returned by `read_rain_cells`
+    trace_cells : np.ndarray
+        Names of the rain cells in the order of the columns of the trace. By default,
+        the order of `cells`.
+
+    Return
+    ------
+    link_cells : np.ndarray
+        Column of the trace for every edge of g
+    """
+
+    g = get_graph(g)
+    edges = np.array(g.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    ids = np.array(g.vs["id"], dtype=np.int64)[edges]
+    known = (np.array(g.vs["type"])[edges] != 'EDGE') & (ids < len(locations["x"]))
+    if not np.all(known.any(axis=1)):
+        raise ValueError("Links between devices without location cannot be assigned to rain cells")
+
+    ids = np.where(known, ids, 0)
+    x = np.sum(locations["x"][ids] * known, axis=1) / known.sum(axis=1)
+    y = np.sum(locations["y"][ids] * known, axis=1) / known.sum(axis=1)
+    nearest = np.argmin((x[:, None] - cells["x"]) ** 2 + (y[:, None] - cells["y"]) ** 2, axis=1)
+
+    if trace_cells is None:
+        return nearest
+    column = {name: i for i, name in enumerate(trace_cells)}
+    missing = set(cells["cell"][nearest]) - set(column)
+    if missing:
+        raise ValueError(f"Rain cells {sorted(missing)} are not in the trace")
+
+    return np.array([column[name] for name in cells["cell"][nearest]], dtype=np.int64)
+
+
+@profiled
+def rain_fade_simulation(g, t, rain, f=60e9, sa=0, vd=0, link_cells=None, block_size=default_block_size):
+    """
+    Re-evaluate the throughput of all links and the PoP feasibility of a network for
+    every time step of a rain rate trace. The topology is fixed, so the dry link
+    budget is evaluated once and only the rain attenuation is added per time step,
+    cf. `get_pathloss`. Time steps with the same rain rates in all cells, e.g. all
+    dry minutes, are evaluated once, and the weather states are evaluated in
+    blocks of `block_size` links.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph, as for `graph_preparation`
+    t : integer
+        CPE throughput requirement in Mbps
+    rain : np.ndarray
+        Rain rate in mm/h per time step, or per time step and rain cell
+    f, sa, vd :
+        Radio profile, cf. `graph_preparation`
+    link_cells : np.ndarray
+        Rain cell, i.e. column of `rain`, of every edge of g, cf. `get_link_cells`.
+        The cells follow the edges when g is reduced to its connected subgraph.
+        Required when the rain is not uniform.
+    block_size : int
+        Number of link evaluations per block of weather states
+
+    Return
+    ------
+    result : dict
+        `total_throughput`, `pop_throughput` in Mbps, `feasible` and the number of
+        links with a lower throughput than without rain `nb_degraded` per time step,
+        the fraction of time steps in which each link is degraded `link_degraded`,
+        as well as `nb_vertices`, `nb_edges` and the number of
+        distinct weather states `nb_states`. None when the PoP is not connected.
+    """
+    start = time.perf_counter()
+    g = get_graph(g)
+
+    rain = np.asarray(rain, dtype=float)
+    if rain.ndim == 1:
+        rain = rain[:, None]
+    if link_cells is not None:
+        link_cells = np.asarray(link_cells, dtype=np.int64)
+        if len(link_cells) != g.ecount():
+            raise ValueError(f"{len(link_cells)} link cells given for a graph with {g.ecount()} edges")
+        if len(link_cells) and (link_cells.min() < 0 or link_cells.max() >= rain.shape[1]):
+            raise ValueError(f"Link cells must be columns of the trace, i.e. in [0, {rain.shape[1]})")
+        # The reduction to the connected subgraph keeps the edge attributes, so the
+        # cells are carried as an attribute of a copy of the input graph
+        g = g.copy()
+        g.es["rain_cell"] = link_cells.tolist()
+
+    g = get_connected_graph(g)
+    if g is None:
+        return None
+
+    if link_cells is None:
+        if rain.shape[1] != 1:
+            raise ValueError("The rain cells of the links are required for a spatially varying trace")
+        link_cells = np.zeros(g.ecount(), dtype=np.int64)
+    else:
+        link_cells = np.array(g.es["rain_cell"], dtype=np.int64)
+
+    # Weather independent terms, evaluated once
+    distances = np.array(g.es["weight"], dtype=float)
+    pl_dry, tp_dry, _ = get_link_budget(distances, f, sa, vd, 0)
+    pop_edges = get_pop_edges(g)
+    demand = g.vcount() * t
+
+    # Distinct weather states over the rain cells of the links. Most time steps are
+    # dry, so only the wet ones are sorted, and the dry state is added in front.
+    used, link_cells = np.unique(link_cells, return_inverse=True)
+    with profile_stage("weather_states", nb_steps=len(rain)):
+        rain = rain[:, used]
+        wet = np.any(rain != 0, axis=1)
+        states, wet_inverse, counts = np.unique(rain[wet], axis=0, return_inverse=True,
+                                                return_counts=True)
+        states = np.vstack((np.zeros((1, len(used))), states))
+        counts = np.concatenate(([len(rain) - len(wet_inverse)], counts))
+        inverse = np.zeros(len(rain), dtype=np.int64)
+        inverse[wet] = wet_inverse.reshape(-1) + 1
+
+    nb_states = len(states)
+    total_tp = np.zeros(nb_states)
+    pop_tp = np.zeros(nb_states)
+    nb_degraded = np.zeros(nb_states, dtype=np.int64)
+    link_degraded = np.zeros(g.ecount())
+
+    block = max(1, block_size // max(g.ecount(), 1))
+    with profile_stage("rain_fade", nb_states=nb_states, nb_edges=g.ecount()):
+        for i in range(0, nb_states, block):
+            s = slice(i, i + block)
+            # Same operations as `get_pathloss` with the rain rate of the cell of every link
+            ra = get_rain_specific_attenuation(f, states[s])[:, link_cells] * distances / 1000
+            tp = get_throughput(pl_dry + ra, f)
+
+            total_tp[s] = np.sum(tp, axis=1)
+            pop_tp[s] = np.sum(tp[:, pop_edges], axis=1)
+            degraded = tp < tp_dry
+            nb_degraded[s] = np.sum(degraded, axis=1)
+            link_degraded += counts[s] @ degraded
+
+    result = {
+        "total_throughput": total_tp[inverse],
+        "pop_throughput": pop_tp[inverse],
+        "feasible": pop_tp[inverse] >= demand,
+        "nb_degraded": nb_degraded[inverse],
+        "link_degraded": link_degraded / max(len(rain), 1),
+        "nb_vertices": g.vcount(),
+        "nb_edges": g.ecount(),
+        "nb_states": nb_states,
+    }
+    log_summary(logger, "rain fade", {"time steps": len(rain), "weather states": nb_states,
+                                      "infeasible time steps": int(np.sum(~result["feasible"]))}, start)
+
+    return result
+
+
+def print_rain_fade(result, t):
+    """
+    Print the availability of a network over a rain rate trace, cf. `rain_fade_simulation`.
+    """
+    nb_steps = len(result["feasible"])
+    print("----------------------------------------------------------------------")
+    print(f"Rain fade over {nb_steps} time steps ({result['nb_states']} weather states), "
+          f"{result['nb_vertices']} vertices, {result['nb_edges']} edges, t = {t} Mbps")
+    print(f"  Network availability:           {np.mean(result['feasible']) * 100:.4f} %")
+    print(f"  Infeasible time steps:          {np.sum(~result['feasible'])}")
+    print(f"  Minimum PoP throughput:         {np.min(result['pop_throughput'], initial=np.inf) / 1000} Gbps")
+    print(f"  Maximum degraded links:         {np.max(result['nb_degraded'], initial=0)}")
+    print(f"  Links degraded > 1 % of time:   {np.sum(result['link_degraded'] > 0.01)}")
+    print("----------------------------------------------------------------------")
+
+
+def main(argv=None):
+    """
+    Command line interface, cf. `fwa.py`.
+    """
+    parser = argparse.ArgumentParser(description="Simulate rain fade over a rain rate trace")
+    parser.add_argument("scenario", help="scenario directory, e.g. UC1_100CPE_UrbanVillage")
+    parser.add_argument("trace", help="CSV rain rate trace in mm/h, one row per time step")
+    parser.add_argument("--cells", default=None,
+                        help="CSV locations of the rain cells of a spatially varying trace")
+    parser.add_argument("--datapath", default=default_datapath, help="data directory")
+    parser.add_argument("--drop", type=int, default=0, help="drop index")
+    parser.add_argument("-f", type=float, default=60e9, help="carrier frequency in Hz")
+    parser.add_argument("--vd", type=float, default=0, help="vegetation depth")
+    parser.add_argument("--sa", type=float, default=0, help="specific attenuation in dB/km")
+    parser.add_argument("-t", type=float, default=300, help="CPE throughput requirement in Mbps")
+    parser.add_argument("--cache-dir", default=None, help="directory of the binary cache of parsed data sets")
+    parser.add_argument("-o", "--output", default=None, help="CSV file for the per time step results")
+    args = parser.parse_args(argv)
+    logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+
+    g = graph_creation(f"{args.datapath}/{args.scenario}/links_{args.drop}.csv", print_stats=False,
+                       cache_dir=args.cache_dir)
+    if g == -1:
+        sys.exit(f"Cannot create graph of drop {args.drop} of {args.scenario}")
+
+    trace = load_cached(args.trace, read_rain_trace, args.cache_dir)
+    link_cells = None
+    if args.cells:
+        locations = load_cached(f"{args.datapath}/{args.scenario}/basestations_{args.drop}.csv",
+                                read_locations, args.cache_dir)
+        link_cells = get_link_cells(g, locations, read_rain_cells(args.cells), trace["cells"])
+
+    result = rain_fade_simulation(g, args.t, trace["rain"], f=args.f, sa=args.sa, vd=args.vd,
+                                  link_cells=link_cells)
+    if result is None:
+        sys.exit(f"The PoP of drop {args.drop} of {args.scenario} is not connected")
+    print_rain_fade(result, args.t)
+
+    if args.output:
+        with open(args.output, 'w', newline='') as csvFile:
+            writer = csv.writer(csvFile)
+            writer.writerow(["time", "total_throughput", "pop_throughput", "feasible", "nb_degraded"])
+            writer.writerows(zip(trace["time"], result["total_throughput"], result["pop_throughput"],
+                                 result["feasible"].astype(int), result["nb_degraded"]))
+
+
+if __name__ == '__main__':
+    main()
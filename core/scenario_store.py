@@ -0,0 +1,270 @@
+#!/usr/bin/python
+
+import sys
+import os
+import re
+import logging
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+
+from util_store import write_store, open_store, read_store_header
+from graph_creation import read_links, graph_from_links, set_pops
+from link_generation import read_basestations
+
+logger = logging.getLogger(__name__)
+
+# Logging definitions
+log_level = logging.INFO
+log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
+datefmt = '%d-%b-%y %H:%M:%S'
+log_fn = 'scenario_store.log'
+
+# Data directory of the repository, default of the command line interfaces
+default_datapath = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+# Columns of the links and devices of every drop, cf. `read_links` and `read_basestations`
+link_columns = ["nodeA", "nodeB", "distance", "maxbitrate", "maxpathloss"]
+device_columns = ["id", "x", "y", "z", "type"]
+
+
+def get_store_file(datapath, scen):
+    """
+    Return the default store file of a scenario, next to its directory.
+    """
+    return os.path.join(datapath, f"{scen}.store")
+
+
+def get_sources(datapath, scen):
+    """
+    Return the modification time and size of the data sets of a scenario that are
+    packed into its store, i.e. all `links_N.csv` and `basestations_N.csv`.
+
+    Params
+    ------
+    datapath : str
+        Relative path towards the data directory
+    scen : str
+        Scenario directory in `datapath`
+
+    Return
+    ------
+    sources : dict
+        File name -> [modification time in ns, size in bytes]
+    """
+    directory = os.path.join(datapath, scen)
+    sources = {}
+    for fn in sorted(os.listdir(directory)):
+        if re.match(r'(links|basestations)_\d+\.csv$', fn):
+            stat = os.stat(os.path.join(directory, fn))
+            sources[fn] = [stat.st_mtime_ns, stat.st_size]
+
+    return sources
+
+
+def is_store_current(datapath, scen, path=None):
+    """
+    Return whether the store of a scenario exists and was packed from its current
+    data sets, cf. `get_sources`. Data sets that were regenerated, added or removed
+    since the store was packed, and stores without recorded sources, make it stale.
+
+    Params
+    ------
+    datapath : str
+        Relative path towards the data directory
+    scen : str
+        Scenario directory in `datapath`
+    path : str
+        Path towards the store file, cf. `get_store_file` for the default
+
+    Return
+    ------
+    current : bool
+        The store can be used as it is
+    """
+    path = path or get_store_file(datapath, scen)
+    if not os.path.isfile(path):
+        return False
+    try:
+        meta = read_store_header(path)["meta"]
+    except (OSError, ValueError):
+        return False
+    current = meta.get("sources") == get_sources(datapath, scen)
+    if not current:
+        logger.info("Store %s is stale, its data sets changed since it was packed", path)
+
+    return current
+
+
+def pack_scenario(datapath, scen, output=None):
+    """
+    Pack all drops of a scenario into a single store file, cf. `write_store`. The
+    links (`links_N.csv`) and devices (`basestations_N.csv`) of all drops are
+    concatenated column by column, with the offset of every drop in an index
+    array, so the store of a scenario is parsed only once. The modification time and
+    size of every data set are recorded, cf. `is_store_current`.
+
+    Params
+    ------
+    datapath : str
+        Relative path towards the data directory
+    scen : str
+        Scenario directory in `datapath`
+    output : str
+        Path towards the store file, cf. `get_store_file` for the default
+
+    Return
+    ------
+    output : str
+        Path towards the store file
+    """
+    directory = os.path.join(datapath, scen)
+    # Recorded before reading, so a data set written meanwhile makes the store stale
+    sources = get_sources(datapath, scen)
+    drops = sorted(int(m.group(1)) for m in map(re.compile(r'links_(\d+)\.csv$').match,
+                                                   os.listdir(directory)) if m)
+
+    links = {c: [] for c in link_columns}
+    devices = {c: [] for c in device_columns}
+    link_count = []
+    device_count = []
+    for drop in drops:
+        drop_links = read_links(os.path.join(directory, f"links_{drop}.csv"))
+        for c in link_columns:
+            links[c].append(drop_links[c])
+        link_count.append(len(drop_links["nodeA"]))
+
+        basestations = os.path.join(directory, f"basestations_{drop}.csv")
+        drop_devices = read_basestations(basestations) if os.path.isfile(basestations) else \
+            {c: np.zeros(0) for c in device_columns}
+        for c in device_columns:
+            devices[c].append(drop_devices[c])
+        device_count.append(len(drop_devices["id"]))
+
+    arrays = {"drops": np.array(drops, dtype=np.int64),
+              "link_offset": np.concatenate(([0], np.cumsum(link_count))).astype(np.int64),
+              "device_offset": np.concatenate(([0], np.cumsum(device_count))).astype(np.int64)}
+    arrays.update({f"links_{c}": np.concatenate(links[c]) if drops else np.zeros(0) for c in link_columns})
+    arrays.update({f"devices_{c}": np.concatenate(devices[c]) if drops else np.zeros(0)
+                   for c in device_columns})
+
+    output = output or get_store_file(datapath, scen)
+    write_store(output, arrays, meta={"scenario": scen, "sources": sources})
+    logger.info("Packed %s drops of %s with %s links into %s",
+                len(drops), scen, arrays['link_offset'][-1], output)
+
+    return output
+
+
+def open_scenario(path):
+    """
+    Open the store of a scenario, cf. `pack_scenario`. The arrays are memory-mapped,
+    so parallel workers that open the same store share its pages.
+
+    Params
+    ------
+    path : str
+        Path towards the store file
+
+    Return
+    ------
+    store : dict
+        Memory-mapped arrays of the store, to be used with `get_drop_links` and
+        `get_drop_devices`
+    """
+    store, meta = open_store(path)
+    store["scenario"] = meta.get("scenario")
+    store["drop_index"] = {int(d): i for i, d in enumerate(store["drops"])}
+
+    return store
+
+
+def get_drop_links(store, drop):
+    """
+    Return the links of a drop as views of the store, without copying.
+
+    Params
+    ------
+    store : dict
+        Scenario store, as returned by `open_scenario`
+    drop : int
+        Drop index, i.e. `N` in `links_N.csv`
+
+    Return
+    ------
+    links : dict
+        Links of the drop, with the arrays returned by `read_links`
+    """
+    i = store["drop_index"][drop]
+    start, end = store["link_offset"][i], store["link_offset"][i + 1]
+
+    return {c: store[f"links_{c}"][start:end] for c in link_columns}
+
+
+def get_drop_devices(store, drop):
+    """
+    Return the devices of a drop as views of the store, without copying.
+
+    Params
+    ------
+    store : dict
+        Scenario store, as returned by `open_scenario`
+    drop : int
+        Drop index, i.e. `N` in `basestations_N.csv`
+
+    Return
+    ------
+    devices : dict
+        Devices of the drop, with the arrays returned by `read_basestations`
+    """
+    i = store["drop_index"][drop]
+    start, end = store["device_offset"][i], store["device_offset"][i + 1]
+
+    return {c: store[f"devices_{c}"][start:end] for c in device_columns}
+
+
+def get_drop_graph(store, drop, print_stats=False):
+    """
+    Build the graph of a drop from the store, cf. `graph_creation`. The PoPs are
+    taken from the devices of the drop.
+
+    Params
+    ------
+    store : dict
+        Scenario store, as returned by `open_scenario`
+    drop : int
+        Drop index
+    print_stats : bool
+        Print graph statistics to terminal console
+
+    Return
+    ------
+    g : iGraph
+        Graph with vertices representing CPE devices and edges representing wireless LOS links
+    """
+    g = graph_from_links([get_drop_links(store, drop)], print_stats=print_stats)
+    devices = get_drop_devices(store, drop)
+    if len(devices["id"]):
+        g = set_pops(g, devices["id"][devices["type"] == 'PoP'].tolist())
+
+    return g
+
+
+def main(argv=None):
+    """
+    Command line interface, cf. `fwa.py`.
+    """
+    parser = argparse.ArgumentParser(description="Pack all drops of scenarios into store files")
+    parser.add_argument("scenarios", nargs='+', help="scenario directories, e.g. UC1_100CPE_UrbanVillage")
+    parser.add_argument("--datapath", default=default_datapath, help="data directory")
+    args = parser.parse_args(argv)
+    logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+
+    for scen in args.scenarios:
+        print(f"{scen}: {pack_scenario(args.datapath, scen)}")
+
+
+if __name__ == '__main__':
+    main()
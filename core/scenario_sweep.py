@@ -0,0 +1,384 @@
+#!/usr/bin/python
+
+import sys
+import os
+import csv
+import logging
+import argparse
+import itertools
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+
+from graph_creation import graph_creation
+from graph_preparation import graph_preparation_profiles, get_profile_name, get_pop_edges
+from graph_analysis import graph_analysis
+from edge_placement import edge_placement
+from util_network import get_network
+from scenario_store import default_datapath, get_store_file, pack_scenario, open_scenario, \
+    get_drop_graph, is_store_current
+
+logger = logging.getLogger(__name__)
+
+# Logging definitions
+log_level = logging.INFO
+log_format = "[%(asctime)s] - {%(module)s:%(lineno)d} - %(levelname)s - %(message)s"
+datefmt = '%d-%b-%y %H:%M:%S'
+log_fn = 'scenario_sweep.log'
+
+# Radio profile parameters, in the order they appear in the result table
+profile_keys = ["f", "pr", "vd", "sa", "t"]
+profile_defaults = {"f": 60e9, "pr": 0, "vd": 0, "sa": 0, "t": 300}
+
+# Profiles evaluated in examples/network_capacity_overview.py
+default_profiles = [
+    {"f": 60e9}, {"f": 60e9, "pr": 15}, {"f": 60e9, "pr": 25}, {"f": 60e9, "vd": 0.1},
+    {"f": 140e9}, {"f": 140e9, "pr": 15}, {"f": 140e9, "pr": 25}, {"f": 140e9, "vd": 0.1},
+]
+
+drop_metrics = ["nb_vertices", "nb_edges", "total_capacity", "total_throughput",
+                "pop_throughput", "feasible"]
+analysis_metrics = ["avg_degree", "median_distance", "radius", "pop_eccentricity",
+                    "pop_hop_count"]
+placement_metrics = ["nb_edge_nodes"]
+
+# Scenario stores opened by this process, cf. `open_scenario`
+open_stores = {}
+
+
+def get_profiles(f=(60e9,), pr=(0,), vd=(0,), sa=(0,), t=(300,)):
+    """
+    Build the list of radio profiles of a full factorial sweep.
+
+    Params
+    ------
+    f, pr, vd, sa, t : list
+        Values of the carrier frequency (Hz), precipitation rate (mm/h),
+        vegetation depth (fraction), specific attenuation (dB/km) and CPE
+        throughput requirement (Mbps) to combine.
+
+    Return
+    ------
+    profiles : list[dict]
+        One dictionary per combination of parameter values
+    """
+    return [dict(zip(profile_keys, values)) for values in itertools.product(f, pr, vd, sa, t)]
+
+
+def parse_drops(drops):
+    """
+    Parse a drop selection such as `0-49` or `0,3,10-12` into drop indices.
+
+    Params
+    ------
+    drops : str
+        Comma separated list of drop indices and inclusive ranges
+
+    Return
+    ------
+    idx : list[int]
+        Drop indices
+    """
+    idx = []
+    for part in drops.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            idx.extend(range(int(first), int(last) + 1))
+        else:
+            idx.append(int(part))
+
+    return idx
+
+
+def sweep_drop(task):
+    """
+    Evaluate all radio profiles for a single drop of a scenario. The graph is
+    created once and all profiles are prepared on it in one pass.
+
+    Params
+    ------
+    task : tuple
+        (datapath, scenario, drop, profiles, analysis, cache_dir, edge_distance, store,
+        link_budget_table), see `scenario_sweep`
+
+    Return
+    ------
+    rows : list[dict]
+        One result row per profile. Empty when the drop could not be parsed.
+    """
+    datapath, scen, drop, profiles, analysis, cache_dir, edge_distance, store, link_budget_table = task
+
+    filename = f"{datapath}/{scen}/links_{drop}.csv"
+    if store:
+        path = get_store_file(datapath, scen)
+        if path not in open_stores:
+            open_stores[path] = open_scenario(path)
+        g = get_drop_graph(open_stores[path], drop) if drop in open_stores[path]["drop_index"] else -1
+    else:
+        g = graph_creation(filename, print_stats=False, cache_dir=cache_dir)
+    if g == -1:
+        logger.error("Skipping drop %s of %s: cannot create graph from %s", drop, scen, filename)
+        return []
+
+    stats = {}
+    if edge_distance is not None:
+        nb_vertices = g.vcount()
+        g = edge_placement(g, f"{datapath}/{scen}/basestations_{drop}.csv", edge_distance,
+                           print_stats=False, cache_dir=cache_dir)
+        stats["nb_edge_nodes"] = g.vcount() - nb_vertices
+
+    if analysis:
+        (_, ecc, radius, _, _, _, avg_hop, _, deg) = graph_analysis(
+            g, print_stats=False, weighted_stats=False, return_stats=True,
+            metrics=["degree", "eccentricity_hop", "radius_hop", "avg_path_length_hop"])
+        stats.update({
+            "avg_degree": np.mean(deg),
+            "median_distance": np.median(g.es["weight"]),
+            "radius": radius,
+            "pop_eccentricity": ecc[0],
+            "pop_hop_count": avg_hop[0],
+        })
+
+    # Prepare all radio profiles on the same topology, the PoP links of every profile are
+    # verified with its own throughput requirement. The profiles are stored as arrays of
+    # the array representation, which the rows below read directly.
+    profiles = [{**profile_defaults, **profile} for profile in profiles]
+    g_prep = graph_preparation_profiles(get_network(g), profile_defaults["t"], profiles, print_stats=False,
+                                        link_budget_table=link_budget_table)
+    if g_prep is not None:
+        pop_edges = get_pop_edges(g_prep)
+
+    rows = []
+    for p in profiles:
+        row = {"scenario": scen, "drop": drop, **{k: p[k] for k in profile_keys}}
+
+        if g_prep is None:
+            row.update({m: np.nan for m in drop_metrics})
+        else:
+            name = get_profile_name(**p)
+            tp = g_prep["es"][f"tp@{name}"]
+            pop_tp = np.sum(tp[pop_edges])
+            row.update({
+                "nb_vertices": g_prep["nb_vertices"],
+                "nb_edges": len(g_prep["edges"]),
+                "total_capacity": np.sum(g_prep["es"][f"cap@{name}"]) / 1000,
+                "total_throughput": np.sum(tp) / 1000,
+                "pop_throughput": pop_tp,
+                "feasible": int(pop_tp >= g_prep["nb_vertices"] * p["t"]),
+            })
+        row.update(stats)
+        rows.append(row)
+
+    return rows
+
+
+def scenario_sweep(scenarios, drops=range(50), profiles=default_profiles, datapath=default_datapath,
+                   analysis=False, max_workers=None, chunksize=None, output=None, cache_dir=None,
+                   edge_distance=None, store=False, link_budget_table=False):
+    """
+    Run the graph creation and preparation for all combinations of scenarios,
+    drops and radio profiles. Drops are distributed over a process pool, and
+    the per-drop results are streamed to `output` as they arrive.
+
+    Params
+    ------
+    scenarios : list[str]
+        Scenario directories in `datapath`, e.g. `UC1_100CPE_UrbanVillage`
+    drops : list[int]
+        Drop indices, i.e. `N` in `links_N.csv`
+    profiles : list[dict]
+        Radio profiles with keys `f`, `pr`, `vd`, `sa` and `t`. Missing keys
+        take the default values of `graph_preparation` and t = 300 Mbps.
+    datapath : str
+        Path towards the data directory, the `data` directory of the repository by default
+    analysis : bool
+        Add profile independent graph statistics (degree, radius, PoP
+        eccentricity and hop count) to each row
+    max_workers : int
+        Number of worker processes. Defaults to the number of CPUs. With 1
+        worker, all drops are processed in the calling process.
+    chunksize : int
+        Number of drops sent to a worker at once. Defaults to an even split
+        in four chunks per worker.
+    output : str
+        Path of a CSV file to which the result rows are written
+    cache_dir : str
+        Directory of the binary cache of parsed data sets, cf. `graph_creation`
+    edge_distance : float
+        If set, EDGE devices are placed in every drop to reconnect the unconnected
+        clusters within this maximum link distance in m, cf. `edge_placement`
+    store : bool
+        Read the links of all drops from the store of every scenario, cf.
+        `pack_scenario`, instead of parsing the data sets. Stores that do not
+        exist yet or are stale, cf. `is_store_current`, are packed first.
+    link_budget_table : bool
+        Interpolate the link budget in the table of every radio profile, cf.
+        `get_link_budget_table`, instead of evaluating it for every link
+
+    Return
+    ------
+    rows : list[dict]
+        Tidy result table with one row per scenario, drop and profile
+    """
+    tasks = [(datapath, scen, drop, profiles, analysis, cache_dir, edge_distance, store, link_budget_table)
+             for scen in scenarios for drop in drops]
+    if store:
+        for scen in scenarios:
+            if not is_store_current(datapath, scen):
+                pack_scenario(datapath, scen)
+                # A store mapped by an earlier sweep in this process still maps the old file
+                open_stores.pop(get_store_file(datapath, scen), None)
+    columns = ["scenario", "drop"] + profile_keys + drop_metrics + (analysis_metrics if analysis else []) \
+        + (placement_metrics if edge_distance is not None else [])
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (4 * max_workers))
+
+    logger.info("Sweep over %s drops and %s profiles with %s workers (chunksize %s)",
+                len(tasks), len(profiles), max_workers, chunksize)
+
+    rows = []
+    executor = None
+    csvFile = open(output, 'w', newline='') if output else None
+    try:
+        if csvFile:
+            writer = csv.DictWriter(csvFile, fieldnames=columns)
+            writer.writeheader()
+
+        if max_workers == 1:
+            results = map(sweep_drop, tasks)
+        else:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            results = executor.map(sweep_drop, tasks, chunksize=chunksize)
+
+        for drop_rows in results:
+            rows.extend(drop_rows)
+            if csvFile:
+                writer.writerows(drop_rows)
+                csvFile.flush()
+    finally:
+        if executor:
+            executor.shutdown()
+        if csvFile:
+            csvFile.close()
+
+    return rows
+
+
+def aggregate_sweep(rows, percentiles=(5, 50, 95)):
+    """
+    Aggregate the per-drop rows of a sweep over all drops of each scenario and
+    profile into means and percentiles. Drops with missing values (NaN) are
+    ignored.
+
+    Params
+    ------
+    rows : list[dict]
+        Result rows, as returned by `scenario_sweep`
+    percentiles : list
+        Percentiles to report for every metric
+
+    Return
+    ------
+    summary : list[dict]
+        One row per scenario and profile, with the number of drops and for
+        each metric `<metric>_mean` and `<metric>_p<percentile>`
+    """
+    groups = {}
+    for row in rows:
+        key = (row["scenario"],) + tuple(row[k] for k in profile_keys)
+        groups.setdefault(key, []).append(row)
+
+    summary = []
+    for key, group in groups.items():
+        entry = dict(zip(["scenario"] + profile_keys, key))
+        entry["nb_drops"] = len(group)
+        metrics = [m for m in drop_metrics + analysis_metrics + placement_metrics if m in group[0]]
+        for m in metrics:
+            values = np.array([r[m] for r in group], dtype=float)
+            values = values[~np.isnan(values)]
+            entry[f"{m}_mean"] = np.mean(values) if values.size else np.nan
+            for q in percentiles:
+                entry[f"{m}_p{q}"] = np.percentile(values, q) if values.size else np.nan
+        summary.append(entry)
+
+    return summary
+
+
+def print_summary(summary):
+    """
+    Print the network capacity and throughput of an aggregated sweep.
+
+    Params
+    ------
+    summary : list[dict]
+        Aggregated rows, as returned by `aggregate_sweep`
+    """
+    print("----------------------------------------------------------------------")
+    for entry in summary:
+        print(f"{entry['scenario']} @ {entry['f'] / 1e9:g} GHz, pr={entry['pr']}, vd={entry['vd']}, "
+              f"sa={entry['sa']}, t={entry['t']} ({entry['nb_drops']} drops)")
+        print(f"  Average total network capacity: {entry['total_capacity_mean']} Gbps")
+        print(f"  Average total throughput:       {entry['total_throughput_mean']} Gbps")
+        print(f"  Feasible drops:                 {entry['feasible_mean']}")
+    print("----------------------------------------------------------------------")
+
+
+def main(argv=None):
+    """
+    Command line interface, cf. `fwa.py`. Logging is only configured here, so
+    importing the module has no side effects.
+    """
+    parser = argparse.ArgumentParser(description="Sweep scenarios, drops and radio profiles")
+    parser.add_argument("scenarios", nargs='+', help="scenario directories, e.g. UC1_100CPE_UrbanVillage")
+    parser.add_argument("--datapath", default=default_datapath, help="data directory")
+    parser.add_argument("--drops", default='0-49', help="drop indices, e.g. 0-49 or 0,3,10-12")
+    parser.add_argument("-f", type=float, nargs='+', default=None, help="carrier frequencies in Hz")
+    parser.add_argument("--pr", type=float, nargs='+', default=None, help="precipitation rates in mm/h")
+    parser.add_argument("--vd", type=float, nargs='+', default=None, help="vegetation depths")
+    parser.add_argument("--sa", type=float, nargs='+', default=None, help="specific attenuations in dB/km")
+    parser.add_argument("-t", type=float, nargs='+', default=[300], help="CPE throughput requirements in Mbps")
+    parser.add_argument("--analysis", action='store_true', help="add graph analysis statistics")
+    parser.add_argument("--edge-distance", type=float, default=None,
+                        help="place EDGE devices to reconnect clusters within this link distance in m")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=None, help="drops per worker task")
+    parser.add_argument("--cache-dir", default=None, help="directory of the binary cache of parsed data sets")
+    parser.add_argument("--store", action='store_true',
+                        help="read the drops from the store of every scenario, packed on first use")
+    parser.add_argument("--link-budget-table", action='store_true',
+                        help="interpolate the link budget in per-profile tables instead of evaluating it per link")
+    parser.add_argument("-o", "--output", default=None, help="CSV file for the per-drop results")
+    parser.add_argument("--summary", default=None, help="CSV file for the aggregated results")
+    args = parser.parse_args(argv)
+    logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+
+    if args.f is None and args.pr is None and args.vd is None and args.sa is None:
+        profiles = [{**p, "t": t} for p in default_profiles for t in args.t]
+    else:
+        profiles = get_profiles(args.f or [60e9], args.pr or [0], args.vd or [0],
+                                args.sa or [0], args.t)
+
+    rows = scenario_sweep(args.scenarios, parse_drops(args.drops), profiles,
+                          datapath=args.datapath, analysis=args.analysis,
+                          max_workers=args.workers, chunksize=args.chunksize,
+                          output=args.output, cache_dir=args.cache_dir,
+                          edge_distance=args.edge_distance, store=args.store,
+                          link_budget_table=args.link_budget_table)
+    summary = aggregate_sweep(rows)
+    print_summary(summary)
+
+    if args.summary and summary:
+        with open(args.summary, 'w', newline='') as csvFile:
+            writer = csv.DictWriter(csvFile, fieldnames=list(summary[0].keys()))
+            writer.writeheader()
+            writer.writerows(summary)
+
+
+if __name__ == '__main__':
+    main()
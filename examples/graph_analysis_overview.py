@@ -22,7 +22,9 @@ def print_uc_statistics(scen):
     for i in range(0,50):
         filename = "../data/" + scen + "/links_" + str(i) + ".csv"
         g = graph_creation(filename, print_stats=False)
-        (_, ecc, radius, _, avg_path_length, _, avg_hop, _, deg) = graph_analysis(g, print_stats=False, weighted_stats=False, return_stats=True)
+        (_, ecc, radius, _, avg_path_length, _, avg_hop, _, deg) = graph_analysis(
+            g, print_stats=False, weighted_stats=False, return_stats=True,
+            metrics=["degree", "eccentricity_hop", "radius_hop", "avg_path_length_hop"])
         g_prep = graph_preparation(g, 300, f=60e9, print_stats=False)
         vertexcount.append(g_prep.vcount())
         degr_avg.append(np.mean(deg))
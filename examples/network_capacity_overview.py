@@ -7,7 +7,7 @@ import numpy as np
 sys.path.append('../core/')
 
 from graph_creation import graph_creation
-from graph_preparation import graph_preparation
+from graph_preparation import graph_preparation_profiles
 
 def print_capacity_info(scen):
 
@@ -28,35 +28,35 @@ def print_capacity_info(scen):
     total_throughput_60GHz_rain2 = []
     total_throughput_60GHz_veg = []
 
+    profiles = [
+        {"f": 60e9}, {"f": 60e9, "pr": 15}, {"f": 60e9, "pr": 25}, {"f": 60e9, "vd": 0.1},
+        {"f": 140e9}, {"f": 140e9, "pr": 15}, {"f": 140e9, "pr": 25}, {"f": 140e9, "vd": 0.1},
+    ]
+
     for i in range(0,50):
 
         filename = "../data/" + scen + "/links_" + str(i) + ".csv"
         g = graph_creation(filename, print_stats=False)
 
-        g_sunny = graph_preparation(g, t, f=60e9, print_stats=False)
-        total_capacity_60GHz_sunny.append(sum(g_sunny.es['cap']) / 1000)
-        total_throughput_60GHz_sunny.append(sum(g_sunny.es['tp']) / 1000)
-
-        g_rain1 = graph_preparation(g, t, f=60e9, pr=15, print_stats=False)
-        total_capacity_60GHz_rain1.append(sum(g_rain1.es['cap']) / 1000)
-        total_throughput_60GHz_rain1.append(sum(g_rain1.es['tp']) / 1000)
-
-        g_rain2 = graph_preparation(g, t, f=60e9, pr=25, print_stats=False)
-        total_capacity_60GHz_rain2.append(sum(g_rain2.es['cap']) / 1000)
-        total_throughput_60GHz_rain2.append(sum(g_rain2.es['tp']) / 1000)
-
-        g_veg = graph_preparation(g, t, f=60e9, vd=0.1, print_stats=False)
-        total_capacity_60GHz_veg.append(sum(g_veg.es['cap']) / 1000)
-        total_throughput_60GHz_veg.append(sum(g_veg.es['tp']) / 1000)
-
-        g_sunny = graph_preparation(g, t, f=140e9, print_stats=False)
-        total_capacity_140GHz_sunny.append(sum(g_sunny.es['cap']) / 1000)
-        g_rain1 = graph_preparation(g, t, f=140e9, pr=15, print_stats=False)
-        total_capacity_140GHz_rain1.append(sum(g_rain1.es['cap']) / 1000) 
-        g_rain2 = graph_preparation(g, t, f=140e9, pr=25, print_stats=False)
-        total_capacity_140GHz_rain2.append(sum(g_rain2.es['cap']) / 1000) 
-        g_veg = graph_preparation(g, t, f=140e9, vd=0.1, print_stats=False)
-        total_capacity_140GHz_veg.append(sum(g_veg.es['cap']) / 1000) 
+        # Prepare all frequency and weather variants on the same graph
+        g_prep = graph_preparation_profiles(g, t, profiles, print_stats=False)
+
+        total_capacity_60GHz_sunny.append(sum(g_prep.es['cap@60GHz']) / 1000)
+        total_throughput_60GHz_sunny.append(sum(g_prep.es['tp@60GHz']) / 1000)
+
+        total_capacity_60GHz_rain1.append(sum(g_prep.es['cap@60GHz_pr15']) / 1000)
+        total_throughput_60GHz_rain1.append(sum(g_prep.es['tp@60GHz_pr15']) / 1000)
+
+        total_capacity_60GHz_rain2.append(sum(g_prep.es['cap@60GHz_pr25']) / 1000)
+        total_throughput_60GHz_rain2.append(sum(g_prep.es['tp@60GHz_pr25']) / 1000)
+
+        total_capacity_60GHz_veg.append(sum(g_prep.es['cap@60GHz_vd0.1']) / 1000)
+        total_throughput_60GHz_veg.append(sum(g_prep.es['tp@60GHz_vd0.1']) / 1000)
+
+        total_capacity_140GHz_sunny.append(sum(g_prep.es['cap@140GHz']) / 1000)
+        total_capacity_140GHz_rain1.append(sum(g_prep.es['cap@140GHz_pr15']) / 1000)
+        total_capacity_140GHz_rain2.append(sum(g_prep.es['cap@140GHz_pr25']) / 1000)
+        total_capacity_140GHz_veg.append(sum(g_prep.es['cap@140GHz_vd0.1']) / 1000)
      
     # Print average total network capacity
     print("----------------------------------------------------------------------")
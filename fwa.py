@@ -0,0 +1,67 @@
+#!/usr/bin/python
+
+import sys
+import os
+import logging
+import argparse
+import importlib
+
+# Subcommand -> module in `core` whose `main` implements it. Modules are only
+# imported when their subcommand is run, so every command starts with the
+# dependencies it needs and nothing else.
+commands = {
+    "sweep": ("scenario_sweep", "sweep scenarios, drops and radio profiles"),
+    "store": ("scenario_store", "pack all drops of scenarios into store files"),
+    "links": ("link_generation", "regenerate links data sets from building footprints"),
+    "graph": ("graph_creation", "create the graph of a links data set"),
+    "analysis": ("graph_analysis", "analyse the graph of a links data set"),
+    "rain": ("rain_fade", "simulate rain fade over a rain rate trace"),
+}
+
+root = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(argv=None):
+    """
+    Command line entry point, dispatching to the command line interfaces of the
+    modules in `core`, e.g. `python fwa.py sweep UC1_100CPE_UrbanVillage`.
+    """
+    parser = argparse.ArgumentParser(
+        prog="fwa.py", description="FWA network modeling and planning", allow_abbrev=False,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(f"  {c:<10}{h}" for c, (_, h) in commands.items()))
+    parser.add_argument("--log-level", default=None, choices=["TRACE", "DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="level of the log file of the command, TRACE adds the hot-loop events")
+    parser.add_argument("--profile", default=None, metavar="TRACE_FILE",
+                        help="record the stages of the command, print a report and write a Chrome trace")
+    parser.add_argument("--profile-memory", action='store_true',
+                        help="also record the memory allocated per stage, cf. tracemalloc")
+    parser.add_argument("command", choices=commands, metavar="command", help="command to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments of the command")
+    args = parser.parse_args(argv)
+
+    for directory in ("core", "utils"):
+        sys.path.insert(0, os.path.join(root, directory))
+
+    module, _ = commands[args.command]
+    module = importlib.import_module(module)
+    if args.log_level:
+        from util_logging import TRACE
+        module.log_level = TRACE if args.log_level == "TRACE" else getattr(logging, args.log_level)
+    sys.argv[0] = f"fwa.py {args.command}"
+    if not args.profile:
+        return module.main(args.args)
+
+    # Stages run in worker processes are not recorded, e.g. run the sweep with `--workers 1`
+    from util_profile import enable_profiling, disable_profiling, print_profile_report, write_chrome_trace
+    enable_profiling(memory=args.profile_memory)
+    try:
+        return module.main(args.args)
+    finally:
+        disable_profiling()
+        print_profile_report()
+        write_chrome_trace(args.profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/python
+
+import os
+import logging
+import hashlib
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def get_file_hash(path):
+    """
+    Return the SHA-256 hash of the content of a file.
+
+    Params
+    ------
+    path : str
+        Path towards the file
+
+    Return
+    ------
+    digest : str
+        Hexadecimal hash
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def get_cache_file(path, reader, cache_dir):
+    """
+    Return the cache file of a data file, parsed with a given reader.
+
+    Params
+    ------
+    path : str
+        Path towards the data file
+    reader : function
+        Parser of the data file
+    cache_dir : str
+        Cache directory
+
+    Return
+    ------
+    cache_file : str
+        Path towards the `.npz` cache file
+    """
+    key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+
+    return os.path.join(cache_dir, f"{name}.{reader.__name__}.{key}.npz")
+
+
+def load_cached(path, reader, cache_dir=None):
+    """
+    Parse a data file into NumPy arrays via an on-disk cache. The cache entry
+    of a file is keyed by its path, modification time and content hash. A
+    cache entry is used directly when path, modification time and size match.
+    Otherwise, the content hash decides whether the entry is still valid, and
+    the file is parsed again (and the entry replaced) when it is not.
+
+    Params
+    ------
+    path : str
+        Path towards the data file
+    reader : function
+        Parser of the data file, returning a dictionary of NumPy arrays
+    cache_dir : str
+        Cache directory, created if it does not exist. If `None`, the file is
+        parsed without cache.
+
+    Return
+    ------
+    data : dict
+        Dictionary of NumPy arrays, as returned by `reader`
+    """
+    if cache_dir is None:
+        return reader(path)
+
+    stat = os.stat(path)
+    cache_file = get_cache_file(path, reader, cache_dir)
+    file_hash = None
+
+    if os.path.isfile(cache_file):
+        try:
+            with np.load(cache_file, allow_pickle=False) as npz:
+                meta = {k: npz[k].item() for k in ("_mtime_ns", "_size", "_sha256")}
+                data = {k: npz[k] for k in npz.files if not k.startswith('_')}
+        except (OSError, ValueError, KeyError):
+            logger.warning("Cache file %s is corrupt", cache_file)
+        else:
+            if meta["_mtime_ns"] == stat.st_mtime_ns and meta["_size"] == stat.st_size:
+                logger.debug("Cache hit for %s", path)
+                return data
+            file_hash = get_file_hash(path)
+            if meta["_sha256"] == file_hash:
+                logger.debug("Cache hit for %s (content unchanged)", path)
+                save_cached(cache_file, data, stat, file_hash)
+                return data
+            logger.info("Cache entry of %s is outdated", path)
+
+    data = reader(path)
+    if file_hash is None:
+        file_hash = get_file_hash(path)
+    save_cached(cache_file, data, stat, file_hash)
+
+    return data
+
+
+def save_cached(cache_file, data, stat, file_hash):
+    """
+    Write a cache entry. The entry is written to a temporary file first and
+    then moved into place, so parallel workers never read a partial entry.
+
+    Params
+    ------
+    cache_file : str
+        Path towards the `.npz` cache file
+    data : dict
+        Dictionary of NumPy arrays
+    stat : os.stat_result
+        Status of the data file when it was parsed
+    file_hash : str
+        Content hash of the data file
+    """
+    cache_dir = os.path.dirname(cache_file)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, _mtime_ns=stat.st_mtime_ns, _size=stat.st_size, _sha256=file_hash,
+                     **data)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        logger.warning("Cannot write cache file %s", cache_file)
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
@@ -6,14 +6,8 @@ import logging
 import igraph as ig
 import numpy as np
 import csv
-import matplotlib as plt
 
-# Logging definitions
-log_level = logging.DEBUG
-log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
-datefmt = '%d-%b-%y %H:%M:%S'
-log_fn = 'util_graph.log'
-logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+logger = logging.getLogger(__name__)
 
 
 def print_vertices(g):
@@ -47,15 +41,15 @@ def get_connected_clusters(g):
     """
 
     if g.is_connected():
-        logging.info("Input graph is connected")
+        logger.info("Input graph is connected")
         return None
     else:
-        logging.info("Input graph is not connected")
+        logger.info("Input graph is not connected")
 
     tmp = g.clusters()  # type VertexClustering
     tmp2 = tmp.subgraphs()  # list[Graph]
     for i in range(len(tmp2)):
-        logging.debug(f"Cluster {i}, size {len(tmp2[i].vs)}")
+        logger.debug("Cluster %s, size %s", i, len(tmp2[i].vs))
 
     return tmp2
 
@@ -85,6 +79,9 @@ def plot_physical_locations(data_path, unconnected_clusters=None, edge_nodes=Tru
     x, y: list
         Lists of (x, y)-coordinates of each node
     """
+    # Imported when plotting only, matplotlib is slow to import
+    import matplotlib.pyplot as plt
+
     config = data_path.split('/')[-1]
     dataset = f"{data_path}/basestations_0.csv"
 
@@ -240,6 +237,8 @@ def plot_graph_with_locations(data_path, simulation_id=None, g=None, unconnected
     x, y: list
         Lists of (x, y)-coordinates of each node
     """
+    import matplotlib.pyplot as plt
+
     config = data_path.split('/')[-1]
     if simulation_id is not None:
         dataset = f"{data_path}/basestations_{simulation_id}.csv"
@@ -371,6 +370,7 @@ def plot_graph(g, weights=None):
         Edge attribute that needs to be printed
 
     """
+    import matplotlib.pyplot as plt
 
     device_types = g.vs['type']
     colors = [dev.replace('PoP', 'blue') for dev in device_types]
@@ -412,16 +412,14 @@ def parse_unconnected_graph(g):
 
     tmp = g.clusters()  # type VertexClustering
     tmp2 = tmp.subgraphs()  # list[Graph]
-    logging.info(f"Graph consist of {len(tmp2)} connected subgraphs:")
+    logger.info("Graph consist of %s connected subgraphs:", len(tmp2))
 
     l = []
     for i in range(len(tmp2)):
-        logging.debug(f"Cluster {i}, size {len(tmp2[i].vs)}")
+        logger.debug("Cluster %s, size %s", i, len(tmp2[i].vs))
         if len(tmp2[i].vs) < max([len(tmp2[j].vs) for j in range(len(tmp2))]):
             l.append(tmp2[i].vs["id"])
     if l:
-        logging.info(f"Connections from largest connected subgraph must be made "
-                     f"to subgraphs with nodes {l}"
-        )
+        logger.info("Connections from largest connected subgraph must be made to subgraphs with nodes %s", l)
     
     return l
@@ -1,81 +1,196 @@
 #!/usr/bin/python
 
+import hashlib
 import logging
+import collections
+
 import numpy as np
 
-# Logging definitions
-log_level = logging.DEBUG
-log_format = "[%(asctime)s] - %(levelname)s - %(message)s"
-datefmt = '%d-%b-%y %H:%M:%S'
-log_fn = 'util.log'
-logging.basicConfig(filename=log_fn, level=log_level, format=log_format, datefmt=datefmt)
+logger = logging.getLogger(__name__)
+
+# Regression coefficients of ITU recommendation P.838-3 for the rain coefficients k and
+# alpha, for horizontal (h) and vertical (v) polarization: (a_j, b_j, c_j, m, c), with
+# log10(k) or alpha = sum_j a_j exp(-((log10(f) - b_j) / c_j)^2) + m log10(f) + c, f in GHz
+rain_regression = {
+    "kh": ([-5.33980, -0.35351, -0.23789, -0.94158], [-0.10008, 1.26970, 0.86036, 0.64552],
+           [1.13098, 0.45400, 0.15354, 0.16817], -0.18961, 0.71147),
+    "kv": ([-3.80595, -3.44965, -0.39902, 0.50167], [0.56934, -0.22911, 0.73042, 1.07319],
+           [0.81061, 0.51059, 0.11899, 0.27195], -0.16398, 0.63297),
+    "alphah": ([-0.14318, 0.29591, 0.32177, -5.37610, 16.1721], [1.82442, 0.77564, 0.63773, -0.96230, -3.29980],
+               [-0.55187, 0.19822, 0.13164, 1.47828, 3.43990], 0.67849, -1.95537),
+    "alphav": ([-0.07771, 0.56727, -0.20238, -48.2991, 48.5833], [2.33840, 0.95545, 1.14520, 0.791669, 0.791459],
+               [-0.76284, 0.54039, 0.26809, 0.116226, 0.116479], -0.053739, 0.83433),
+}
+
+# Specific gaseous attenuation in dB/km of ITU recommendation P.676 at sea level, for a
+# standard atmosphere (1013 hPa, 15 degC, 7.5 g/m3 water vapour), read from its curves at
+# these frequencies in GHz, with the oxygen lines at 60 and 118.75 GHz and the water vapour
+# lines at 22.235 and 183.31 GHz
+gaseous_table = (
+    [1, 5, 10, 15, 20, 22.235, 25, 30, 40, 50, 54, 57, 60, 63, 66, 70, 80, 90, 100,
+     110, 115, 118.75, 122, 130, 140, 150, 170, 183.31, 200, 250, 300, 350],
+    [0.0055, 0.0075, 0.012, 0.024, 0.09, 0.18, 0.12, 0.085, 0.1, 0.45, 3.0, 11, 15, 11, 2.0,
+     0.5, 0.25, 0.3, 0.4, 0.7, 1.5, 2.5, 1.2, 0.6, 0.55, 0.65, 1.5, 30, 2.5, 3.0, 5.0, 10],
+)
+
+# Attenuation coefficients per model and frequency, cf. `get_attenuation_coefficients`
+attenuation_coefficients = {}
+
+
+def get_attenuation_coefficients(model, f, evaluate):
+    """ 
+    Coefficients of an attenuation model for a carrier frequency, evaluated once per
+    frequency. Arrays of frequencies are evaluated directly, which is vectorized.
+
+    Params
+    ------
+    model : str
+        Name of the model, e.g. `rain_h`
+    f : float or np.ndarray
+        Carrier frequency in Hz.
+    evaluate : function
+        Coefficients of the model for the frequency in GHz
+
+    Return
+    ------
+    coefficients :
+        As returned by `evaluate`
+    """
+    if np.ndim(f):
+        return evaluate(np.asarray(f, dtype=float) / 1e9)
+
+    key = (model, float(f))
+    if key not in attenuation_coefficients:
+        attenuation_coefficients[key] = evaluate(float(f) / 1e9)
+
+    return attenuation_coefficients[key]
+
+
+def evaluate_rain_regression(name, f):
+    """ 
+    Evaluate a regression of ITU recommendation P.838-3, cf. `rain_regression`, for
+    frequencies in GHz.
+    """
+    a, b, c, m, offset = rain_regression[name]
+    x = np.log10(np.clip(f, 1, 1000))[..., None]
+    y = np.sum(np.array(a) * np.exp(-np.power((x - np.array(b)) / np.array(c), 2)), axis=-1)
+
+    return y + m * x[..., 0] + offset
+
+
+def get_rain_coefficients(f, polarization='h'):
+    """ 
+    Coefficients k and alpha of the specific rain attenuation, gamma = k * pr^alpha,
+    following ITU recommendation P.838-3, valid from 1 to 1000 GHz.
+
+    Params
+    ------
+    f : float or np.ndarray
+        Carrier frequency in Hz.
+    polarization : str
+        Polarization, `h` (horizontal) or `v` (vertical)
+
+    Return
+    ------
+    k, alpha : float or np.ndarray
+        Rain coefficients
+    """
+    if np.any((np.asarray(f) < 1e9) | (np.asarray(f) > 1000e9)):
+        logger.info('Frequency outside the range of the rain attenuation model')
+
+    return get_attenuation_coefficients(
+        f"rain_{polarization}", f,
+        lambda f: (np.power(10, evaluate_rain_regression("k" + polarization, f)),
+                   evaluate_rain_regression("alpha" + polarization, f)))
+
+
+def get_gaseous_attenuation(f):
+    """ 
+    Specific gaseous attenuation of oxygen and water vapour, interpolated log-linearly in
+    the curves of ITU recommendation P.676 for a standard atmosphere, cf. `gaseous_table`.
+
+    Params
+    ------
+    f : float or np.ndarray
+        Carrier frequency in Hz.
+
+    Return
+    ------
+    sa : float or np.ndarray
+        Specific attenuation in dB/km
+    """
+    frequencies, attenuation = gaseous_table
+    if np.any((np.asarray(f) < frequencies[0] * 1e9) | (np.asarray(f) > frequencies[-1] * 1e9)):
+        logger.info('Frequency outside the range of the gaseous attenuation model')
+
+    return get_attenuation_coefficients(
+        "gaseous", f,
+        lambda f: np.power(10, np.interp(np.log10(f), np.log10(frequencies), np.log10(attenuation))))
+
 
 def get_atmosphericloss(d,f):
     """ 
-    Lookup table with atmospheric path loss, obtained from ITU recommendation P.676-12.
+    Atmospheric path loss, cf. `get_gaseous_attenuation`.
 
     Params
     ------
-    d : integer
+    d : float or np.ndarray
         Distance in m between the nodes.
-    f : integer
+    f : float or np.ndarray
         Carrier frequency in Hz.
 
     Return
     ------
-    al : float
+    al : float or np.ndarray
         Atmospheric loss in dB
     """ 
-    sa = 0
-    if f == 28e9: 
-        sa = 0.06
-    elif f == 60e9: 
-        sa = 20
-    elif f == 140e9: 
-        sa = 0.4
-    else:
-        logging.info('Unsupported frequency for atmospheric loss')
+    sa = get_gaseous_attenuation(f)
 
     al = sa * d / 1000
 
     return al
 
 
+def get_rain_specific_attenuation(f, pr, polarization='h'):
+    """ 
+    Specific rain attenuation, gamma = k * pr^alpha, cf. `get_rain_coefficients`.
+
+    Params
+    ------
+    f : float or np.ndarray
+        Carrier frequency in Hz.
+    pr : float or np.ndarray
+        Rain rate in mm/h
+    polarization : str
+        Polarization, `h` (horizontal) or `v` (vertical)
+    Return
+    ------
+    sa : float or np.ndarray
+        Specific rain attenuation in dB/km
+    """
+    k, alpha = get_rain_coefficients(f, polarization)
+
+    return k * np.power(np.asarray(pr, dtype=float), alpha)
+
+
 def get_rain_attenuation(d, f, pr):
     """ 
-    Lookup table with rain attenuation
+    Rain attenuation over a link, cf. `get_rain_specific_attenuation`
 
     Params
     ------
-    d : integer
+    d : float or np.ndarray
         Distance in m between the nodes.
-    f : integer
+    f : float or np.ndarray
         Carrier frequency in Hz.
-    pr : float
+    pr : float or np.ndarray
         Rain rate in mm/h
     Return
     ------
-    ra : float
+    ra : float or np.ndarray
         Rain attenuation in dB
     """
-    sa = 0
-    if f == 28e9: 
-        if pr == 15:
-            sa = 0
-        elif pr == 25:
-            sa = 0
-    elif f == 60e9: 
-        if pr == 15:
-            sa = 6.8
-        elif pr == 25:
-            sa = 10.1
-    elif f == 140e9: 
-        if pr == 15:
-            sa = 9.0
-        elif pr == 25:
-            sa = 12.6
-    else:
-        logging.info('Unsupported frequency for rain attenuation')
+    sa = get_rain_specific_attenuation(f, pr)
 
     ra = sa * d / 1000
 
@@ -84,41 +199,47 @@ def get_rain_attenuation(d, f, pr):
 
 def get_vegetation_attenuation(d, f):
     """ 
-    Lookup table with vegetation attenuation
+    Vegetation attenuation, following the COST 235 model below 100 GHz and the VED model
+    above, which is fitted up to 170 GHz.
 
     Params
     ------
-    d : integer
+    d : float or np.ndarray
         Vegetation depth.
-    f : integer
+    f : float or np.ndarray
         Carrier frequency in Hz.
 
     Return
     ------
-    va : float
+    va : float or np.ndarray
         Vegetation attenuation in dB
     """
-    va = 0
-    if f < 100e9: 
-        # COST 235 model
-        va = 15.6 * np.power(f/1e6, -0.009) * np.power(d, 0.26)
-    elif (f > 110e9) and (f < 170e9): 
-        # VED model 
-        pai = 3;
-        va = 20.4 * np.power(f/1e9, -0.4) * np.power(d, 0.3) * np.power(pai, 0.9)
-    else:
-        logging.info('Unsupported frequency for vegetation attenuation')
+    if np.any(np.asarray(f) > 170e9):
+        logger.info('Frequency outside the range of the vegetation attenuation model')
+
+    # COST 235 model
+    cost235 = 15.6 * np.power(f/1e6, -0.009) * np.power(d, 0.26)
+    # VED model
+    pai = 3;
+    ved = 20.4 * np.power(f/1e9, -0.4) * np.power(d, 0.3) * np.power(pai, 0.9)
+
+    va = np.where(np.asarray(f) < 100e9, cost235, ved)
 
-    return va
+    return va[()]
 
 
 def get_pathloss(d, f=60e9, sa=0, vd=0, pr=0):
     """ 
-    Return free space path loss, calculated via Friis formula
+    Return path loss, following an empirical model fitted on measurements at 60 GHz,
+    with the rain and vegetation attenuation. The measurements include the gaseous
+    attenuation of their campaign, so the atmospheric loss of `get_atmosphericloss` is
+    not added: at 60 GHz it would be counted twice, and removing its difference to
+    60 GHz at other frequencies, e.g. 15 dB/km at 28 GHz, exceeds the distance slope
+    of the model, so the path loss would decrease with distance beyond about 500 m.
 
     Params
     ------
-    d : integer
+    d : float or np.ndarray
         Distance in m between the nodes.
     f : integer
         Carrier frequency in Hz.
@@ -132,7 +253,7 @@ def get_pathloss(d, f=60e9, sa=0, vd=0, pr=0):
 
     Return
     ------
-    pl : float
+    pl : float or np.ndarray
         Calculated path loss in dB
     """
 
@@ -158,33 +279,93 @@ def get_pathloss(d, f=60e9, sa=0, vd=0, pr=0):
     return pl
 
 
-def get_throughput_Ieee80211ad(prx):
+def get_mcs_table(thresholds, data_rates):
     """ 
-    Lookup table for MCS and throughput for IEEE Std. 802.11ad based on received power
+    Transform an MCS lookup list into a sorted step table for `np.searchsorted`.
+    The lookup lists are scanned in order, and the data rate of the last entry
+    whose threshold is exceeded is selected. For duplicate thresholds, the data
+    rate of the first occurrence is used.
 
     Params
     ------
-    prx : float
-        Received power in dBm.
+    thresholds : list
+        Minimum received power (or SNR) for each MCS, in lookup order.
+    data_rates : list
+        Data rate for each MCS.
 
     Return
     ------
-    tp : float
-        Throughput in Mbps
+    steps : np.ndarray
+        Sorted unique thresholds
+    rates : np.ndarray
+        Data rate selected for an input just above each threshold, preceded by
+        0 for inputs below all thresholds
     """
+    steps = np.unique(thresholds)
+    rates = [0]
+    for step in steps:
+        last = max(i for i, th in enumerate(thresholds) if th <= step)
+        rates.append(data_rates[thresholds.index(thresholds[last])])
+
+    return steps, np.array(rates, dtype=float)
 
-    tp = 0
 
-    # Data rate as a function of received power
-    Prs = [-78 , -68 , -66 , -64 , -64 , -62 , -63 , -62 , -61 , -59 , -55 , -54 , -53]
-    DR = [27.5 , 385 , 770 , 962.5 , 1155 , 1251 , 1540 , 1925 , 2310 , 2502 , 3080 , 3850 , 4620]
+# Data rate as a function of received power for IEEE Std. 802.11ad
+Prs_Ieee80211ad = [-78 , -68 , -66 , -64 , -64 , -62 , -63 , -62 , -61 , -59 , -55 , -54 , -53]
+DR_Ieee80211ad = [27.5 , 385 , 770 , 962.5 , 1155 , 1251 , 1540 , 1925 , 2310 , 2502 , 3080 , 3850 , 4620]
+MCS_Ieee80211ad = get_mcs_table(Prs_Ieee80211ad, DR_Ieee80211ad)
 
-    for prs in Prs: 
-        if prs < prx: tp = DR[Prs.index(prs)]
+# Data rate as a function of SNR for 5G, with 1/3 code rate
+#           bpsk qpsk 16qam 64qam 256qam
+# mod. order 2   4     16 ...  
+#   1.0e+04 * [0.0194    0.0388    0.1552    0.6207    2.4828 ]
+Snr_min_mmWave5G = [2.2, 5.2, 12.7, 19.2, 25.2]
+DR_mmWave5G = [dr / 3 for dr in [760, 1530, 3060, 4590, 6110]]
+MCS_mmWave5G = get_mcs_table(Snr_min_mmWave5G, DR_mmWave5G)
+
+
+def lookup_mcs_table(table, x):
+    """ 
+    Return the data rate of an MCS step table for scalar or array input.
+
+    Params
+    ------
+    table : tuple
+        Step table, as returned by `get_mcs_table`.
+    x : float or np.ndarray
+        Received power in dBm or SNR in dB.
+
+    Return
+    ------
+    tp : float or np.ndarray
+        Throughput in Mbps
+    """
+    steps, rates = table
+    tp = rates[np.searchsorted(steps, x, side='left')]
+    if np.ndim(tp) == 0:
+        tp = float(tp)
 
     return tp
 
 
+def get_throughput_Ieee80211ad(prx):
+    """ 
+    Lookup table for MCS and throughput for IEEE Std. 802.11ad based on received power
+
+    Params
+    ------
+    prx : float or np.ndarray
+        Received power in dBm.
+
+    Return
+    ------
+    tp : float or np.ndarray
+        Throughput in Mbps
+    """
+
+    return lookup_mcs_table(MCS_Ieee80211ad, prx)
+
+
 def get_throughput_mmWave5G(prx):
     """ 
     Lookup table for MCS and throughput for 5G at 28 GHz, based on received power
@@ -197,28 +378,18 @@ def get_throughput_mmWave5G(prx):
         where N is the number of layers, Q is the modulation order, R is the code rate, f is a scaling factor, Nprb is the maximum Resource Block allocation, Ts is the symbol duration and OH is the overhead. Complete details of this are provided in NetSim's 5G user manual.
     Params
     ------
-    prx : float
+    prx : float or np.ndarray
         Received power in dBm.
 
     Return
     ------
-    tp : float
-        Throughput in Mbps
+    tp : float or np.ndarray
+        Throughput in Mbps. Zero when the SNR is below the lowest MCS.
     """
     noisefloor = -84 # Thermal noise, 10*log10(k B T / 1mW) with B = 1 GHz
     snr_input = prx - noisefloor
 
-    # Data rate as a function of SNR, with 1/3 code rate
-    #           bpsk qpsk 16qam 64qam 256qam
-    # mod. order 2   4     16 ...  
-    #   1.0e+04 * [0.0194    0.0388    0.1552    0.6207    2.4828 ]
-    Snr_min = [2.2, 5.2, 12.7, 19.2, 25.2]
-    DR = [dr / 3 for dr in [760, 1530, 3060, 4590, 6110]]
-
-    for snr in Snr_min: 
-        if snr < snr_input: tp = DR[Snr_min.index(snr)]
-
-    return tp
+    return lookup_mcs_table(MCS_mmWave5G, snr_input)
 
 
 def get_linkbudgetparameters():
@@ -232,24 +403,60 @@ def get_linkbudgetparameters():
     return [Pt, Gt, Gr, Lt, Lr, Mi]
 
 
+# Radio bands with their lower and upper carrier frequency and channel bandwidth in Hz and
+# MCS lookup, cf. `get_radio_band`: 5G NR FR2, IEEE 802.11ad/ay and the D-band, which has
+# no MCS lookup, so only the capacity of its links is evaluated
+radio_bands = [
+    (24.25e9, 52.6e9, 400e6, get_throughput_mmWave5G),
+    (57e9, 71e9, 2e9, get_throughput_Ieee80211ad),
+    (110e9, 170e9, 4e9, None),
+]
+
+
+def get_radio_band(f):
+    """ 
+    Channel bandwidth and MCS lookup of the radio band of a carrier frequency, cf. `radio_bands`.
+
+    Params
+    ------
+    f : float
+        Carrier frequency in Hz.
+
+    Return
+    ------
+    bw : float
+        Channel bandwidth in Hz
+    mcs : function
+        Throughput in Mbps as a function of the received power in dBm, or None
+    """
+    for f_min, f_max, bw, mcs in radio_bands:
+        if f_min <= f <= f_max:
+            return bw, mcs
+
+    bands = ", ".join(f"{f_min / 1e9:g}-{f_max / 1e9:g} GHz" for f_min, f_max, _, _ in radio_bands)
+    raise ValueError(f"Unsupported carrier frequency {f / 1e9:g} GHz, the supported bands are {bands}")
+
+
 def get_throughput(pl,f=60e9):
     """ 
     Return maximum throughput, calculated via link budget
 
     Params
     ------
-    pl : float
+    pl : float or np.ndarray
         Link path loss
+    f : integer
+        Carrier frequency in Hz, within one of the `radio_bands`
  
 
     Return
     ------
-    tp : integer
-        Maximum throughput in Mbps
+    tp : float or np.ndarray
+        Maximum throughput in Mbps, zero in a band without MCS lookup
     """
 
     # Initialization
-    tp = 0
+    tp = np.zeros(np.shape(pl)) if np.ndim(pl) else 0
 
     # Link budget parameters
     [Pt, Gt, Gr, Lt, Lr, Mi] = get_linkbudgetparameters()
@@ -257,14 +464,12 @@ def get_throughput(pl,f=60e9):
     # Calculate received power
     prx = Pt + Gt + Gr - Lt - Lr - Mi - pl
 
-    if f == 60e9: 
-        tp = get_throughput_Ieee80211ad(prx)
-    elif  f == 28e9: 
-        tp = get_throughput_mmWave5G(prx)
-    else:
-        logging.info('Unsupported frequency for throughput calculation')
+    _, mcs = get_radio_band(f)
+    if mcs is None:
+        logger.info('No MCS lookup in the band of %s GHz, the throughput is zero', f / 1e9)
+        return tp
 
-    return tp
+    return mcs(prx)
 
 
 def get_capacity(pl,f=60e9):
@@ -273,16 +478,16 @@ def get_capacity(pl,f=60e9):
 
     Params
     ------
-    pl : float
+    pl : float or np.ndarray
         Link path loss in dB
 
     f : integer
-        Carrier frequency in Hz
+        Carrier frequency in Hz, within one of the `radio_bands`
  
 
     Return
     ------
-    cap : integer
+    cap : float or np.ndarray
         Channel capacity in Mbps
     """
 
@@ -293,14 +498,7 @@ def get_capacity(pl,f=60e9):
     prx = Pt + Gt + Gr - Lt - Lr - Mi - pl
 
     # Get channel bandwidth
-    if f == 28e9: 
-        bw = 400e6;
-    elif f == 60e9: 
-        bw = 2e9;
-    elif f == 140e9:
-        bw = 4e9;
-    else:
-        logging.info('Unsupported frequency for capacity calculation')
+    bw, _ = get_radio_band(f)
 
     # Define noise floor (thermal noise)
     k = 1.381e-23; # Boltzmann's constant
@@ -313,3 +511,205 @@ def get_capacity(pl,f=60e9):
     cap = bw * np.log2(1 + np.power(10, snr/10)) / 1e6
 
     return cap
+
+
+# Bounded LRU of evaluated link budgets for exact inputs, cf. `get_link_budget`
+link_budget_cache = collections.OrderedDict()
+link_budget_cache_size = 128
+
+# Dense link budget tables per radio profile, cf. `get_link_budget_table`
+link_budget_tables = {}
+
+
+def evaluate_link_budget(d, f=60e9, sa=0, vd=0, pr=0):
+    """
+    Path loss, throughput and capacity of links, cf. `get_pathloss`,
+    `get_throughput` and `get_capacity`.
+    """
+    pl = get_pathloss(d, f, sa, vd, pr)
+
+    return pl, get_throughput(pl, f), get_capacity(pl, f)
+
+
+def get_link_budget_table(f=60e9, sa=0, vd=0, pr=0, min_distance=1.0, max_distance=10e3, resolution=1000):
+    """
+    Dense table of the path loss and capacity of a radio profile over the link
+    distance, quantized uniformly in log10(distance) with `resolution` points
+    per decade. The path loss is close to linear in log10(distance), so linear
+    interpolation in the table is accurate. The interpolation error is measured
+    at the midpoints between the table points, where it is largest, and
+    reported in the table. Tables are built once per radio profile.
+
+    Params
+    ------
+    f, sa, vd, pr :
+        Radio profile, cf. `get_pathloss`
+    min_distance, max_distance : float
+        Distance range of the table in m
+    resolution : int
+        Table points per decade of distance
+
+    Return
+    ------
+    table : dict
+        `log_distance`, `pl` and `cap` of the table points and the increments
+        `pl_slope` and `cap_slope` towards the next point, the radio profile
+        and `error` with the maximum absolute path loss error in dB
+        (`pathloss`), the maximum relative capacity error (`capacity`) and the
+        fraction of midpoints that get another MCS, i.e. throughput,
+        than with the exact path loss (`throughput`)
+    """
+    key = (f, sa, vd, pr, min_distance, max_distance, resolution)
+    if key in link_budget_tables:
+        return link_budget_tables[key]
+
+    nb_points = int(np.ceil(np.log10(max_distance / min_distance) * resolution)) + 1
+    x = np.log10(min_distance) + np.arange(nb_points) / resolution
+    pl, _, cap = evaluate_link_budget(np.power(10, x), f, sa, vd, pr)
+    table = {"f": f, "sa": sa, "vd": vd, "pr": pr, "resolution": resolution, "log_distance": x,
+             "pl": pl, "pl_slope": np.diff(pl), "cap": cap, "cap_slope": np.diff(cap)}
+
+    d = np.power(10, x[:-1] + 0.5 / resolution)
+    pl_exact, tp_exact, cap_exact = evaluate_link_budget(d, f, sa, vd, pr)
+    pl_table, tp_table, cap_table = lookup_link_budget_table(table, d)
+    table["error"] = {
+        "pathloss": float(np.max(np.abs(pl_table - pl_exact), initial=0)),
+        "capacity": float(np.max(np.abs(cap_table - cap_exact) / np.maximum(cap_exact, 1e-12), initial=0)),
+        "throughput": float(np.mean(tp_table != tp_exact)),
+    }
+    logger.info("Link budget table of %s points for f=%s, sa=%s, vd=%s, pr=%s: interpolation error %s",
+                nb_points, f, sa, vd, pr, table["error"])
+
+    link_budget_tables[key] = table
+    return table
+
+
+def lookup_link_budget_table(table, d):
+    """
+    Path loss, throughput and capacity of links, interpolated linearly in a
+    link budget table, cf. `get_link_budget_table`. Distances outside the
+    table are evaluated exactly.
+
+    Params
+    ------
+    table : dict
+        Link budget table of the radio profile
+    d : np.ndarray
+        Distance in m between the nodes
+
+    Return
+    ------
+    pl, tp, cap : np.ndarray
+        Path loss in dB, throughput and capacity in Mbps
+    """
+    d = np.asarray(d, dtype=float)
+    x = np.log10(np.maximum(d, 1e-300))
+
+    # Index of the table point below every distance, and the position between
+    # that point and the next one
+    position = (x - table["log_distance"][0]) * table["resolution"]
+    outside = (position < 0) | (position > len(table["pl"]) - 1)
+    i = np.clip(position.astype(np.int64), 0, len(table["pl"]) - 2)
+    w = position - i
+    pl = table["pl"][i] + w * table["pl_slope"][i]
+    cap = table["cap"][i] + w * table["cap_slope"][i]
+
+    if np.any(outside):
+        pl[outside], _, cap[outside] = evaluate_link_budget(d[outside], table["f"], table["sa"],
+                                                            table["vd"], table["pr"])
+
+    return pl, get_throughput(pl, table["f"]), cap
+
+
+def get_link_budget(d, f=60e9, sa=0, vd=0, pr=0, table=False):
+    """
+    Memoized link budget of a set of links. Results are kept in a bounded LRU
+    keyed by the radio profile and the exact distances, so evaluating the same
+    links again, e.g. for radio profiles that only differ in the throughput
+    requirement, is a lookup. With `table`, the link budget is interpolated in
+    the dense table of the radio profile instead, cf. `get_link_budget_table`.
+
+    Params
+    ------
+    d : float or np.ndarray
+        Distance in m between the nodes
+    f, sa, vd, pr :
+        Radio profile, cf. `get_pathloss`
+    table : bool
+        Interpolate in the link budget table of the radio profile
+
+    Return
+    ------
+    pl, tp, cap : float or np.ndarray
+        Path loss in dB, throughput and capacity in Mbps. Arrays are read-only,
+        as they are shared with the cache.
+    """
+    d = np.asarray(d, dtype=float)
+    key = (f, sa, vd, pr, table, d.shape, hashlib.blake2b(d.tobytes(), digest_size=16).digest())
+    if table and d.ndim:
+        return get_cached_link_budget(key, lambda: lookup_link_budget_table(get_link_budget_table(f, sa, vd, pr), d))
+
+    return get_cached_link_budget(key, lambda: evaluate_link_budget(d, f, sa, vd, pr))
+
+
+def get_link_budget_profiles(d, profiles, table=False):
+    """
+    Memoized link budget of a set of links for several radio profiles, evaluated in one
+    vectorized pass over all profiles of the same frequency, cf. `get_link_budget`.
+
+    Params
+    ------
+    d : np.ndarray
+        Distance in m between the nodes
+    profiles : list[dict]
+        Radio profiles with keys `f`, `sa`, `vd` and `pr`, cf. `get_pathloss`
+    table : bool
+        Interpolate in the link budget table of every radio profile
+
+    Return
+    ------
+    pl, tp, cap : np.ndarray
+        Path loss in dB, throughput and capacity in Mbps, one row per profile. Arrays
+        are read-only, as they are shared with the cache.
+    """
+    d = np.asarray(d, dtype=float)
+    params = [(p["f"], p["sa"], p["vd"], p["pr"]) for p in profiles]
+    key = ("profiles", tuple(params), table, d.shape, hashlib.blake2b(d.tobytes(), digest_size=16).digest())
+
+    def evaluate():
+        pl, tp, cap = (np.empty((len(params), len(d))) for _ in range(3))
+        if table:
+            for i, p in enumerate(params):
+                pl[i], tp[i], cap[i] = lookup_link_budget_table(get_link_budget_table(*p), d)
+            return pl, tp, cap
+
+        # Throughput and capacity depend on the band, the attenuation is broadcast over
+        # the profiles of each band
+        f, sa, vd, pr = (np.array([p[j] for p in params], dtype=float).reshape(-1, 1) for j in range(4))
+        for band in np.unique(f):
+            i = np.flatnonzero(f[:, 0] == band)
+            pl[i], tp[i], cap[i] = evaluate_link_budget(d, band, sa[i], vd[i], pr[i])
+        return pl, tp, cap
+
+    return get_cached_link_budget(key, evaluate)
+
+
+def get_cached_link_budget(key, evaluate):
+    """
+    Look up a link budget in the bounded LRU `link_budget_cache`, or evaluate and
+    insert it. The arrays of the result are made read-only.
+    """
+    if key in link_budget_cache:
+        link_budget_cache.move_to_end(key)
+        return link_budget_cache[key]
+
+    result = evaluate()
+    for x in result:
+        if isinstance(x, np.ndarray):
+            x.setflags(write=False)
+
+    link_budget_cache[key] = result
+    if len(link_budget_cache) > link_budget_cache_size:
+        link_budget_cache.popitem(last=False)
+
+    return result
@@ -0,0 +1,46 @@
+#!/usr/bin/python
+
+import time
+import logging
+
+# Level of the per-vertex and per-edge events in hot loops, below DEBUG so they
+# are off unless enabled explicitly, e.g. for the planning only with
+# `logging.getLogger('network_planning').setLevel(TRACE)`
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+
+def is_tracing(logger):
+    """
+    Return whether the hot-loop events of a logger are enabled. Evaluate this once
+    before the loop and guard every event with it, so that disabled events cost a
+    single boolean test and their arguments are never computed.
+    """
+    return logger.isEnabledFor(TRACE)
+
+
+def log_summary(logger, stage, counts, start=None, level=logging.INFO):
+    """
+    Log the aggregated events of a stage as a single record, in place of one
+    record per vertex or edge.
+
+    Params
+    ------
+    logger : logging.Logger
+        Logger of the module running the stage
+    stage : str
+        Name of the stage, e.g. `planning`
+    counts : dict
+        Name -> number of events, e.g. `{"vertices": 100, "saturated edges": 12}`
+    start : float
+        `time.perf_counter()` at the start of the stage, to add its duration
+    level : int
+        Logging level of the record
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+    if start is not None:
+        summary += f" in {time.perf_counter() - start:.3f} s"
+    logger.log(level, "%s: %s", stage, summary)
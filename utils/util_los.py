@@ -0,0 +1,241 @@
+#!/usr/bin/python
+
+import logging
+
+import numpy as np
+
+from util_shapefile import read_shapefile, read_dbf, read_dbf_fields, get_shapefile_path
+from util_spatial import grid_index, query_pairs
+
+logger = logging.getLogger(__name__)
+
+# Building height fields of the bundled environments, in order of preference
+height_fields = ["HEIGHT", "HN_P99", "HN_MAX"]
+
+
+def read_buildings(path, height_field=None):
+    """
+    Read the building footprints and heights of an environment as a set of
+    walls, i.e. the edges of all footprint rings.
+
+    Params
+    ------
+    path : str
+        Path towards the `Buildings.shp` file
+    height_field : str
+        Field of the attribute table with the building height above ground in m.
+        If `None`, the first field of `height_fields` that is present is used.
+
+    Return
+    ------
+    walls : dict
+        `x1`, `y1`, `x2`, `y2` : end points of every wall in m,
+        `height` : height of the building of every wall in m
+    """
+    dbf = get_shapefile_path(path, '.dbf')
+    if height_field is None:
+        fields = read_dbf_fields(dbf)
+        height_field = next(f for f in height_fields if f in fields)
+    heights = read_dbf(dbf, [height_field])[height_field]
+    if np.any(np.isnan(heights)):
+        logger.warning("%s buildings in %s without height are ignored", np.sum(np.isnan(heights)), path)
+        heights = np.nan_to_num(heights, nan=0.0)
+
+    shapes = read_shapefile(path)
+    x, y = shapes["x"], shapes["y"]
+
+    # A wall connects every point to the next point of the same ring
+    part_end = np.append(shapes["part_start"][1:], len(x))
+    part_length = part_end - shapes["part_start"]
+    end = np.repeat(part_end, part_length)
+    building = np.repeat(shapes["part_shape"], part_length)
+    k = np.arange(len(x))
+    wall = k + 1 < end
+    k = k[wall]
+
+    walls = {
+        "x1": x[k], "y1": y[k], "x2": x[k + 1], "y2": y[k + 1],
+        "height": heights[building[wall]],
+    }
+    logger.info("Read %s building rings with %s walls from %s", len(shapes['part_start']), len(k), path)
+    return walls
+
+
+def wall_index(walls, cell_size=25.0):
+    """
+    Build a uniform grid index over the walls of an environment. Every wall is
+    registered in all grid cells covered by its bounding box.
+
+    Params
+    ------
+    walls : dict
+        Walls, as returned by `read_buildings`
+    cell_size : float
+        Size of a grid cell in m
+
+    Return
+    ------
+    index : dict
+        Grid index, to be used with `get_los`
+    """
+    x0 = min(np.min(walls["x1"]), np.min(walls["x2"])) if len(walls["x1"]) else 0.0
+    y0 = min(np.min(walls["y1"]), np.min(walls["y2"])) if len(walls["y1"]) else 0.0
+    cx1 = np.floor((np.minimum(walls["x1"], walls["x2"]) - x0) / cell_size).astype(np.int64)
+    cx2 = np.floor((np.maximum(walls["x1"], walls["x2"]) - x0) / cell_size).astype(np.int64)
+    cy1 = np.floor((np.minimum(walls["y1"], walls["y2"]) - y0) / cell_size).astype(np.int64)
+    cy2 = np.floor((np.maximum(walls["y1"], walls["y2"]) - y0) / cell_size).astype(np.int64)
+    nx = int(cx2.max(initial=0)) + 1
+    ny = int(cy2.max(initial=0)) + 1
+
+    # Expand the bounding box of every wall into its cells
+    wx = cx2 - cx1 + 1
+    wy = cy2 - cy1 + 1
+    count = wx * wy
+    wall = np.repeat(np.arange(len(count)), count)
+    k = np.arange(len(wall)) - np.repeat(np.cumsum(count) - count, count)
+    cx = cx1[wall] + k // wy[wall]
+    cy = cy1[wall] + k % wy[wall]
+
+    keys = cx * ny + cy
+    order = np.argsort(keys, kind='stable')
+
+    index = {
+        "x0": x0, "y0": y0, "cell_size": float(cell_size), "nx": nx, "ny": ny,
+        "keys": keys[order], "walls": wall[order],
+    }
+    return index
+
+
+def get_los(walls, index, x1, y1, z1, x2, y2, z2, batch_size=20000, near_cells=2):
+    """
+    Test whether links have line-of-sight, i.e. whether the straight line
+    between both antennas passes above every wall it crosses. The ground is
+    assumed to be flat. Links are tested in batches, and for every link only
+    the walls in the grid cells along the link are tested.
+
+    Params
+    ------
+    walls : dict
+        Walls, as returned by `read_buildings`
+    index : dict
+        Grid index of the walls, as returned by `wall_index`
+    x1, y1, z1, x2, y2, z2 : np.ndarray
+        Antenna locations and heights above ground of both ends of each link in m
+    batch_size : int
+        Number of links tested at once
+    near_cells : int
+        Number of grid cells from either end of a link that are tested first
+
+    Return
+    ------
+    los : np.ndarray
+        Line-of-sight of each link
+    """
+    x1, y1, z1, x2, y2, z2 = (np.asarray(a, dtype=float) for a in (x1, y1, z1, x2, y2, z2))
+    los = np.ones(len(x1), dtype=bool)
+    for first in range(0, len(x1), batch_size):
+        batch = np.arange(first, min(first + batch_size, len(x1)))
+        # Most links are blocked close to an antenna, so test those walls first
+        link = (x1[batch], y1[batch], z1[batch], x2[batch], y2[batch], z2[batch])
+        blocked = get_blocked(walls, index, *link, near=near_cells)
+        rest = batch[~blocked]
+        link = (x1[rest], y1[rest], z1[rest], x2[rest], y2[rest], z2[rest])
+        los[batch[blocked]] = False
+        los[rest] = ~get_blocked(walls, index, *link)
+
+    return los
+
+
+def get_blocked(walls, index, x1, y1, z1, x2, y2, z2, near=None):
+    """
+    Test whether links are blocked by a wall, see `get_los`. If `near` is set,
+    only the walls within `near` grid cells from either end of the links are
+    tested.
+    """
+    cell_size = index["cell_size"]
+    nx, ny = index["nx"], index["ny"]
+    nb_links = len(x1)
+
+    # Sample every link at steps of at most one cell. The link passes through
+    # the cells of consecutive samples, and on a diagonal step through one of
+    # the two cells at the other corners.
+    length = np.hypot(x2 - x1, y2 - y1)
+    nb_samples = np.ceil(length / cell_size).astype(np.int64) + 1
+    link = np.repeat(np.arange(nb_links), nb_samples)
+    k = np.arange(len(link)) - np.repeat(np.cumsum(nb_samples) - nb_samples, nb_samples)
+    if near is not None:
+        end = (k <= near) | (k >= nb_samples[link] - 1 - near)
+        link, k = link[end], k[end]
+    s = k / np.maximum(nb_samples[link] - 1, 1)
+    cx = np.floor((x1[link] + s * (x2 - x1)[link] - index["x0"]) / cell_size).astype(np.int64)
+    cy = np.floor((y1[link] + s * (y2 - y1)[link] - index["y0"]) / cell_size).astype(np.int64)
+
+    step = (k[1:] == k[:-1] + 1) & (link[1:] == link[:-1])
+    cx = np.concatenate((cx, cx[:-1][step], cx[1:][step]))
+    cy = np.concatenate((cy, cy[1:][step], cy[:-1][step]))
+    link = np.concatenate((link, link[1:][step], link[1:][step]))
+
+    valid = (cx >= 0) & (cx < nx) & (cy >= 0) & (cy < ny)
+    cells = np.unique(link[valid] * (nx * ny) + cx[valid] * ny + cy[valid])
+    link, key = cells // (nx * ny), cells % (nx * ny)
+
+    # Candidate walls of every link
+    start = np.searchsorted(index["keys"], key, side='left')
+    count = np.searchsorted(index["keys"], key, side='right') - start
+    link = np.repeat(link, count)
+    offsets = np.repeat(start - (np.cumsum(count) - count), count)
+    wall = index["walls"][np.arange(len(link)) + offsets]
+
+    # Intersection of link and wall in the horizontal plane
+    dx, dy = (x2 - x1)[link], (y2 - y1)[link]
+    ex = walls["x2"][wall] - walls["x1"][wall]
+    ey = walls["y2"][wall] - walls["y1"][wall]
+    qx = walls["x1"][wall] - x1[link]
+    qy = walls["y1"][wall] - y1[link]
+    denom = dx * ey - dy * ex
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (qx * ey - qy * ex) / denom
+        u = (qx * dy - qy * dx) / denom
+    cross = (denom != 0) & (s >= 0) & (s <= 1) & (u >= 0) & (u <= 1)
+
+    # Height of the link where it crosses the wall
+    z = z1[link] + s * (z2 - z1)[link]
+    blocked = np.zeros(nb_links, dtype=bool)
+    blocked[link[cross & (z < walls["height"][wall])]] = True
+
+    return blocked
+
+
+def get_los_pairs(walls, index, x, y, z, max_distance):
+    """
+    Return all pairs of antennas within a maximum distance and their
+    line-of-sight.
+
+    Params
+    ------
+    walls : dict
+        Walls, as returned by `read_buildings`
+    index : dict
+        Grid index of the walls, as returned by `wall_index`
+    x, y, z : np.ndarray
+        Antenna locations and heights above ground in m
+    max_distance : float
+        Maximum link distance in m
+
+    Return
+    ------
+    i, j : np.ndarray
+        Antenna indices of each pair, with i < j
+    dist : np.ndarray
+        Distance of each pair in m
+    los : np.ndarray
+        Line-of-sight of each pair
+    """
+    x, y, z = (np.asarray(a, dtype=float) for a in (x, y, z))
+    i, j, dist = query_pairs(grid_index(x, y, max_distance), x, y, max_distance)
+    keep = i < j
+    i, j, dist = i[keep], j[keep], dist[keep]
+
+    los = get_los(walls, index, x[i], y[i], z[i], x[j], y[j], z[j])
+
+    return i, j, dist, los
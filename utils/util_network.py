@@ -0,0 +1,301 @@
+#!/usr/bin/python
+
+import igraph as ig
+import numpy as np
+
+
+def get_adjacency(edges, nb_vertices):
+    """
+    Compressed sparse row (CSR) adjacency of an undirected graph, referring to
+    the edges by their index in `edges`.
+
+    Params
+    ------
+    edges : np.ndarray
+        End points of every edge, shape (E, 2)
+    nb_vertices : int
+        Number of vertices
+
+    Return
+    ------
+    indptr : np.ndarray
+        Neighbours of vertex v are stored at positions indptr[v]:indptr[v+1]
+    nbr : np.ndarray
+        Neighbouring vertex
+    eid : np.ndarray
+        Index of the edge towards the neighbouring vertex
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    ids = np.arange(len(edges))
+    heads = np.concatenate((edges[:, 0], edges[:, 1]))
+    tails = np.concatenate((edges[:, 1], edges[:, 0]))
+    eids = np.concatenate((ids, ids))
+
+    order = np.argsort(heads, kind='stable')
+    indptr = np.zeros(nb_vertices + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(heads, minlength=nb_vertices))
+
+    return indptr, tails[order], eids[order]
+
+
+def get_network(g):
+    """
+    Array representation of an FWA graph. The topology is stored as an edge
+    array and its CSR adjacency, and every numeric or string attribute of the
+    vertices and edges as a typed array, e.g. `weight`, `tp` and `cap` of the
+    edges and `id`, `type` and `t` of the vertices. Other attributes, such as
+    the routes of the planning, are kept as object arrays.
+
+    Params
+    ------
+    g : iGraph
+        Input graph
+
+    Return
+    ------
+    network : dict
+        `nb_vertices`, `edges`, `indptr`, `nbr`, `eid` for the topology, cf.
+        `get_adjacency`, `vs` and `es` with the vertex and edge attributes and
+        `attributes` with the graph attributes
+    """
+    if is_network(g):
+        return g
+
+    edges = np.array(g.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    indptr, nbr, eid = get_adjacency(edges, g.vcount())
+
+    network = {
+        "nb_vertices": g.vcount(),
+        "edges": edges,
+        "indptr": indptr,
+        "nbr": nbr,
+        "eid": eid,
+        "vs": get_attribute_arrays(g.vs),
+        "es": get_attribute_arrays(g.es),
+        "attributes": {name: g[name] for name in g.attributes()},
+    }
+    return network
+
+
+def get_attribute_arrays(seq):
+    """
+    Typed arrays of the attributes of a vertex or edge sequence, cf. `get_network`.
+    """
+    return {name: get_attribute_array(seq[name]) for name in seq.attributes()}
+
+
+def get_attribute_array(values):
+    """
+    Typed array of the values of an attribute, cf. `get_network`. NumPy arrays
+    with a numeric, boolean or string type are kept as they are.
+    """
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return values
+
+    if len(values) == 0:
+        return np.zeros(0)
+
+    # Homogeneous numeric, boolean and string values are typed by NumPy, other values,
+    # e.g. routes or numbers with None, are checked one by one
+    try:
+        array = np.array(values)
+    except ValueError:
+        array = None
+    if array is not None and array.ndim == 1:
+        if array.dtype.kind in 'bf':
+            return array
+        if array.dtype.kind == 'i':
+            return array.astype(np.int64)
+        if array.dtype.kind == 'U' and all(isinstance(x, str) for x in values):
+            return array
+
+    if all(isinstance(x, str) for x in values):
+        return np.array(values, dtype=str)
+    if all(isinstance(x, (bool, np.bool_)) for x in values):
+        return np.array(values, dtype=bool)
+    if all(isinstance(x, (int, np.integer)) and not isinstance(x, bool) for x in values):
+        return np.array(values, dtype=np.int64)
+    if any(x is not None for x in values) and \
+            all(isinstance(x, (int, float, np.number)) or x is None for x in values):
+        return np.array([np.nan if x is None else x for x in values], dtype=float)
+
+    array = np.empty(len(values), dtype=object)
+    for i, x in enumerate(values):
+        array[i] = x
+    return array
+
+
+def get_graph(network):
+    """
+    Export an array representation of an FWA graph, cf. `get_network`, to igraph.
+
+    Params
+    ------
+    network : dict
+        Array representation of the graph
+
+    Return
+    ------
+    g : iGraph
+        Graph with the vertex and edge attributes of the network
+    """
+    if isinstance(network, ig.Graph):
+        return network
+
+    g = ig.Graph(n=network["nb_vertices"], edges=network["edges"].tolist())
+    for name, values in network["vs"].items():
+        g.vs[name] = values.tolist()
+    for name, values in network["es"].items():
+        g.es[name] = values.tolist()
+    for name, value in network["attributes"].items():
+        g[name] = value
+
+    return g
+
+
+def is_network(g):
+    """
+    Return whether `g` is an array representation of an FWA graph, cf. `get_network`.
+    """
+    return isinstance(g, dict) and "indptr" in g
+
+
+def get_nb_vertices(g):
+    """
+    Number of vertices of a graph or of its array representation.
+    """
+    return g["nb_vertices"] if is_network(g) else g.vcount()
+
+
+def get_nb_edges(g):
+    """
+    Number of edges of a graph or of its array representation.
+    """
+    return len(g["edges"]) if is_network(g) else g.ecount()
+
+
+def get_edges(g):
+    """
+    End points of every edge of a graph or of its array representation, shape (E, 2).
+    """
+    if is_network(g):
+        return g["edges"]
+
+    return np.array(g.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+
+
+def get_attribute(g, kind, name):
+    """
+    Values of a vertex or edge attribute of a graph or of its array representation.
+
+    Params
+    ------
+    g : iGraph or dict
+        Input graph, or its array representation
+    kind : str
+        `vs` for a vertex attribute, `es` for an edge attribute
+    name : str
+        Attribute name
+
+    Return
+    ------
+    values : np.ndarray or list
+        Typed array for a network, list for an igraph graph
+    """
+    if is_network(g):
+        return g[kind][name]
+
+    return (g.vs if kind == 'vs' else g.es)[name]
+
+
+def has_attribute(g, kind, name):
+    """
+    Return whether a graph or its array representation has a vertex or edge attribute,
+    cf. `get_attribute`.
+    """
+    if is_network(g):
+        return name in g[kind]
+
+    return name in (g.vs if kind == 'vs' else g.es).attributes()
+
+
+def set_attribute(g, kind, name, values):
+    """
+    Set a vertex or edge attribute of a graph or of its array representation, cf.
+    `get_attribute`. Networks store the values as a typed array, cf. `get_attribute_array`,
+    graphs as a list.
+    """
+    if is_network(g):
+        g[kind][name] = get_attribute_array(values)
+        return
+
+    (g.vs if kind == 'vs' else g.es)[name] = values.tolist() if isinstance(values, np.ndarray) else values
+
+
+def get_components(network):
+    """
+    Connected component of every vertex of an array representation, labelled by the
+    lowest vertex index of the component. Labels are propagated along the edges and
+    shortcut to the label of their label until they no longer change.
+
+    Params
+    ------
+    network : dict
+        Array representation of the graph, cf. `get_network`
+
+    Return
+    ------
+    labels : np.ndarray
+        Component label of every vertex
+    """
+    labels = np.arange(network["nb_vertices"])
+    a, b = network["edges"][:, 0], network["edges"][:, 1]
+    while True:
+        update = labels.copy()
+        np.minimum.at(update, a, labels[b])
+        np.minimum.at(update, b, labels[a])
+        update = update[update]
+        if np.array_equal(update, labels):
+            return labels
+        labels = update
+
+
+def get_subnetwork(network, vertices):
+    """
+    Array representation of the subgraph induced by a set of vertices, with the
+    vertices and edges in the same order as `induced_subgraph` of igraph: when more
+    than half of the vertices are kept, the edges keep their relative order, otherwise
+    they are ordered by their higher and then their lower end point.
+
+    Params
+    ------
+    network : dict
+        Array representation of the graph, cf. `get_network`
+    vertices : np.ndarray
+        Boolean mask over the vertices to keep
+
+    Return
+    ------
+    network : dict
+        Array representation of the subgraph
+    """
+    index = np.cumsum(vertices) - 1
+    keep = np.flatnonzero(vertices[network["edges"][:, 0]] & vertices[network["edges"][:, 1]])
+    nb_vertices = int(np.sum(vertices))
+    if nb_vertices <= network["nb_vertices"] / 2:
+        edges = np.sort(index[network["edges"][keep]], axis=1)
+        keep = keep[np.lexsort((edges[:, 0], edges[:, 1]))]
+    edges = np.sort(index[network["edges"][keep]], axis=1)
+    indptr, nbr, eid = get_adjacency(edges, nb_vertices)
+
+    subnetwork = {
+        "nb_vertices": nb_vertices,
+        "edges": edges,
+        "indptr": indptr,
+        "nbr": nbr,
+        "eid": eid,
+        "vs": {name: values[vertices] for name, values in network["vs"].items()},
+        "es": {name: values[keep] for name, values in network["es"].items()},
+        "attributes": dict(network["attributes"]),
+    }
+    return subnetwork
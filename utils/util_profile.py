@@ -0,0 +1,244 @@
+#!/usr/bin/python
+
+import os
+import time
+import json
+import functools
+import contextlib
+import tracemalloc
+
+# Profiling state. Profiling is off by default, instrumented code then only
+# pays a single flag test per stage.
+state = {"enabled": False, "memory": False, "tracemalloc": False, "origin": 0.0,
+         "events": [], "stack": []}
+
+# Context manager returned by `profile_stage` while profiling is off
+null_stage = contextlib.nullcontext()
+
+
+def enable_profiling(memory=False):
+    """
+    Start recording the stages of instrumented code, cf. `profiled` and
+    `profile_stage`. Previously recorded stages are discarded.
+
+    Params
+    ------
+    memory : bool
+        Also record the memory allocated within every stage via tracemalloc,
+        which slows down allocation heavy code considerably
+    """
+    reset_profiling()
+    state["enabled"] = True
+    state["memory"] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        state["tracemalloc"] = True
+
+
+def disable_profiling():
+    """
+    Stop recording stages. The recorded stages are kept for the report.
+    """
+    state["enabled"] = False
+    if state["tracemalloc"]:
+        tracemalloc.stop()
+        state["tracemalloc"] = False
+
+
+def reset_profiling():
+    """
+    Discard the recorded stages.
+    """
+    state["events"] = []
+    state["stack"] = []
+    state["origin"] = time.perf_counter()
+
+
+def get_sizes(g):
+    """
+    Number of vertices and edges of an iGraph or its array representation, cf.
+    `get_network`, or no sizes for other objects.
+    """
+    if hasattr(g, "vcount") and hasattr(g, "ecount"):
+        return {"nb_vertices": g.vcount(), "nb_edges": g.ecount()}
+    if isinstance(g, dict) and "nb_vertices" in g and "edges" in g:
+        return {"nb_vertices": g["nb_vertices"], "nb_edges": len(g["edges"])}
+    return {}
+
+
+@contextlib.contextmanager
+def record_stage(name, sizes):
+    """
+    Record the wall time, allocated memory and sizes of a stage, nested within
+    the enclosing stage, cf. `profile_stage`.
+    """
+    frame = {"name": name, "sizes": dict(sizes), "peak": 0, "children": 0.0}
+    stack = state["stack"]
+    path = "/".join([f["name"] for f in stack] + [name])
+    memory = state["memory"] and tracemalloc.is_tracing()
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        frame["current"] = current
+
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield frame
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1]["children"] += duration
+
+        event = {"name": path, "start": start - state["origin"], "duration": duration,
+                 "self_time": duration - frame["children"], "depth": len(stack), "sizes": frame["sizes"]}
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame["peak"])
+            event["allocated"] = current - frame["current"]
+            event["peak"] = peak - frame["current"]
+            # The peak of the enclosing stage includes the peak of this one
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        state["events"].append(event)
+
+
+def profile_stage(name, **sizes):
+    """
+    Context manager around a stage or sub-stage of the pipeline, e.g.
+
+        with profile_stage("link_budget", nb_edges=len(distances)):
+            ...
+
+    While profiling is enabled, its wall time, allocated memory and the given
+    sizes are recorded, otherwise it does nothing.
+
+    Params
+    ------
+    name : str
+        Name of the stage, nested stages are reported as `outer/inner`
+    sizes : int
+        Sizes of the input of the stage, e.g. `nb_edges`
+    """
+    if not state["enabled"]:
+        return null_stage
+    return record_stage(name, sizes)
+
+
+def set_stage_sizes(**sizes):
+    """
+    Add sizes to the innermost recorded stage, e.g. once they are known within
+    the stage. Does nothing while profiling is off.
+    """
+    if state["enabled"] and state["stack"]:
+        state["stack"][-1]["sizes"].update(sizes)
+
+
+def profiled(func=None, name=None):
+    """
+    Decorator recording every call of a function as a stage, cf. `profile_stage`,
+    with the number of vertices and edges of the returned graph as sizes. While
+    profiling is off, the function is called directly.
+
+    Params
+    ------
+    func : callable
+        Function to instrument
+    name : str
+        Name of the stage, the name of the function by default
+    """
+    if func is None:
+        return functools.partial(profiled, name=name)
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not state["enabled"]:
+            return func(*args, **kwargs)
+        with record_stage(name, {}) as frame:
+            result = func(*args, **kwargs)
+            frame["sizes"].update(get_sizes(result))
+        return result
+
+    return wrapper
+
+
+def get_profile_report():
+    """
+    Flat report of the recorded stages, aggregated per stage.
+
+    Return
+    ------
+    report : list[dict]
+        One entry per stage, in the order in which the stages were first
+        entered, with `stage`, `calls`, `total_time`, `self_time` (excluding
+        the nested stages), `mean_time` and `max_time` in s, the `sizes` of its
+        last call and, when memory was recorded, the total `allocated` and
+        maximum `peak` memory in bytes
+    """
+    first = {}
+    for event in sorted(state["events"], key=lambda e: e["start"]):
+        first.setdefault(event["name"], len(first))
+
+    stages = {}
+    for event in state["events"]:
+        s = stages.setdefault(event["name"], {"stage": event["name"], "calls": 0, "total_time": 0.0,
+                                              "self_time": 0.0, "max_time": 0.0, "sizes": {}})
+        s["calls"] += 1
+        s["total_time"] += event["duration"]
+        s["self_time"] += event["self_time"]
+        s["max_time"] = max(s["max_time"], event["duration"])
+        s["sizes"] = event["sizes"]
+        if "allocated" in event:
+            s["allocated"] = s.get("allocated", 0) + event["allocated"]
+            s["peak"] = max(s.get("peak", 0), event["peak"])
+
+    report = sorted(stages.values(), key=lambda s: first[s["stage"]])
+    for s in report:
+        s["mean_time"] = s["total_time"] / s["calls"]
+
+    return report
+
+
+def print_profile_report(report=None):
+    """
+    Print the report of the recorded stages, cf. `get_profile_report`.
+    """
+    report = get_profile_report() if report is None else report
+
+    print("----------------------------------------------------------------------")
+    print(f"{'stage':<40} {'calls':>6} {'total [ms]':>11} {'self [ms]':>10} {'mean [ms]':>10} {'peak [MB]':>10}")
+    for s in report:
+        depth = s["stage"].count("/")
+        name = "  " * depth + s["stage"].split("/")[-1]
+        peak = f"{s['peak'] / 2 ** 20:10.2f}" if "peak" in s else f"{'-':>10}"
+        print(f"{name:<40} {s['calls']:6d} {s['total_time'] * 1e3:11.2f} {s['self_time'] * 1e3:10.2f} "
+              f"{s['mean_time'] * 1e3:10.3f} {peak}")
+    print("----------------------------------------------------------------------")
+
+
+def write_chrome_trace(path):
+    """
+    Write the recorded stages in the Chrome trace event format, to be opened in
+    chrome://tracing or https://ui.perfetto.dev.
+
+    Params
+    ------
+    path : str
+        Path towards the JSON file
+    """
+    events = []
+    for event in sorted(state["events"], key=lambda e: e["start"]):
+        args = dict(event["sizes"])
+        if "allocated" in event:
+            args["allocated"] = event["allocated"]
+            args["peak"] = event["peak"]
+        events.append({"name": event["name"].split("/")[-1], "cat": event["name"], "ph": "X",
+                       "ts": event["start"] * 1e6, "dur": event["duration"] * 1e6,
+                       "pid": os.getpid(), "tid": 0, "args": args})
+
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
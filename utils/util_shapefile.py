@@ -0,0 +1,236 @@
+#!/usr/bin/python
+
+import os
+import struct
+
+import numpy as np
+
+# Shape types with polygon or polyline geometry (plain, Z and M variants)
+polygon_types = (3, 5, 13, 15, 23, 25)
+
+
+def read_shapefile(path):
+    """
+    Read the polygon or polyline geometry of an ESRI shapefile (`.shp`). Only
+    the x and y coordinates are read.
+
+    Params
+    ------
+    path : str
+        Path towards the `.shp` file
+
+    Return
+    ------
+    shapes : dict
+        `x`, `y` : coordinates of all points in m,
+        `part_start` : index of the first point of every part (ring),
+        `part_shape` : record index of every part
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    file_code, = struct.unpack('>i', data[0:4])
+    if file_code != 9994:
+        raise ValueError(f"{path} is not a shapefile")
+
+    xy = []
+    part_start = []
+    part_shape = []
+    nb_points = 0
+    offset = 100
+    record = 0
+    while offset + 8 <= len(data):
+        _, length = struct.unpack('>ii', data[offset:offset + 8])
+        content = offset + 8
+        offset = content + 2 * length
+
+        shape_type, = struct.unpack('<i', data[content:content + 4])
+        if shape_type == 0:
+            record += 1
+            continue
+        if shape_type not in polygon_types:
+            raise ValueError(f"Unsupported shape type {shape_type} in {path}")
+
+        nb_parts, nb_pts = struct.unpack('<ii', data[content + 36:content + 44])
+        parts = np.frombuffer(data, dtype='<i4', count=nb_parts, offset=content + 44)
+        pts = np.frombuffer(data, dtype='<f8', count=2 * nb_pts, offset=content + 44 + 4 * nb_parts)
+
+        xy.append(pts.reshape(-1, 2))
+        part_start.append(parts + nb_points)
+        part_shape.append(np.full(nb_parts, record))
+        nb_points += nb_pts
+        record += 1
+
+    xy = np.concatenate(xy) if xy else np.zeros((0, 2))
+    shapes = {
+        "x": xy[:, 0].copy(),
+        "y": xy[:, 1].copy(),
+        "part_start": np.concatenate(part_start) if part_start else np.zeros(0, dtype=np.int64),
+        "part_shape": np.concatenate(part_shape) if part_shape else np.zeros(0, dtype=np.int64),
+    }
+    return shapes
+
+
+def read_dbf_fields(path):
+    """
+    Return the fields of a dBASE (`.dbf`) attribute table.
+
+    Params
+    ------
+    path : str
+        Path towards the `.dbf` file
+
+    Return
+    ------
+    fields : dict
+        Field name -> (type, offset in record, length)
+    """
+    with open(path, 'rb') as f:
+        header = f.read(32)
+        header_length, = struct.unpack('<H', header[8:10])
+        descriptors = f.read(header_length - 32)
+
+    fields = {}
+    offset = 1  # deletion flag
+    for i in range(0, len(descriptors) - 31, 32):
+        if descriptors[i] == 0x0D:
+            break
+        name = descriptors[i:i + 11].split(b'\0')[0].decode('ascii')
+        fields[name] = (chr(descriptors[i + 11]), offset, descriptors[i + 16])
+        offset += descriptors[i + 16]
+
+    return fields
+
+
+def read_dbf(path, names):
+    """
+    Read numeric fields of a dBASE (`.dbf`) attribute table, with one row per
+    shape of the corresponding shapefile.
+
+    Params
+    ------
+    path : str
+        Path towards the `.dbf` file
+    names : list[str]
+        Numeric fields to read
+
+    Return
+    ------
+    columns : dict
+        Field name -> values, NaN for empty values
+    """
+    fields = read_dbf_fields(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    nb_records, header_length, record_length = struct.unpack('<IHH', data[4:12])
+
+    records = np.frombuffer(data, dtype=np.uint8, count=nb_records * record_length,
+                            offset=header_length).reshape(nb_records, record_length)
+
+    columns = {}
+    for name in names:
+        field_type, offset, length = fields[name]
+        if field_type not in ('N', 'F'):
+            raise ValueError(f"Field {name} of {path} is not numeric")
+        raw = np.ascontiguousarray(records[:, offset:offset + length]).view(f'S{length}').ravel()
+        raw = np.char.strip(raw)
+        values = np.full(nb_records, np.nan)
+        valid = raw != b''
+        values[valid] = raw[valid].astype(float)
+        columns[name] = values
+
+    return columns
+
+
+def get_shapefile_path(path, extension):
+    """
+    Return the path of a shapefile component, e.g. `.dbf` for `Buildings.shp`.
+    """
+    return os.path.splitext(path)[0] + extension
+
+
+def get_inside(shapes, x, y, cell_size=25.0, batch_size=20000):
+    """
+    Test whether points lie inside the polygons of a shapefile, with the
+    even-odd rule over all rings, so holes are excluded. Rings are registered
+    in a uniform grid by their bounding box, as the walls in `wall_index`, and
+    every point is only tested against the edges of the rings whose bounding
+    box contains it; a ray from a point outside the bounding box of a ring
+    crosses it an even number of times.
+
+    Params
+    ------
+    shapes : dict
+        Polygons, as returned by `read_shapefile`
+    x, y : np.ndarray
+        Coordinates of the points in m
+    cell_size : float
+        Size of a grid cell in m
+    batch_size : int
+        Number of points tested at once
+
+    Return
+    ------
+    inside : np.ndarray
+        Whether each point lies inside a polygon
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    inside = np.zeros(len(x), dtype=bool)
+    part_start = shapes["part_start"]
+    part_end = np.append(part_start[1:], len(shapes["x"]))
+    if len(part_start) == 0 or len(x) == 0:
+        return inside
+
+    # Bounding box of every ring and the grid cells it covers
+    xmin = np.minimum.reduceat(shapes["x"], part_start)
+    xmax = np.maximum.reduceat(shapes["x"], part_start)
+    ymin = np.minimum.reduceat(shapes["y"], part_start)
+    ymax = np.maximum.reduceat(shapes["y"], part_start)
+    x0, y0 = xmin.min(), ymin.min()
+    cx1 = np.floor((xmin - x0) / cell_size).astype(np.int64)
+    cx2 = np.floor((xmax - x0) / cell_size).astype(np.int64)
+    cy1 = np.floor((ymin - y0) / cell_size).astype(np.int64)
+    cy2 = np.floor((ymax - y0) / cell_size).astype(np.int64)
+    nx = int(cx2.max()) + 1
+    ny = int(cy2.max()) + 1
+
+    wx = cx2 - cx1 + 1
+    wy = cy2 - cy1 + 1
+    count = wx * wy
+    ring = np.repeat(np.arange(len(count)), count)
+    k = np.arange(len(ring)) - np.repeat(np.cumsum(count) - count, count)
+    keys = (cx1[ring] + k // wy[ring]) * ny + cy1[ring] + k % wy[ring]
+    order = np.argsort(keys, kind='stable')
+    keys, ring = keys[order], ring[order]
+
+    for first in range(0, len(x), batch_size):
+        px, py = x[first:first + batch_size], y[first:first + batch_size]
+
+        # Candidate rings of every point within the grid
+        cx = np.floor((px - x0) / cell_size).astype(np.int64)
+        cy = np.floor((py - y0) / cell_size).astype(np.int64)
+        valid = (cx >= 0) & (cx < nx) & (cy >= 0) & (cy < ny)
+        lo = np.searchsorted(keys, cx * ny + cy, side='left')
+        hi = np.searchsorted(keys, cx * ny + cy, side='right')
+        nb = np.where(valid, hi - lo, 0)
+        point = np.repeat(np.arange(len(px)), nb)
+        candidate = ring[np.repeat(lo, nb) + np.arange(len(point)) - np.repeat(np.cumsum(nb) - nb, nb)]
+        keep = ((xmin[candidate] <= px[point]) & (px[point] <= xmax[candidate])
+                & (ymin[candidate] <= py[point]) & (py[point] <= ymax[candidate]))
+        point, candidate = point[keep], candidate[keep]
+
+        # Edges from every point of the candidate rings to the next one
+        nb_edges = part_end[candidate] - part_start[candidate] - 1
+        point = np.repeat(point, nb_edges)
+        start = np.repeat(part_start[candidate], nb_edges) + np.arange(len(point)) \
+            - np.repeat(np.cumsum(nb_edges) - nb_edges, nb_edges)
+        x1, y1 = shapes["x"][start], shapes["y"][start]
+        x2, y2 = shapes["x"][start + 1], shapes["y"][start + 1]
+        straddle = (y1 > py[point]) != (y2 > py[point])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xc = x1 + (py[point] - y1) * (x2 - x1) / (y2 - y1)
+        crossings = np.bincount(point[straddle & (px[point] < xc)], minlength=len(px))
+        inside[first:first + batch_size] = crossings % 2 == 1
+
+    return inside
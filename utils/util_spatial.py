@@ -0,0 +1,109 @@
+#!/usr/bin/python
+
+import numpy as np
+
+
+def grid_index(x, y, cell_size):
+    """
+    Build a uniform grid index over a set of points, with the points sorted by
+    grid cell. All points within a distance `cell_size` of a location are in
+    the 3 x 3 cells around that location.
+
+    Params
+    ------
+    x, y : np.ndarray
+        Coordinates of the points in m
+    cell_size : float
+        Size of a grid cell in m
+
+    Return
+    ------
+    index : dict
+        Grid index, to be used with `query_pairs`
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x0 = np.min(x) if x.size else 0.0
+    y0 = np.min(y) if y.size else 0.0
+    cx = np.floor((x - x0) / cell_size).astype(np.int64)
+    cy = np.floor((y - y0) / cell_size).astype(np.int64)
+    nx = int(cx.max()) + 1 if x.size else 1
+    ny = int(cy.max()) + 1 if y.size else 1
+
+    keys = cx * ny + cy
+    order = np.argsort(keys, kind='stable')
+
+    index = {
+        "x": x, "y": y, "x0": x0, "y0": y0, "cell_size": float(cell_size),
+        "nx": nx, "ny": ny, "keys": keys[order], "order": order,
+    }
+    return index
+
+
+def query_pairs(index, qx, qy, radius):
+    """
+    Return all pairs of query locations and indexed points within a maximum
+    distance, without comparing all pairs. The radius may not exceed the cell
+    size of the index.
+
+    Params
+    ------
+    index : dict
+        Grid index, as returned by `grid_index`
+    qx, qy : np.ndarray
+        Coordinates of the query locations in m
+    radius : float
+        Maximum distance in m
+
+    Return
+    ------
+    query_idx : np.ndarray
+        Index of the query location of each pair
+    point_idx : np.ndarray
+        Index of the indexed point of each pair
+    dist : np.ndarray
+        Distance of each pair in m
+    """
+    if radius > index["cell_size"]:
+        raise ValueError("Query radius exceeds the cell size of the grid index")
+
+    qx = np.asarray(qx, dtype=float)
+    qy = np.asarray(qy, dtype=float)
+    nx, ny = index["nx"], index["ny"]
+    cx = np.floor((qx - index["x0"]) / index["cell_size"]).astype(np.int64)
+    cy = np.floor((qy - index["y0"]) / index["cell_size"]).astype(np.int64)
+
+    # Point ranges of the 3 x 3 neighbouring cells of every query location
+    query = []
+    starts = []
+    counts = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            ncx = cx + dx
+            ncy = cy + dy
+            valid = (ncx >= 0) & (ncx < nx) & (ncy >= 0) & (ncy < ny)
+            keys = ncx[valid] * ny + ncy[valid]
+            start = np.searchsorted(index["keys"], keys, side='left')
+            end = np.searchsorted(index["keys"], keys, side='right')
+            query.append(np.flatnonzero(valid))
+            starts.append(start)
+            counts.append(end - start)
+    query = np.concatenate(query)
+    starts = np.concatenate(starts)
+    counts = np.concatenate(counts)
+
+    # Expand the ranges into candidate pairs
+    total = int(np.sum(counts))
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    query_idx = np.repeat(query, counts)
+    point_idx = index["order"][np.arange(total) + offsets]
+
+    dist = np.sqrt(np.power(index["x"][point_idx] - qx[query_idx], 2) +
+                   np.power(index["y"][point_idx] - qy[query_idx], 2))
+    within = dist <= radius
+
+    # Sort the pairs by query location, then by point
+    query_idx, point_idx, dist = query_idx[within], point_idx[within], dist[within]
+    order = np.lexsort((point_idx, query_idx))
+
+    return query_idx[order], point_idx[order], dist[order]
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+
+import os
+import json
+import logging
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# File signature of a store, followed by the header length and the JSON header
+store_magic = b'FWASTORE'
+# Alignment of the arrays in the store in bytes
+store_alignment = 64
+
+
+def write_store(path, arrays, meta=None):
+    """
+    Write NumPy arrays into a single binary store file that can be memory-mapped,
+    cf. `open_store`. The file starts with a JSON header with the data type, shape
+    and offset of every array, followed by the raw arrays. The store is written to
+    a temporary file first and then moved into place, so readers never see a
+    partial store.
+
+    Params
+    ------
+    path : str
+        Path towards the store file
+    arrays : dict
+        Name -> NumPy array, with a numeric, boolean or fixed width string data type
+    meta : dict
+        JSON serializable metadata, returned by `open_store`
+    """
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    # The header size depends on the offsets, so fix its length first
+    header = {"meta": meta or {}, "arrays": {}}
+    offset = 0
+    for name, a in arrays.items():
+        header["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset += -(-a.nbytes // store_alignment) * store_alignment
+    length = len(json.dumps(header)) + 32 * len(arrays) + 64
+    start = -(-(len(store_magic) + 8 + length) // store_alignment) * store_alignment
+    for entry in header["arrays"].values():
+        entry["offset"] += start
+    encoded = json.dumps(header).encode().ljust(length)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_file = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(store_magic)
+            f.write(np.uint64(length).tobytes())
+            f.write(encoded)
+            for name, a in arrays.items():
+                f.seek(header["arrays"][name]["offset"])
+                f.write(a.tobytes())
+        os.replace(tmp_file, path)
+    except OSError:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+    logger.info("Wrote store %s with %s arrays", path, len(arrays))
+
+
+def read_store_header(path):
+    """
+    Read the JSON header of a store written by `write_store`, without mapping its
+    arrays.
+
+    Params
+    ------
+    path : str
+        Path towards the store file
+
+    Return
+    ------
+    header : dict
+        Metadata (`meta`) of the store and data type, shape and offset of every
+        array (`arrays`)
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(store_magic)) != store_magic:
+            raise ValueError(f"{path} is not a store file")
+        length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        return json.loads(f.read(length).decode())
+
+
+def open_store(path):
+    """
+    Open a store written by `write_store`. The arrays are memory-mapped read-only,
+    so they are only read from disk when accessed, and processes that open the
+    same store share its pages.
+
+    Params
+    ------
+    path : str
+        Path towards the store file
+
+    Return
+    ------
+    arrays : dict
+        Name -> read-only memory-mapped array
+    meta : dict
+        Metadata of the store
+    """
+    header = read_store_header(path)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        if np.prod(shape) == 0:
+            arrays[name] = np.zeros(shape, dtype=entry["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=entry["dtype"], mode='r', offset=entry["offset"],
+                                     shape=shape)
+
+    return arrays, header["meta"]